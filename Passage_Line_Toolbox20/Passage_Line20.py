@@ -2,262 +2,178 @@
 
 # import dependencies and libraries
 import pandas as pd
-import math
-import arcpy
-
-## Define parameter inputs, outputs
-TrackLines = str(arcpy.GetParameterAsText(0))
-PassageLines = str(arcpy.GetParameterAsText(1))
-MultipleInt = str(arcpy.GetParameterAsText(2))
-NameField = str(arcpy.GetParameterAsText(3))
-MMSI = str(arcpy.GetParameterAsText(4))
-LengthField = str(arcpy.GetParameterAsText(5))
-VesselTypes = str(arcpy.GetParameterAsText(6))
-Simplified = str(arcpy.GetParameterAsText(7))
-CustomName = str(arcpy.GetParameterAsText(8))
-if arcpy.GetParameterAsText(9):
-    CustomTypes = [int(num) for num in arcpy.GetParameterAsText(9).split(";")]
-else:
-    CustomTypes = arcpy.GetParameterAsText(9)
-DateField = str(arcpy.GetParameterAsText(10))
-StartInterval = str(arcpy.GetParameterAsText(11))
-EndInterval = str(arcpy.GetParameterAsText(12))
-OutputName = str(arcpy.GetParameterAsText(13))
+import os
+import sys
+
+## make the passage_line engine next to this script importable when run from the toolbox
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from passage_line import CacheKey, CellSketches, CompactCrossingTable, CompactFrame, CorridorMatrix, CountRows, DatasetFingerprint, DateWhereClause, EvictCache, Instruments, InteractionCounts, InteractionRule, LengthDistribution, LoadColumns, LoadCrossings, PERIOD_FIELD, PeriodKeys, PeriodName, PrefilterDistance, SaveCrossings, SimplifySummary, SketchedUniqueTotal, SketchedUniqueVessels, SplitPeriods, SummarizeTransits, SummaryFields, WriteSummary
 
 ## Spatial Join tool execution
-def PassageLineSummary(TrackLines, PassageLines, MultipleInt, NameField, VesselTypes, Simplified, CustomName, CustomTypes, DateField, StartInterval, EndInterval, OutputName):
+def PassageLineSummary(TrackLines, PassageLines, MultipleInt, NameField, VesselTypes, Simplified, CustomName, CustomTypes, DateField, StartInterval, EndInterval, OutputName, Diagnostics=True, Period="", PeriodOutput="Single table", Prefilter=True, PrefilterTolerance="", CacheFolder="", LengthOutput="", RunReport="", ProfileStage="", MMSI="", LengthField="", CorridorOutput="", UniqueCount="Exact", SketchPrecision=12, CacheHash=False):
+    ## arcpy is only needed once the tool runs, importing this module doesn't need an ArcGIS license
+    import arcpy
+
     # define temporary output for spatial join
     temp_out = "temp_spatial_join"
     # execute join or intersect
 
-    ## count the number of input features
-    counterp = 0
-    countert = 0
-    for row in arcpy.SearchCursor(PassageLines, arcpy.ListFields(PassageLines)):
-        counterp += 1
-    for row in arcpy.SearchCursor(TrackLines, arcpy.ListFields(TrackLines)):
-        countert += 1
-    arcpy.AddMessage(f"Passage line input: {counterp} items...")
-    arcpy.AddMessage(f"Track line input: {countert} items...")
-    arcpy.AddMessage("Running Pairwise Intersect...")
-
-    ## Describe the shapetype of the passage line/area input
-    descp = arcpy.Describe(PassageLines)
-
-    ## convert to polyline if polygon, and get multipoint output
-    if descp.shapeType == "Polygon":
-        arcpy.management.PolygonToLine(in_features=PassageLines, out_feature_class="Temp_PassageLines", neighbor_option="IGNORE_NEIGHBORS")
-        arcpy.analysis.PairwiseIntersect(in_features=[TrackLines, "Temp_PassageLines"], out_feature_class=temp_out, join_attributes="ALL", cluster_tolerance="", output_type="POINT")
-    elif descp.shapeType == "Line" or descp.shapeType == "Polyline":
-        arcpy.analysis.PairwiseIntersect(in_features=[TrackLines, PassageLines], out_feature_class=temp_out, join_attributes="ALL", cluster_tolerance="", output_type="POINT")
-    ## multipart to single part, convert pairwise intersect output to individual points
-    arcpy.management.MultipartToSinglepart(in_features=temp_out, out_feature_class="temp_int")
-
-    ## count the number of multipoint and singlepoint features
-    countero = 0
-    for row in arcpy.SearchCursor("temp_int", arcpy.ListFields("temp_int")):
-        countero += 1
-    counteri = 0
-    for row in arcpy.SearchCursor(temp_out, arcpy.ListFields(temp_out)):
-        counteri += 1
-
-    arcpy.AddMessage(f"Pairwise Intersect multipart feature class output: {counteri} items...")
-    arcpy.AddMessage(f"Pairwise Intersect converted to singlepart feature class output: {countero} items...")
-
-## Convert singlepoint output to dataframe
-    final_fields = [field.name for field in arcpy.ListFields("temp_int")]
-    data = [row for row in arcpy.da.SearchCursor("temp_int", final_fields)]
-    temp_int_df = pd.DataFrame(data, columns=final_fields)
-    temp_orig_fid = temp_int_df.groupby(by="ORIG_FID").size()
-## Convert multipoint output to dataframe
-    final_fields1 = [field.name for field in arcpy.ListFields(temp_out)]
-    data1 = [row for row in arcpy.da.SearchCursor(temp_out, final_fields1)]
-    temp_out_df = pd.DataFrame(data1, columns=final_fields1)
-    temp_out_df["ORIG_FID_CALC"] = 0
+    ## per-stage wall/CPU time, peak memory and row counts, only measured with a run report or a stage to profile
+    instruments = Instruments(bool(RunReport or ProfileStage), arcpy.AddMessage, ProfileStage,
+                              f"{os.path.splitext(RunReport)[0] or 'PassageLineSummary'}_{ProfileStage}.prof")
 
-## Determine the number of interactions per multipoint feature. If a polygon, the total interactions per feature will be half
-## rounded to next highest integer. (if a vessel passes through an area, it will create two interactions that represent one transit.)
-    for i in temp_out_df.index:
-        if MultipleInt == "true":
-            if descp.shapeType == "Polygon":
-                temp_out_df.loc[i, "ORIG_FID_CALC"] = math.ceil(temp_orig_fid[temp_out_df["OBJECTID"][i]] / 2)
-            else:
-                temp_out_df.loc[i, "ORIG_FID_CALC"] = temp_orig_fid[temp_out_df["OBJECTID"][i]]
-        else:
-            temp_out_df.loc[i, "ORIG_FID_CALC"] = 1
+    ## count the number of input features (row count only, no attributes are read). Skipped with Diagnostics=False.
+    track_count = None
+    if Diagnostics:
+        with instruments.stage("count") as record:
+            arcpy.AddMessage(f"Passage line input: {CountRows(PassageLines)} items...")
+            track_count = CountRows(TrackLines)
+            arcpy.AddMessage(f"Track line input: {track_count} items...")
+            record["rows_out"] = track_count
 
-    arcpy.AddMessage(f"Found {temp_out_df['ORIG_FID_CALC'].sum()} interactions...")
-
-## If a date/interval was given, select only those entries. Else, select the whole dataset.
+## If a date/interval was given, select only those track lines before the intersect. Else, use the whole dataset.
     if pd.isnull(StartInterval) == True:
         StartInterval = ""
     if pd.isnull(EndInterval) == True:
         EndInterval = ""
     if DateField != "" and StartInterval == "" and EndInterval == "":
         arcpy.AddMessage("No valid interval input, calculating for the entire dataset...")
+    ## True once this call made the temp_tracks layer (date window or prefilter), so the prefilter selects on it and only
+    ## a layer made here is deleted
+    track_layer = False
     if DateField != "" and StartInterval != "" and EndInterval != "":
-        temp_out_df = [(temp_out_df[DateField] >= pd.to_datetime(StartInterval)) & (temp_out_df[DateField] <= pd.to_datetime(EndInterval))]
+        where_clause = DateWhereClause(arcpy.AddFieldDelimiters(TrackLines, DateField), StartInterval, EndInterval)
+        TrackLines = arcpy.management.MakeFeatureLayer(TrackLines, "temp_tracks", where_clause)[0]
+        track_layer = True
         arcpy.AddMessage(f"Running summary for data within the interval {StartInterval} to {EndInterval}...")
+        if Diagnostics:
+            track_count = CountRows(TrackLines)
+            arcpy.AddMessage(f"Track lines within the interval: {track_count} items...")
 
-## find transit and unique counts
-    transit_df = temp_out_df[[NameField, VesselTypes, "ORIG_FID_CALC"]].groupby(by=[NameField, VesselTypes]).sum().reset_index()
-    unique_df = temp_out_df.groupby(by=[NameField, VesselTypes, MMSI]).count().reset_index()
-## create new dataframe to summarize each vessel type for each waterway/passageline
-    new_df = pd.DataFrame(columns=["Name", "Vessel_Type", "Total_Transits", "Unique_Vessels"])
-    temp_type = pd.unique(temp_out_df[VesselTypes])
-    temp_label = pd.unique(temp_out_df[NameField])
+    ## Describe the shapetype of the passage line/area input
+    descp = arcpy.Describe(PassageLines)
+    fields = SummaryFields("OBJECTID", NameField, VesselTypes, MMSI, LengthField, DateField)
+
+## With a cache folder, reuse the crossing records of an earlier run on the same inputs and skip the geometry stage.
+## The key covers both inputs (path, count, extent, modification time and fields, plus a hash of every feature with
+## CacheHash), the date window and the fields read, so only the summary options (Simplified, custom category, multiple
+## interactions, period, output) may change between runs that share an entry.
+    cached = None
+    if CacheFolder:
+        key = CacheKey(DatasetFingerprint(TrackLines, CacheHash), DatasetFingerprint(PassageLines, CacheHash), descp.shapeType, fields, DateField, StartInterval, EndInterval)
+        removed = EvictCache(CacheFolder)
+        if removed:
+            arcpy.AddMessage(f"Evicted {removed} old intersection cache entries...")
+        cached = LoadCrossings(CacheFolder, key)
+
+    if cached is not None:
+        arcpy.AddMessage("Inputs unchanged, using cached crossing records (geometry stage skipped)...")
+        with instruments.stage("load") as record:
+        ## the compact crossing table is memory-mapped and read through zero-copy columns, the dates at full precision
+            temp_out_df = CompactFrame(cached["crossings"])
+            if DateField:
+                temp_out_df[DateField] = cached["dates"][DateField].to_numpy()
+            record["rows_out"] = len(temp_out_df)
+    else:
+        with instruments.stage("geometry", track_count):
+        ## Envelope prefilter, drop the track lines that don't touch the envelope of any passage line (grown by the tolerance)
+        ## The passage lines are buffered before taking their envelopes (by the tolerance, see PrefilterDistance), so the
+        ## envelope of a straight, axis-aligned passage line still has an area to select on
+            if Prefilter:
+                arcpy.AddMessage("Running envelope prefilter...")
+                arcpy.analysis.PairwiseBuffer(PassageLines, "Temp_Buffers", PrefilterDistance(PrefilterTolerance, descp.spatialReference.XYTolerance))
+                arcpy.management.MinimumBoundingGeometry("Temp_Buffers", "Temp_Envelopes", "ENVELOPE", "NONE")
+                if not track_layer:
+                    TrackLines = arcpy.management.MakeFeatureLayer(TrackLines, "temp_tracks")[0]
+                    track_layer = True
+                if Diagnostics:
+                    tracks_before = CountRows(TrackLines)
+                arcpy.management.SelectLayerByLocation(TrackLines, "INTERSECT", "Temp_Envelopes", None, "NEW_SELECTION")
+                if Diagnostics:
+                    tracks_after = CountRows(TrackLines)
+                    arcpy.AddMessage(f"Envelope prefilter pruned {tracks_before - tracks_after} of {tracks_before} track lines...")
+
+            arcpy.AddMessage("Running Pairwise Intersect...")
+
+            ## convert to polyline if polygon, and get multipoint output
+            if descp.shapeType == "Polygon":
+                arcpy.management.PolygonToLine(in_features=PassageLines, out_feature_class="Temp_PassageLines", neighbor_option="IGNORE_NEIGHBORS")
+                arcpy.analysis.PairwiseIntersect(in_features=[TrackLines, "Temp_PassageLines"], out_feature_class=temp_out, join_attributes="ALL", cluster_tolerance="", output_type="POINT")
+            elif descp.shapeType == "Line" or descp.shapeType == "Polyline":
+                arcpy.analysis.PairwiseIntersect(in_features=[TrackLines, PassageLines], out_feature_class=temp_out, join_attributes="ALL", cluster_tolerance="", output_type="POINT")
+            ## multipart to single part, convert pairwise intersect output to individual points
+            arcpy.management.MultipartToSinglepart(in_features=temp_out, out_feature_class="temp_int")
+
+        with instruments.stage("load") as record:
+        ## Convert singlepoint output to dataframe, only the ORIG_FID column is needed to count points per multipoint feature
+            temp_int_df = LoadColumns("temp_int", ["ORIG_FID"])
+        ## Convert multipoint output to dataframe, only the fields the summary reads
+            temp_out_df = LoadColumns(temp_out, fields)
+        ## points per multipoint feature, the raw crossings the interaction rule is applied to
+            temp_out_df["Crossings"] = InteractionCounts(temp_out_df["OBJECTID"], temp_int_df["ORIG_FID"], "true")
+            record["rows_out"] = len(temp_out_df)
+        del temp_int_df
+
+    ## cache the crossing records as a compact table (dictionary codes, uint32 MMSIs and the raw crossing counts) with
+    ## the dates next to it in Parquet; lengths stay float64 so a cached run gives the same tables as this one
+        if CacheFolder:
+            try:
+                crossings = CompactCrossingTable(temp_out_df, NameField, VesselTypes, MMSI, LengthField, CountField="Crossings", LengthDtype="float64")
+                SaveCrossings(CacheFolder, key, crossings=crossings, **({"dates": temp_out_df[[DateField]]} if DateField else {}))
+                arcpy.AddMessage("Crossing records saved to the intersection cache...")
+            except ValueError as error:
+                arcpy.AddWarning(f"{error}, crossing records not cached...")
+
+    ## count the number of multipoint and singlepoint features from the loaded columns
+    points = int(temp_out_df["Crossings"].sum())
+    if Diagnostics:
+        arcpy.AddMessage(f"Pairwise Intersect multipart feature class output: {len(temp_out_df)} items...")
+        arcpy.AddMessage(f"Pairwise Intersect converted to singlepart feature class output: {points} items...")
 
-## Populate the new dataframe with waterway/passageline names and vesseltypes
-    for x in range(len(temp_label)):
-        for i in range(len(temp_type)):
-            new_df = new_df.append({"Name": temp_label[x], "Vessel_Type": temp_type[i]}, ignore_index=True)
+## Determine the number of interactions per multipoint feature. If a polygon, the total interactions per feature will be half
+## rounded to next highest integer. (if a vessel passes through an area, it will create two interactions that represent one transit.)
+    with instruments.stage("interactions", points) as record:
+        temp_out_df["ORIG_FID_CALC"] = InteractionRule(temp_out_df["Crossings"], MultipleInt, descp.shapeType == "Polygon")
+        record["rows_out"] = len(temp_out_df)
 
-    arcpy.AddMessage("Creating summary dataframe...")
+    arcpy.AddMessage(f"Found {temp_out_df['ORIG_FID_CALC'].sum()} interactions...")
 
-## Populate the transit and unique counts in the new dataframe
-    for y in new_df.index:
-        temp_transit = transit_df[(transit_df[VesselTypes] == new_df["Vessel_Type"][y]) & (transit_df[NameField] == new_df["Name"][y])].reset_index(drop=True)
-        if len(temp_transit) > 0:
-            new_df.loc[y, "Total_Transits"] = temp_transit["ORIG_FID_CALC"][0]
-        else:
-            new_df.loc[y, "Total_Transits"] = 0
-        temp_unique = unique_df[(unique_df[VesselTypes] == new_df["Vessel_Type"][y]) & (unique_df[NameField] == new_df["Name"][y])].reset_index(drop=True)
-        if len(temp_unique) > 0:
-            new_df.loc[y, "Unique_Vessels"] = len(temp_unique[MMSI])
-        else:
-            new_df.loc[y, "Unique_Vessels"] = 0
+## If a period was given, label every interaction with its period (month, quarter... or explicit bins) so every period
+## is summarized in the same pass
+    PeriodField = None
+    if DateField != "" and Period != "":
+        PeriodField = PERIOD_FIELD
+        temp_out_df[PeriodField] = PeriodKeys(temp_out_df[DateField], Period)
+        arcpy.AddMessage(f"Summarizing by period: {Period}...")
+    elif Period != "":
+        arcpy.AddWarning("A period needs a Date Field, calculating for the entire dataset...")
+
+## summarize each vessel type for each waterway/passageline, every name x vessel type pair gets a row (zeros included)
+    arcpy.AddMessage("Creating summary dataframe...")
+    with instruments.stage("summary", len(temp_out_df)) as record:
+        new_df = SummarizeTransits(temp_out_df, NameField, VesselTypes, MMSI, PeriodField=PeriodField)
+    ## with sketched unique vessel counts every name x vessel type cell takes its HyperLogLog estimate (and 95% bounds)
+        if UniqueCount == "Sketch":
+            arcpy.AddMessage(f"Estimating unique vessels with HyperLogLog sketches (precision {SketchPrecision})...")
+            Sketched = CellSketches(temp_out_df, NameField, VesselTypes, MMSI, PeriodField, int(SketchPrecision))
+            new_df = SketchedUniqueVessels(new_df, Sketched, PeriodField)
+        record["rows_out"] = len(new_df)
 
     arcpy.AddMessage("Populating summary dataframe...")
 
-## get list of waterway/passageline names for final summary dataframe
-    Aggregate_temp = new_df.groupby(by="Name").sum().reset_index()
-    Aggregate_temp = Aggregate_temp["Name"]
-
 ## check if a simplified table was selected
     if Simplified == "true":
 
         arcpy.AddMessage("Simplified dataframe selected...")
 
-    ## Create simplified final summary dataframe
-        if CustomName and CustomTypes:
-            Passage_line_df = pd.DataFrame(
-                columns=["Name", "Max_Len", "Avg_Len", "Unique_Fishing", "Transits_Fishing", "Unique_Tug_Tow", "Transits_Tug_Tow",
-                         "Unique_Recreational", "Transits_Recreational", "Unique_Mil_LE", "Transits_Mil_LE", "Unique_Pilots", "Transits_Pilots", "Unique_Passenger", "Transits_Passenger",
-                         "Unique_Cargo", "Transits_Cargo", "Unique_Tanker", "Transits_Tanker", f"Unique_{CustomName}", f"Transits_{CustomName}", "Unique_Other", "Transits_Other",
-                         "Unique_Total", "Transits_Total"])
-        else:
-            Passage_line_df = pd.DataFrame(
-                columns=["Name", "Max_Len", "Avg_Len", "Unique_Fishing", "Transits_Fishing", "Unique_Tug_Tow",
-                         "Transits_Tug_Tow",
-                         "Unique_Recreational", "Transits_Recreational", "Unique_Mil_LE", "Transits_Mil_LE",
-                         "Unique_Pilots", "Transits_Pilots", "Unique_Passenger", "Transits_Passenger",
-                         "Unique_Cargo", "Transits_Cargo", "Unique_Tanker", "Transits_Tanker", "Unique_Other", "Transits_Other",
-                         "Unique_Total", "Transits_Total"])
-
-        Passage_line_df["Name"] = Aggregate_temp
-        Passage_line_df["Max_Len"] = 0
-        Passage_line_df["Avg_Len"] = 0
-        Passage_line_df["Unique_Fishing"] = 0
-        Passage_line_df["Unique_Tug_Tow"] = 0
-        Passage_line_df["Unique_Recreational"] = 0
-        Passage_line_df["Unique_Pilots"] = 0
-        Passage_line_df["Unique_Mil_LE"] = 0
-        Passage_line_df["Unique_Passenger"] = 0
-        Passage_line_df["Unique_Cargo"] = 0
-        Passage_line_df["Unique_Tanker"] = 0
-        Passage_line_df["Unique_Other"] = 0
-        Passage_line_df["Unique_Total"] = 0
-        Passage_line_df["Transits_Fishing"] = 0
-        Passage_line_df["Transits_Tug_Tow"] = 0
-        Passage_line_df["Transits_Recreational"] = 0
-        Passage_line_df["Transits_Pilots"] = 0
-        Passage_line_df["Transits_Mil_LE"] = 0
-        Passage_line_df["Transits_Passenger"] = 0
-        Passage_line_df["Transits_Cargo"] = 0
-        Passage_line_df["Transits_Tanker"] = 0
-        Passage_line_df["Transits_Other"] = 0
-        Passage_line_df["Transits_Total"] = 0
-
-        if CustomName and CustomTypes:
-            Passage_line_df[f"Unique_{CustomName}"] = 0
-            Passage_line_df[f"Transits_{CustomName}"] = 0
-
+    ## classify vessel types into the simplified categories (plus the optional custom category) and aggregate per line
         arcpy.AddMessage("Creating aggregated summary dataframe...")
-
-    ## populate the final dataframe
-        for i in Passage_line_df.index:
-            if LengthField:
-                maxim = [x for x in temp_out_df[temp_out_df[NameField] == Passage_line_df["Name"][i]]["Length"] if math.isnan(x) == False]
-            else: maxim = []
-            if len(maxim) > 0:
-                Passage_line_df.loc[i, "Max_Len"] = max(maxim)
-                Passage_line_df.loc[i, "Avg_Len"] = round(sum(maxim)/len(maxim), 2)
-            else:
-                Passage_line_df.loc[i, "Max_Len"] = 0
-                Passage_line_df.loc[i, "Avg_Len"] = 0
-            for z in new_df.index:
-                if new_df["Name"][z] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Total"] += new_df["Unique_Vessels"][z]
-                    Passage_line_df.loc[i, "Transits_Total"] += new_df["Total_Transits"][z]
-                if new_df["Vessel_Type"][z] == 30 and new_df["Name"][z] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Fishing"] += new_df["Unique_Vessels"][z]
-                    Passage_line_df.loc[i, "Transits_Fishing"] += new_df["Total_Transits"][z]
-                elif (new_df["Vessel_Type"][z] in [31, 32, 52]) and new_df["Name"][z] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Tug_Tow"] += new_df["Unique_Vessels"][z]
-                    Passage_line_df.loc[i, "Transits_Tug_Tow"] += new_df["Total_Transits"][z]
-                elif (new_df["Vessel_Type"][z] in [36, 37]) and new_df["Name"][z] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Recreational"] += new_df["Unique_Vessels"][z]
-                    Passage_line_df.loc[i, "Transits_Recreational"] += new_df["Total_Transits"][z]
-                elif (new_df["Vessel_Type"][z] >= 60 and new_df["Vessel_Type"][z] <= 69) and new_df["Name"][z] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Passenger"] += new_df["Unique_Vessels"][z]
-                    Passage_line_df.loc[i, "Transits_Passenger"] += new_df["Total_Transits"][z]
-                elif (new_df["Vessel_Type"][z] >= 70 and new_df["Vessel_Type"][z] <= 79) and new_df["Name"][z] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Cargo"] += new_df["Unique_Vessels"][z]
-                    Passage_line_df.loc[i, "Transits_Cargo"] += new_df["Total_Transits"][z]
-                elif (new_df["Vessel_Type"][z] >= 80 and new_df["Vessel_Type"][z] <= 89) and new_df["Name"][z] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Tanker"] += new_df["Unique_Vessels"][z]
-                    Passage_line_df.loc[i, "Transits_Tanker"] += new_df["Total_Transits"][z]
-                elif (new_df["Vessel_Type"][z] == 50) and new_df["Name"][z] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Pilots"] += new_df["Unique_Vessels"][z]
-                    Passage_line_df.loc[i, "Transits_Pilots"] += new_df["Total_Transits"][z]
-                elif (new_df["Vessel_Type"][z] in [35, 55]) and new_df["Name"][z] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Mil_LE"] += new_df["Unique_Vessels"][z]
-                    Passage_line_df.loc[i, "Transits_Mil_LE"] += new_df["Total_Transits"][z]
-                elif CustomName and CustomTypes and (new_df["Vessel_Type"][z] in CustomTypes) and new_df["Name"][z] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, f"Unique_{CustomName}"] += new_df["Unique_Vessels"][z]
-                    Passage_line_df.loc[i, f"Transits_{CustomName}"] += new_df["Total_Transits"][z]
-
-            Passage_line_df.loc[i, "Unique_Other"] = Passage_line_df["Unique_Total"][i]
-            Passage_line_df.loc[i, "Transits_Other"] = Passage_line_df["Transits_Total"][i]
-
-            for n in new_df.index:
-                if new_df["Vessel_Type"][n] == 30 and new_df["Name"][n] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Other"] -= new_df["Unique_Vessels"][n]
-                    Passage_line_df.loc[i, "Transits_Other"] -= new_df["Total_Transits"][n]
-                elif (new_df["Vessel_Type"][n] in [31, 32, 52]) and new_df["Name"][n] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Other"] -= new_df["Unique_Vessels"][n]
-                    Passage_line_df.loc[i, "Transits_Other"] -= new_df["Total_Transits"][n]
-                elif (new_df["Vessel_Type"][n] in [36, 37]) and new_df["Name"][n] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Other"] -= new_df["Unique_Vessels"][n]
-                    Passage_line_df.loc[i, "Transits_Other"] -= new_df["Total_Transits"][n]
-                elif (new_df["Vessel_Type"][n] >= 60 and new_df["Vessel_Type"][n] <= 69) and new_df["Name"][n] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Other"] -= new_df["Unique_Vessels"][n]
-                    Passage_line_df.loc[i, "Transits_Other"] -= new_df["Total_Transits"][n]
-                elif (new_df["Vessel_Type"][n] >= 70 and new_df["Vessel_Type"][n] <= 79) and new_df["Name"][n] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Other"] -= new_df["Unique_Vessels"][n]
-                    Passage_line_df.loc[i, "Transits_Other"] -= new_df["Total_Transits"][n]
-                elif (new_df["Vessel_Type"][n] >= 80 and new_df["Vessel_Type"][n] <= 89) and new_df["Name"][n] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Other"] -= new_df["Unique_Vessels"][n]
-                    Passage_line_df.loc[i, "Transits_Other"] -= new_df["Total_Transits"][n]
-                elif (new_df["Vessel_Type"][n] == 50) and new_df["Name"][n] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Other"] -= new_df["Unique_Vessels"][n]
-                    Passage_line_df.loc[i, "Transits_Other"] -= new_df["Total_Transits"][n]
-                elif (new_df["Vessel_Type"][n] in[35, 55]) and new_df["Name"][n] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Other"] -= new_df["Unique_Vessels"][n]
-                    Passage_line_df.loc[i, "Transits_Other"] -= new_df["Total_Transits"][n]
-                elif CustomName and CustomTypes and (new_df["Vessel_Type"][n] in CustomTypes) and new_df["Name"][n] == Passage_line_df["Name"][i]:
-                    Passage_line_df.loc[i, "Unique_Other"] -= new_df["Unique_Vessels"][n]
-                    Passage_line_df.loc[i, "Transits_Other"] -= new_df["Total_Transits"][n]
+        with instruments.stage("simplified", len(new_df)) as record:
+            Passage_line_df = SimplifySummary(new_df, temp_out_df, NameField, LengthField, CustomName, CustomTypes, PeriodField=PeriodField)
+        ## with sketches Unique_Total is the union estimate of the line's types, a vessel under two type codes counts once
+            if UniqueCount == "Sketch":
+                Passage_line_df = SketchedUniqueTotal(Passage_line_df, Sketched, PeriodField)
+            record["rows_out"] = len(Passage_line_df)
 
         arcpy.AddMessage("Populating aggregated summary dataframe...")
 ## Non-simplified output
@@ -266,55 +182,59 @@ def PassageLineSummary(TrackLines, PassageLines, MultipleInt, NameField, VesselT
         arcpy.AddMessage("Populating non-aggregated summary dataframe...")
 
 
-## output as table
-
-    ## convert output name to ESRI friendly format (no characters, spaces, and starts with an alpha character.)
-    temp_output = ""
-    for char in OutputName:
-        if char.isalnum() == True:
-            temp_output = temp_output+char
-    if temp_output[0].isnumeric() == True:
-        temp_output = "A"+temp_output
-    OutputName = temp_output
-
-    ## create empty table
-    arcpy.management.CreateTable(arcpy.env.workspace, OutputName)
-    fields = [field for field in Passage_line_df.columns]
-    datatype = []
-
-    arcpy.AddMessage("Creating output table...")
-
-    for i in range(len(fields)):
-        if i==0:
-            datatype.append("TEXT")
+## output as table, either one table (with a Period column when summarizing by period) or one table per period
+    with instruments.stage("output", len(Passage_line_df)):
+        if PeriodField and PeriodOutput == "Table per period":
+            for period, period_df in SplitPeriods(Passage_line_df).items():
+                WriteTable(period_df, PeriodName(OutputName, period))
         else:
-            datatype.append("LONG")
-
-    ## add fields from final summary dataframe to table
-    for i in range(len(fields)):
-        arcpy.management.AddField(OutputName, fields[i], datatype[i])
-
-    ## initialize insert cursor for all fields
-    cursor = arcpy.da.InsertCursor(OutputName, fields)
+            WriteTable(Passage_line_df, OutputName)
+
+## optional vessel length distribution table: count, max, mean, median, p90, p95 and a length histogram per passage
+## line (and period) for every simplified category and in total
+        if LengthOutput != "" and LengthField != "":
+            arcpy.AddMessage("Creating vessel length distribution table...")
+            WriteTable(LengthDistribution(temp_out_df, NameField, LengthField, VesselTypes, PeriodField, CustomName, CustomTypes), LengthOutput)
+
+## optional corridor table: vessels shared by every pair of passage lines per simplified category, and with a Date
+## Field the vessels that crossed the From line on an earlier date than the To line
+        if CorridorOutput != "":
+            arcpy.AddMessage("Creating passage line corridor table...")
+            WriteTable(CorridorMatrix(temp_out_df, NameField, VesselTypes, MMSI, CustomName, CustomTypes, OrderFields=[DateField] if DateField else None), CorridorOutput)
+
+    ## delete temp_out spatial join and the temporary intersect feature classes (not created on a cache hit)
+    for temp in (temp_out, "Temp_PassageLines", "temp_int", "Temp_Buffers", "Temp_Envelopes"):
+        if arcpy.Exists(temp):
+            arcpy.Delete_management(temp)
+    if track_layer:
+        arcpy.Delete_management("temp_tracks")
+
+    ## JSON run report of every stage, with the run options that shape the work
+    if RunReport:
+        instruments.report(RunReport, TrackLines=str(TrackLines), PassageLines=str(PassageLines), ShapeType=descp.shapeType, MultipleInt=MultipleInt,
+                           Simplified=Simplified, Period=Period, Cached=cached is not None, Prefilter=Prefilter)
+        arcpy.AddMessage(f"Run report written to {RunReport}...")
+
+    del temp_out
+    return
 
-    ## insert all rows in table
-    for i in range(len(Passage_line_df)):
-        row = Passage_line_df.loc[i, :]
-        cursor.insertRow(row)
 
-    arcpy.AddMessage("Populating output table... check the current working environment's geodatabase for output.")
+## Write a summary dataframe to a new table in the current workspace in one call (typed: text labels, integer counts,
+## float lengths). An output name ending in .csv, .parquet or .sqlite is written to that file instead.
+def WriteTable(Passage_line_df, OutputName):
+    import arcpy
 
-    ## delete cursor and temp_out spatial join
-    arcpy.Delete_management(temp_out)
-    arcpy.Delete_management("Temp_PassageLines")
-    arcpy.Delete_management("temp_int")
+    arcpy.AddMessage("Creating output table...")
+    output = WriteSummary(Passage_line_df, OutputName, arcpy.env.workspace)
 
-    del cursor,temp_out
+    arcpy.AddMessage(f"Populating output table... check {output} for output.")
     return
 
 ## executable check
 
 if __name__ == '__main__':
+    import arcpy
+
     TrackLines = str(arcpy.GetParameterAsText(0))
     PassageLines = str(arcpy.GetParameterAsText(1))
     MultipleInt = str(arcpy.GetParameterAsText(2))
@@ -332,5 +252,18 @@ if __name__ == '__main__':
     StartInterval = str(arcpy.GetParameterAsText(11))
     EndInterval = str(arcpy.GetParameterAsText(12))
     OutputName = str(arcpy.GetParameterAsText(13))
-
-    PassageLineSummary(TrackLines, PassageLines, MultipleInt, NameField, VesselTypes, Simplified, CustomName, CustomTypes, DateField, StartInterval, EndInterval, OutputName)
+    Period = str(arcpy.GetParameterAsText(14))
+    PeriodOutput = str(arcpy.GetParameterAsText(15))
+    CacheFolder = str(arcpy.GetParameterAsText(16))
+    LengthOutput = str(arcpy.GetParameterAsText(17))
+    RunReport = str(arcpy.GetParameterAsText(18))
+    ProfileStage = str(arcpy.GetParameterAsText(19))
+    CorridorOutput = str(arcpy.GetParameterAsText(20))
+    UniqueCount = str(arcpy.GetParameterAsText(21)) or "Exact"
+    SketchPrecision = int(arcpy.GetParameterAsText(22) or 12)
+    CacheHash = arcpy.GetParameterAsText(23) == "true"
+    Prefilter = arcpy.GetParameterAsText(24) != "false"
+    PrefilterTolerance = str(arcpy.GetParameterAsText(25))
+    Diagnostics = arcpy.GetParameterAsText(26) != "false"
+
+    PassageLineSummary(TrackLines, PassageLines, MultipleInt, NameField, VesselTypes, Simplified, CustomName, CustomTypes, DateField, StartInterval, EndInterval, OutputName, Diagnostics=Diagnostics, Period=Period, PeriodOutput=PeriodOutput, CacheFolder=CacheFolder, LengthOutput=LengthOutput, RunReport=RunReport, ProfileStage=ProfileStage, MMSI=MMSI, LengthField=LengthField, CorridorOutput=CorridorOutput, UniqueCount=UniqueCount, SketchPrecision=SketchPrecision, CacheHash=CacheHash, Prefilter=Prefilter, PrefilterTolerance=PrefilterTolerance)
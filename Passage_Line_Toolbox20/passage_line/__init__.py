@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+## arcpy-free summary engine used by the Passage Line Summary toolbox
+from .aggregate import MergePartials, Partial, PartialAggregate, PartialLengthStats, PartialSummary
+from .batch import BatchSummary, DatasetPartial, ExpandDatasets, LoadPartial, SavePartial, TrackDatasetPartial
+from .cache import CACHE_MAX_AGE, CACHE_MAX_BYTES, CACHE_VERSION, CacheKey, DatasetFingerprint, EvictCache, LoadCrossings, SaveCrossings
+from .categories import BuildCategoryScheme, CategoryLookup, ClassifyVesselTypes, DEFAULT_CATEGORIES, LoadCategoryScheme
+from .chunked import ChunkedSummary, FileBatchRows, FileTrackBatches, FlushRunning, FoldBatch, Running, RunningSummary, TrackBatches
+from .cli import RunSummary
+from .compact import CompactBytes, CompactCrossings, CompactCrossingTable, CompactDates, CompactFrame, LoadCompact, MISSING_DAY, SaveCompact
+from .corridors import CorridorMatrix, IncidenceMatrix
+from .crossings import BuildPaths, CrossingCounts, DIRECTIONS, FindCrossings, IntersectTable, Paths, SubsetPaths
+from .engine import IntersectTracks
+from .incremental import AppendSummary, LoadState, NewTracks, SaveState, State
+from .ingest import GAP_KM, GAP_MINUTES, PartitionCount, POINT_FIELDS, PointSummary, SplitTracks, StreamTracks
+from .instrument import Instruments, PeakRSS, StageRecord, STAGES
+from .lengths import CategoryLengthSketches, CollapseLengthSketches, LENGTH_BINS, LengthDistribution, LengthQuantiles, LengthSketch, LengthSketches, LengthTable, MergeLengthSketches
+from .loader import CountRows, LoadColumns, SummaryFields
+from .periods import CompletePeriods, DateWhereClause, DateWindow, ParsePeriod, PERIOD_FIELD, PeriodKeys, PERIODS
+from .prefilter import EnvelopePrefilter, FeatureEnvelopes, PrefilterDistance
+from .readers import GEOMETRY_EXTENSIONS, ReadFeatureBatches, ReadFeatures
+from .sketches import BuildSketches, CellSketches, CollapseSketches, EstimateSketches, LoadSketches, MergeSketches, RelativeError, SaveSketches, Sketches, SketchedUniqueTotal, SketchedUniqueVessels, UniqueVesselSummary
+from .summary import DIRECTION_FIELDS, DirectionRule, InteractionCounts, InteractionRule, LengthMean, LengthSummary, SimplifySummary, SplitPeriods, SummarizeTransits
+from .visits import DwellSummary, PairVisits, PointsInAreas, VisitCounts
+from .writer import BACKENDS, PeriodName, StructuredArray, TableName, WriteSummary
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import sys
+
+from .cli import main
+
+sys.exit(main())
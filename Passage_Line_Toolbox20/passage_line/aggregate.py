@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .periods import CompletePeriods, PERIOD_FIELD
+from .sketches import SketchedUniqueTotal, SketchedUniqueVessels
+from .summary import LengthMean, SimplifySummary, SummarizeTransits
+
+## Mergeable exact partial of the summary.
+## cells: one row per ([Period,] Name, Vessel_Type, MMSI) with the summed Transits and the order key of the first
+##        intersect row that produced it, so merged results come out in the same order as a single serial run.
+##        The MMSI column is the exact unique-vessel set of each (line, type) cell. Runs with directions add the
+##        Transits_<label> sums per direction (see DIRECTION_FIELDS).
+## lengths: one row per ([Period,] Name) with Length_Sum, Length_Count and Length_Max.
+Partial = namedtuple("Partial", ["cells", "lengths"])
+
+CELL_FIELDS = ["Name", "Vessel_Type", "MMSI"]
+
+
+def _order_columns(cells):
+    return [column for column in cells.columns if column.startswith("Order_")]
+
+
+## Transits and the per-direction Transits_<label> columns of a cells table
+def _transit_columns(cells):
+    return [column for column in cells.columns if column == "Transits" or column.startswith("Transits_")]
+
+
+## Reduce an intersect table (temp_out_df with ORIG_FID_CALC) to its partial. OrderFields are the columns that give
+## the serial row order of the intersect table: OBJECTID for the toolbox output, Track_ID/Line_ID for the NumPy engine.
+## Rows with a missing name, vessel type or period are kept as cells (dropna=False) like SummarizeTransits keeps them:
+## they add their grid rows/columns, and a missing vessel type still counts toward the line's Max_Len/Avg_Len.
+## DirectionFields maps direction labels to count columns (i.e. DIRECTION_FIELDS) and adds a Transits_<label> per cell.
+def PartialAggregate(temp_out_df, NameField, VesselTypes, MMSI, LengthField="", PeriodField=None, OrderFields=("OBJECTID",), CountField="ORIG_FID_CALC",
+                     DirectionFields=None):
+    frame = pd.DataFrame({
+        "Name": temp_out_df[NameField].to_numpy(),
+        "Vessel_Type": temp_out_df[VesselTypes].to_numpy(),
+        "MMSI": temp_out_df[MMSI].to_numpy(),
+        "Transits": temp_out_df[CountField].to_numpy(dtype="int64"),
+        "Length": pd.to_numeric(temp_out_df[LengthField], errors="coerce").to_numpy(dtype="float64") if LengthField else np.nan,
+    })
+    for label, field in (DirectionFields or {}).items():
+        frame[f"Transits_{label}"] = temp_out_df[field].to_numpy(dtype="int64")
+    keys = list(CELL_FIELDS)
+    if PeriodField:
+        frame.insert(0, PERIOD_FIELD, np.asarray(temp_out_df[PeriodField], dtype=object))
+        keys.insert(0, PERIOD_FIELD)
+    order = []
+    for index, field in enumerate(OrderFields):
+        frame[f"Order_{index}"] = temp_out_df[field].to_numpy()
+        order.append(f"Order_{index}")
+    frame = frame.sort_values(order, kind="stable")
+
+    aggregations = {column: (column, "sum") for column in _transit_columns(frame)}
+    aggregations.update({column: (column, "first") for column in order})
+    cells = frame.groupby(keys, sort=False, dropna=False).agg(**aggregations).reset_index()
+    lengths = frame.groupby(keys[:-2], sort=False).agg(
+        Length_Sum=("Length", "sum"), Length_Count=("Length", "count"), Length_Max=("Length", "max")).reset_index()
+    return Partial(cells, lengths)
+
+
+## Merge partials from partitions, files or runs. The result is the partial a single run over all the rows gives.
+def MergePartials(partials):
+    partials = [partial for partial in partials if partial is not None]
+    cells = pd.concat([partial.cells for partial in partials], ignore_index=True)
+    lengths = pd.concat([partial.lengths for partial in partials], ignore_index=True)
+    order = _order_columns(cells)
+    keys = [column for column in cells.columns if column not in order and column not in _transit_columns(cells)]
+
+    cells = cells.sort_values(order, kind="stable")
+    aggregations = {column: (column, "sum") for column in _transit_columns(cells)}
+    aggregations.update({column: (column, "first") for column in order})
+    cells = cells.groupby(keys, sort=False, dropna=False).agg(**aggregations).reset_index()
+    lengths = lengths.groupby(keys[:-2], sort=False).agg(
+        Length_Sum=("Length_Sum", "sum"), Length_Count=("Length_Count", "sum"), Length_Max=("Length_Max", "max")).reset_index()
+    return Partial(cells, lengths)
+
+
+## Max/mean length table of a partial, in the form SimplifySummary takes as LengthStats
+def PartialLengthStats(partial):
+    lengths = partial.lengths
+    keys = [column for column in lengths.columns if not column.startswith("Length_")]
+    stats = pd.DataFrame({
+        "max": lengths["Length_Max"].to_numpy(),
+        "mean": LengthMean(lengths["Length_Sum"], lengths["Length_Count"]),
+    }, index=pd.MultiIndex.from_frame(lengths[keys]) if len(keys) > 1 else pd.Index(lengths[keys[0]]))
+    return stats
+
+
+## Turn a (merged) partial into the summary tables: the line x vessel type table, and the simplified table when
+## Simplified is "true". Period is the period setting the partials were labelled with, if any. Sketched, the merged
+## CellSketches of the same rows, takes the unique vessels from the sketches (see SketchedUniqueVessels and
+## SketchedUniqueTotal), for partials whose MMSI sets were not kept. Partials with Transits_<label> columns add the
+## per-direction columns of SummarizeTransits.
+def PartialSummary(partial, Simplified="false", CustomName="", CustomTypes=None, Categories=None, Period=None, LengthField="Length", Sketched=None):
+    cells = partial.cells.sort_values(_order_columns(partial.cells), kind="stable").reset_index(drop=True)
+    PeriodField = None
+    if PERIOD_FIELD in cells.columns:
+        PeriodField = PERIOD_FIELD
+        periods = CompletePeriods(cells[PERIOD_FIELD], Period)
+        cells[PERIOD_FIELD] = pd.Categorical(cells[PERIOD_FIELD], categories=periods, ordered=True)
+    directions = {column[len("Transits_"):]: column for column in _transit_columns(cells) if column != "Transits"}
+    new_df = SummarizeTransits(cells, "Name", "Vessel_Type", "MMSI", CountField="Transits", PeriodField=PeriodField, DirectionFields=directions or None)
+    if Sketched is not None:
+        new_df = SketchedUniqueVessels(new_df, Sketched, PeriodField)
+    if Simplified != "true":
+        return new_df
+    Passage_line_df = SimplifySummary(new_df, None, "Name", LengthField, CustomName, CustomTypes, Categories, PeriodField, PartialLengthStats(partial))
+    if Sketched is not None:
+        Passage_line_df = SketchedUniqueTotal(Passage_line_df, Sketched, PeriodField)
+    return Passage_line_df
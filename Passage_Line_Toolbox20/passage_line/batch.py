@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .aggregate import MergePartials, PartialAggregate, PartialSummary
+from .engine import IntersectTracks
+from .loader import LoadColumns, SummaryFields
+from .periods import PERIOD_FIELD, PeriodKeys
+from .readers import ReadFeatures
+
+
+## Expand a list of paths and/or glob patterns into a sorted list of datasets, duplicates removed. A single string is
+## treated as one pattern (or one path).
+def ExpandDatasets(datasets):
+    if isinstance(datasets, (str, os.PathLike)):
+        datasets = [datasets]
+    paths = []
+    for dataset in datasets:
+        matches = sorted(glob.glob(str(dataset))) if glob.has_magic(str(dataset)) else [str(dataset)]
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+
+## Partial aggregate of one crossing table (one row per track and passage line pair, like the intersect output or the
+## spatial join CSVs of the aggregate_many notebook). CountField holds the interactions per row; without it every row
+## counts as one transit. Rows are ordered by (dataset number, row number) so merged tables follow the dataset order.
+def DatasetPartial(index, path, NameField, VesselTypes, MMSI, LengthField="", CountField="", DateField="", Period=None):
+    fields = SummaryFields(NameField, VesselTypes, MMSI, LengthField, DateField, CountField)
+    temp_out_df = LoadColumns(path, fields, dates=[DateField] if DateField else ())
+    temp_out_df["ORIG_FID_CALC"] = temp_out_df[CountField] if CountField else 1
+    temp_out_df["Dataset"] = index
+    temp_out_df["Row"] = np.arange(len(temp_out_df))
+    PeriodField = None
+    if DateField and Period:
+        PeriodField = PERIOD_FIELD
+        temp_out_df[PeriodField] = PeriodKeys(temp_out_df[DateField], Period)
+    return PartialAggregate(temp_out_df, NameField, VesselTypes, MMSI, LengthField, PeriodField, OrderFields=("Dataset", "Row"))
+
+
+## Partial aggregate of one raw track dataset (GeoParquet, GeoJSON, CSV-WKT or a feature class, see ReadFeatures):
+## the tracks are read, intersected with the passage lines (lines, LineTable and shape_type of ReadFeatures) on the
+## NumPy engine and reduced to a partial, so only the partial leaves the worker. Rows are ordered by (dataset number,
+## track id, passage line id).
+def TrackDatasetPartial(index, path, lines, LineTable, shape_type, NameField, VesselTypes, MMSI, LengthField="", DateField="", Period=None,
+                        GeometryField="WKT", MultipleInt="true", Prefilter=True, PrefilterTolerance=0.0):
+    tracks, TrackTable = ReadFeatures(path, SummaryFields(MMSI, VesselTypes, LengthField, DateField), GeometryField)[:2]
+    temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable, MultipleInt, shape_type == "Polygon", Prefilter, PrefilterTolerance)
+    temp_out_df["Dataset"] = index
+    PeriodField = None
+    if DateField and Period:
+        PeriodField = PERIOD_FIELD
+        temp_out_df[PeriodField] = PeriodKeys(temp_out_df[DateField], Period)
+    return PartialAggregate(temp_out_df, NameField, VesselTypes, MMSI, LengthField, PeriodField, OrderFields=("Dataset", "Track_ID", "Line_ID"))
+
+
+## Save a partial so runs over different files or months can be merged later
+def SavePartial(partial, path):
+    pd.to_pickle(partial, path)
+
+
+def LoadPartial(path):
+    return pd.read_pickle(path)
+
+
+## Summarize many datasets at once. Every dataset is reduced to its partial in its own process (Workers), the
+## partials are merged in dataset order and the summary is built from the merged partial. Unique vessels are counted
+## from the merged MMSI sets, so a vessel seen in several files is one vessel, not one per file.
+## Without PassageLines the datasets are crossing tables (DatasetPartial). With PassageLines they are raw track
+## datasets, each read and intersected with the passage lines in its worker (TrackDatasetPartial; GeometryField,
+## MultipleInt and the prefilter options as in RunSummary, CountField is not used).
+## Partials already saved with SavePartial can be added through Partials. Returns the merged partial and the table.
+def BatchSummary(datasets, NameField, VesselTypes, MMSI, LengthField="", CountField="", DateField="", Period=None, Simplified="false",
+                 CustomName="", CustomTypes=None, Categories=None, Workers=None, Partials=(), PassageLines=None, GeometryField="WKT",
+                 MultipleInt="true", Prefilter=True, PrefilterTolerance=0.0):
+    paths = ExpandDatasets(datasets) if datasets else []
+    if PassageLines is not None:
+        lines, LineTable, shape_type = ReadFeatures(PassageLines, [NameField], GeometryField)
+        task = TrackDatasetPartial
+        jobs = [(index, path, lines, LineTable, shape_type, NameField, VesselTypes, MMSI, LengthField, DateField, Period, GeometryField,
+                 MultipleInt, Prefilter, PrefilterTolerance) for index, path in enumerate(paths)]
+    else:
+        task = DatasetPartial
+        jobs = [(index, path, NameField, VesselTypes, MMSI, LengthField, CountField, DateField, Period) for index, path in enumerate(paths)]
+    Workers = min(Workers or os.cpu_count() or 1, max(len(jobs), 1))
+    if Workers == 1:
+        partials = [task(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=Workers) as executor:
+            partials = list(executor.map(task, *zip(*jobs)))
+    partials.extend(LoadPartial(partial) if isinstance(partial, (str, os.PathLike)) else partial for partial in Partials)
+    if not partials:
+        raise ValueError("No datasets or partials to summarize")
+    merged = MergePartials(partials)
+    return merged, PartialSummary(merged, Simplified, CustomName, CustomTypes, Categories, Period, LengthField)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from .compact import CompactCrossings, LoadCompact, SaveCompact
+from .loader import FILE_EXTENSIONS
+
+## default eviction limits of a cache folder: total size and age since an entry was last used
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+CACHE_MAX_AGE = 30 * 24 * 3600
+
+## layout version of the cache entries, part of every key so entries written by an older layout are never read and
+## age out (2: compact crossing tables)
+CACHE_VERSION = 2
+
+## field types left out of the attribute hash (the geometry is hashed as WKB)
+_SKIP_TYPES = ("Geometry", "OID", "Blob", "Raster")
+
+
+## Fingerprint of a file: path, size and modification time, and with Hash a hash of the content
+def _file_fingerprint(source, Hash=False):
+    stat = os.stat(source)
+    fingerprint = {"path": os.path.abspath(source), "size": stat.st_size, "modified": stat.st_mtime_ns}
+    if Hash:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        fingerprint["hash"] = digest.hexdigest()
+    return fingerprint
+
+
+## Modification time of a dataset's files: the file itself, the newest file of a folder (shapefile folder, file
+## geodatabase) or, for a feature class inside a geodatabase, the newest file of the geodatabase
+def _modified(path):
+    while path and not os.path.exists(path):
+        parent = os.path.dirname(path)
+        path = parent if parent != path else ""
+    if not path:
+        return None
+    if os.path.isdir(path):
+        return max((os.stat(os.path.join(path, name)).st_mtime_ns for name in os.listdir(path) if os.path.isfile(os.path.join(path, name))),
+                   default=os.stat(path).st_mtime_ns)
+    return os.stat(path).st_mtime_ns
+
+
+## Fingerprint of a feature class or layer from metadata only: catalog path, feature count (GetCount, a layer's
+## definition query and selection apply like in the intersect), extent, modification time of the data, the schema and
+## a layer's query and selection. Hash adds a hash of every feature's OID, WKB geometry and attributes, a full scan of
+## the data that catches edits the metadata can miss (an edit that keeps the count and extent of an enterprise table).
+def _arcpy_fingerprint(source, Hash=False):
+    import arcpy
+
+    descp = arcpy.Describe(source)
+    path = getattr(descp, "catalogPath", str(source))
+    extent = descp.extent
+    fields = arcpy.ListFields(source)
+    fingerprint = {"path": path, "count": int(arcpy.management.GetCount(source)[0]),
+                   "extent": [extent.XMin, extent.YMin, extent.XMax, extent.YMax], "modified": _modified(path),
+                   "schema": [[field.name, field.type, field.length] for field in fields],
+                   "query": getattr(descp, "whereClause", ""),
+                   "selection": hashlib.blake2b(str(getattr(descp, "FIDSet", "")).encode("utf-8"), digest_size=16).hexdigest()}
+    if Hash:
+        digest = hashlib.blake2b(digest_size=16)
+        with arcpy.da.SearchCursor(source, ["OID@", "SHAPE@WKB"] + [field.name for field in fields if field.type not in _SKIP_TYPES]) as cursor:
+            for row in cursor:
+                digest.update(repr((row[0], row[2:])).encode("utf-8"))
+                digest.update(bytes(row[1] or b""))
+        fingerprint["hash"] = digest.hexdigest()
+    return fingerprint
+
+
+## Fingerprint of an input dataset, files (.parquet/.csv...) by path, size and modification time and anything else
+## through arcpy metadata (see _arcpy_fingerprint). Hash adds a hash of the content, which reads the whole dataset.
+def DatasetFingerprint(source, Hash=False):
+    if os.path.splitext(str(source))[1].lower() in FILE_EXTENSIONS and os.path.isfile(str(source)):
+        return _file_fingerprint(str(source), Hash)
+    return _arcpy_fingerprint(source, Hash)
+
+
+## Cache key of a set of fingerprints and options, anything that changes the crossing records must be in parts
+def CacheKey(*parts):
+    return hashlib.sha256(json.dumps([CACHE_VERSION, parts], sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+
+
+## Crossing tables of a cache entry (dict by name of DataFrames and memory-mapped compact tables, see LoadCompact), or
+## None if the key isn't cached. A hit marks the entry as used so eviction by age keeps it.
+def LoadCrossings(CacheFolder, key):
+    entry = os.path.join(CacheFolder, key)
+    if not os.path.isdir(entry):
+        return None
+    frames = {}
+    for name in sorted(os.listdir(entry)):
+        path = os.path.join(entry, name)
+        frames[os.path.splitext(name)[0]] = LoadCompact(path) if os.path.isdir(path) else pd.read_parquet(path)
+    os.utime(entry)
+    return frames
+
+
+## Save crossing tables under a cache key, one Parquet file per DataFrame and one folder per compact table
+## (SaveCompact). The entry is written to a temporary folder and renamed, so an interrupted or failed run never leaves
+## a half written entry behind.
+def SaveCrossings(CacheFolder, key, **frames):
+    os.makedirs(CacheFolder, exist_ok=True)
+    entry = os.path.join(CacheFolder, key)
+    temp = f"{entry}.{os.getpid()}.tmp"
+    shutil.rmtree(temp, ignore_errors=True)
+    os.makedirs(temp)
+    try:
+        for name, frame in frames.items():
+            if isinstance(frame, CompactCrossings):
+                SaveCompact(frame, os.path.join(temp, name))
+            else:
+                frame.to_parquet(os.path.join(temp, f"{name}.parquet"), index=False)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(temp, entry)
+    except BaseException:
+        shutil.rmtree(temp, ignore_errors=True)
+        raise
+    return entry
+
+
+## Bytes of a cache entry, compact table folders included
+def _entry_bytes(entry):
+    return sum(os.path.getsize(os.path.join(folder, file)) for folder, _, files in os.walk(entry) for file in files)
+
+
+## Remove cache entries unused for more than MaxAge seconds, then the least recently used ones until the folder holds
+## at most MaxBytes. Returns the number of entries removed.
+def EvictCache(CacheFolder, MaxBytes=CACHE_MAX_BYTES, MaxAge=CACHE_MAX_AGE):
+    if not os.path.isdir(CacheFolder):
+        return 0
+    entries = []
+    for name in os.listdir(CacheFolder):
+        entry = os.path.join(CacheFolder, name)
+        if os.path.isdir(entry) and not name.endswith(".tmp"):
+            size = _entry_bytes(entry)
+            entries.append((os.path.getmtime(entry), size, entry))
+    entries.sort()
+    now = time.time()
+    total = sum(size for used, size, entry in entries)
+    removed = 0
+    for used, size, entry in entries:
+        if (MaxAge is not None and now - used > MaxAge) or (MaxBytes is not None and total > MaxBytes):
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed += 1
+    return removed
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import json
+import re
+import numpy as np
+import pandas as pd
+
+## Default simplified vessel categories, in output column order. Each entry is (category name, vessel type codes).
+## A code belongs to the first category that lists it; everything not listed falls into "Other".
+DEFAULT_CATEGORIES = [
+    ("Fishing", [30]),
+    ("Tug_Tow", [31, 32, 52]),
+    ("Recreational", [36, 37]),
+    ("Mil_LE", [35, 55]),
+    ("Pilots", [50]),
+    ("Passenger", list(range(60, 70))),
+    ("Cargo", list(range(70, 80))),
+    ("Tanker", list(range(80, 90))),
+]
+
+OTHER = "Other"
+
+
+## Expand a list of codes that may contain "60-69" style ranges into integers
+def _expand_codes(codes):
+    expanded = []
+    for code in codes:
+        if isinstance(code, str) and "-" in code.strip()[1:]:
+            start, end = code.strip().split("-", 1)
+            expanded.extend(range(int(start), int(end) + 1))
+        else:
+            expanded.append(int(code))
+    return expanded
+
+
+## Codes of one category of a scheme file: whole numbers and "60-69" style ranges only, anything else is unknown
+def _scheme_codes(name, codes):
+    codes = codes if isinstance(codes, list) else [codes]
+    for code in codes:
+        match = re.fullmatch(r"(\d+)(?:\s*-\s*(\d+))?", str(code).strip())
+        if isinstance(code, bool) or match is None or (match.group(2) is not None and int(match.group(2)) < int(match.group(1))):
+            raise ValueError(f"Unknown vessel type code {code!r} in category {name}")
+    return _expand_codes(codes)
+
+
+## Read a user category scheme from a JSON file, i.e. {"Fishing": [30], "Passenger": ["60-69"], ...}.
+## Keys keep their file order, which is also the output column order. Unknown codes (see _scheme_codes), a code listed
+## under two categories and a category named twice or after the Other/Total columns raise a ValueError.
+def LoadCategoryScheme(path):
+    with open(path, "r", encoding="utf-8") as f:
+        scheme = json.load(f)
+    if isinstance(scheme, dict):
+        scheme = list(scheme.items())
+    categories = []
+    owners = {}
+    for name, codes in scheme:
+        name = str(name)
+        if name in (OTHER, "Total") or name in [category for category, category_codes in categories]:
+            raise ValueError(f"Category {name} is reserved or listed twice")
+        codes = _scheme_codes(name, codes)
+        for code in codes:
+            if owners.setdefault(code, name) != name:
+                raise ValueError(f"Vessel type code {code} is listed under both {owners[code]} and {name}")
+        categories.append((name, codes))
+    return categories
+
+
+## Overlay the optional custom category on the scheme. Custom codes that already belong to a category stay there,
+## the same as the custom category sitting at the end of the original if/elif ladder.
+def BuildCategoryScheme(Categories=None, CustomName="", CustomTypes=None):
+    if Categories is None:
+        Categories = DEFAULT_CATEGORIES
+    elif isinstance(Categories, str):
+        Categories = LoadCategoryScheme(Categories)
+    scheme = [(name, _expand_codes(codes)) for name, codes in Categories]
+    if CustomName and CustomTypes:
+        scheme.append((CustomName, _expand_codes(CustomTypes)))
+    return scheme
+
+
+## Build the type code -> category index lookup array. Index len(scheme) is "Other".
+def CategoryLookup(scheme):
+    other = len(scheme)
+    codes = [code for name, cat_codes in scheme for code in cat_codes if code >= 0]
+    lookup = np.full(max(codes, default=-1) + 1, other, dtype="int32")
+    for index in range(len(scheme) - 1, -1, -1):
+        cat_codes = np.asarray([code for code in scheme[index][1] if code >= 0], dtype="int64")
+        lookup[cat_codes] = index
+    return lookup
+
+
+## Map vessel type values to category indices. Missing, non-integer or unlisted codes get the "Other" index.
+def ClassifyVesselTypes(vessel_types, lookup, other):
+    values = pd.to_numeric(pd.Series(vessel_types), errors="coerce").to_numpy(dtype="float64")
+    in_table = np.isfinite(values) & (values >= 0) & (values < len(lookup)) & (np.floor(values) == values)
+    categories = np.full(len(values), other, dtype="int32")
+    categories[in_table] = lookup[values[in_table].astype("int64")]
+    return categories
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .aggregate import MergePartials, PartialAggregate, PartialSummary
+from .crossings import SubsetPaths
+from .engine import IntersectTracks
+from .lengths import CategoryLengthSketches, LengthDistribution, MergeLengthSketches
+from .loader import _line_count
+from .periods import CompletePeriods, DateWindow, PERIOD_FIELD, PeriodKeys
+from .readers import GEOMETRY_EXTENSIONS, ReadFeatureBatches
+from .sketches import CellSketches, MergeSketches
+from .summary import DIRECTION_FIELDS
+
+## working bytes per track vertex of one batch: segment arrays, grid candidates and the joined intersect rows
+_VERTEX_BYTES = 800
+## cells the pending batch partials may hold before they are merged, when the merged partial is still smaller
+_MIN_PENDING_CELLS = 100000
+## in-memory bytes per feature read through an arcpy search cursor (points as Python objects), sizes cursor batches
+_CURSOR_FEATURE_BYTES = 100000
+## in-memory size of a feature over its size in a GeoParquet/CSV file (decompression, parsing, crossing working set)
+_FILE_EXPANSION = 10
+
+## Running aggregates of a chunked run, everything that is kept between batches.
+## partial: merged partial (transit sums and lengths per cell; exact MMSI sets in mode "exact", none in mode "sketch")
+## sketches: merged unique vessel sketches per ([Period,] Name, Vessel_Type) cell in mode "sketch", else None
+## lengths: merged length sketch per ([Period,] Name, Category) when a length table is wanted, else None
+## batches: number of batches folded in
+## pending: (partial, sketches, lengths) of the batches folded in since the last merge (see FlushRunning)
+Running = namedtuple("Running", ["partial", "sketches", "lengths", "batches", "pending"], defaults=[()])
+
+
+## Split in-memory tracks into batches of at most about MemoryMB of working memory each (by vertex count, in track id
+## order so the folded result keeps the serial row order). BatchSize fixes the number of tracks per batch instead.
+def TrackBatches(tracks, TrackTable, MemoryMB=1024, BatchSize=None):
+    order = np.argsort(tracks.ids, kind="stable")
+    if BatchSize:
+        groups = [order[start:start + BatchSize] for start in range(0, len(order), BatchSize)]
+    else:
+        n_vertices = np.bincount(tracks.feature, weights=np.diff(tracks.offsets), minlength=len(tracks.ids))[order]
+        budget = max(MemoryMB * 1024 ** 2 / _VERTEX_BYTES, 1)
+        groups = np.split(order, np.flatnonzero(np.diff(np.floor((np.cumsum(n_vertices) - n_vertices) / budget))) + 1) if len(order) else []
+    for group in groups:
+        keep = np.zeros(len(tracks.ids), dtype=bool)
+        keep[group] = True
+        subset = SubsetPaths(tracks, keep)
+        yield subset, TrackTable.reindex(subset.ids)
+
+
+## Features per batch so a batch of a track dataset fits in about MemoryMB: from the file size per row for GeoParquet,
+## CSV-WKT and GeoJSON files (rows counted from the footer, the lines or the geometry members), from
+## _CURSOR_FEATURE_BYTES for feature classes
+def FileBatchRows(source, MemoryMB=1024):
+    kind = GEOMETRY_EXTENSIONS.get(os.path.splitext(str(source))[1].lower())
+    if kind == "geoparquet":
+        import pyarrow.parquet as pq
+        rows = pq.ParquetFile(source).metadata.num_rows
+    elif kind == "wkt":
+        rows = max(_line_count(source) - 1, 1)
+    elif kind == "geojson":
+        with open(source, "rb") as f:
+            rows = max(sum(chunk.count(b'"geometry"') for chunk in iter(lambda: f.read(1 << 20), b"")), 1)
+    else:
+        return max(1, int(MemoryMB * 1024 ** 2 / _CURSOR_FEATURE_BYTES))
+    row_bytes = os.path.getsize(source) / max(rows, 1) * _FILE_EXPANSION
+    return max(1, int(MemoryMB * 1024 ** 2 / max(row_bytes, 1)))
+
+
+## Track batches of any track dataset (GeoParquet, CSV-WKT, GeoJSON or a feature class, see ReadFeatureBatches) read
+## FileBatchRows features at a time, with an optional date window on each and every read batch cut into batches of
+## about MemoryMB by vertex count (TrackBatches), so no input is ever read or intersected whole
+def FileTrackBatches(source, fields, GeometryField="WKT", MemoryMB=1024, DateField="", StartInterval="", EndInterval=""):
+    for tracks, TrackTable, shape_type in ReadFeatureBatches(source, fields, GeometryField, FileBatchRows(source, MemoryMB)):
+        if DateField and (StartInterval or EndInterval):
+            keep = DateWindow(TrackTable[DateField], StartInterval, EndInterval)
+            tracks, TrackTable = SubsetPaths(tracks, keep), TrackTable[keep]
+        yield from TrackBatches(tracks, TrackTable, MemoryMB)
+
+
+## Merge of the aggregates that are there (not None), the aggregate itself when there is only one
+def _merge(merge, items):
+    items = [item for item in items if item is not None]
+    return merge(items) if len(items) > 1 else (items[0] if items else None)
+
+
+## Merge the pending batches into the running aggregates
+def FlushRunning(running):
+    if not running.pending:
+        return running
+    partials, sketches, lengths = zip(*running.pending)
+    return Running(_merge(MergePartials, (running.partial,) + partials), _merge(MergeSketches, (running.sketches,) + sketches),
+                   _merge(MergeLengthSketches, (running.lengths,) + lengths), running.batches, ())
+
+
+## Fold one batch into the running aggregates and drop it. In mode "sketch" the vessels go into the sketches only, so
+## the partial holds one row per cell whatever the number of vessels. The batch aggregates are kept pending and merged
+## once they hold as many cells as the merged partial (at least _MIN_PENDING_CELLS), so every cell is re-merged a
+## logarithmic number of times instead of once per batch. Directions keeps the per-direction transits of passage lines;
+## their unique vessels need the MMSI sets of mode "exact".
+def FoldBatch(running, tracks, TrackTable, lines, LineTable, NameField, VesselTypes, MMSI, LengthField="", MultipleInt="true", Polygon=False,
+              DateField="", Period=None, Mode="exact", precision=12, LengthOutput=False, CustomName="", CustomTypes=None, Categories=None,
+              Prefilter=True, PrefilterTolerance=0.0, Directions=False):
+    if Directions and Mode != "exact":
+        raise ValueError("Per-direction unique vessels of chunked runs need exact unique vessel counts")
+    temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable, MultipleInt, Polygon, Prefilter, PrefilterTolerance)
+    PeriodField = None
+    if DateField and Period:
+        PeriodField = PERIOD_FIELD
+        temp_out_df[PeriodField] = PeriodKeys(temp_out_df[DateField], Period)
+
+    sketch = lengths = None
+    if LengthOutput and LengthField:
+        lengths = CategoryLengthSketches(temp_out_df, NameField, LengthField, VesselTypes, PeriodField, CustomName, CustomTypes, Categories)
+    if Mode == "sketch":
+        sketch = CellSketches(temp_out_df, NameField, VesselTypes, MMSI, PeriodField, precision)
+        temp_out_df[MMSI] = 0
+    elif Mode != "exact":
+        raise ValueError(f"Unknown unique vessel mode: {Mode}")
+
+    partial = PartialAggregate(temp_out_df, NameField, VesselTypes, MMSI, LengthField, PeriodField, OrderFields=("Track_ID", "Line_ID"),
+                               DirectionFields=DIRECTION_FIELDS if Directions and not Polygon else None)
+    running = running._replace(batches=running.batches + 1, pending=tuple(running.pending) + ((partial, sketch, lengths),))
+    merged = len(running.partial.cells) if running.partial is not None else 0
+    if sum(len(pending[0].cells) for pending in running.pending) >= max(merged, _MIN_PENDING_CELLS):
+        running = FlushRunning(running)
+    return running
+
+
+## Summary tables of the running aggregates. Mode "exact" gives the tables of the in-memory run; mode "sketch" takes
+## the unique vessel counts from the sketches: per-type estimates summed into the categories (SketchedUniqueVessels)
+## and Unique_Total from the union of the types (SketchedUniqueTotal), with Low/High bounds.
+def RunningSummary(running, NameField, Simplified="false", CustomName="", CustomTypes=None, Categories=None, Period=None, LengthField="",
+                   LengthOutput=False, Mode="exact"):
+    running = FlushRunning(running)
+    if running.partial is None:
+        raise ValueError("No track batches were folded in")
+    Sketched = running.sketches if Mode == "sketch" else None
+    table = PartialSummary(running.partial, Simplified, CustomName, CustomTypes, Categories, Period, LengthField, Sketched)
+    PeriodField = PERIOD_FIELD if PERIOD_FIELD in running.partial.cells.columns else None
+    lengths = None
+    if LengthOutput and running.lengths is not None:
+        periods = None
+        if PeriodField:
+            periods = pd.DataFrame({PeriodField: pd.Categorical([], categories=CompletePeriods(running.partial.cells[PeriodField], Period), ordered=True)})
+        lengths = LengthDistribution(periods, NameField, LengthField, None, PeriodField, CustomName, CustomTypes, Categories, Sketch=running.lengths)
+    return table, lengths
+
+
+## Chunked run with bounded memory: every batch of tracks (TrackBatches, FileTrackBatches or StreamTracks) is
+## intersected, folded into the running per-([period,] line, type) transit sums, MMSI sets or sketches and length stats,
+## and dropped, so peak memory is set by the batch size and not by the size of the whole intersect table. Mode "exact"
+## gives the same tables as the in-memory run, with the per-direction columns when Directions is set. Returns the
+## running aggregates, the summary table and the length table (None unless LengthOutput).
+def ChunkedSummary(batches, lines, LineTable, NameField, VesselTypes, MMSI, LengthField="", MultipleInt="true", Polygon=False,
+                   Simplified="false", CustomName="", CustomTypes=None, Categories=None, DateField="", Period=None, Mode="exact",
+                   precision=12, LengthOutput=False, Prefilter=True, PrefilterTolerance=0.0, Message=None, Directions=False):
+    running = Running(None, None, None, 0)
+    for tracks, TrackTable in batches:
+        running = FoldBatch(running, tracks, TrackTable, lines, LineTable, NameField, VesselTypes, MMSI, LengthField, MultipleInt, Polygon,
+                            DateField, Period, Mode, precision, LengthOutput, CustomName, CustomTypes, Categories, Prefilter, PrefilterTolerance,
+                            Directions)
+        if Message:
+            cells = (len(running.partial.cells) if running.partial is not None else 0) + sum(len(pending[0].cells) for pending in running.pending)
+            Message(f"Folded batch {running.batches} ({len(tracks.ids)} tracks, {cells} running cells)...")
+    running = FlushRunning(running)
+    table, lengths = RunningSummary(running, NameField, Simplified, CustomName, CustomTypes, Categories, Period, LengthField, LengthOutput, Mode)
+    return running, table, lengths
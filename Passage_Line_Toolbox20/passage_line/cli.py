@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import os
+
+from .chunked import ChunkedSummary, FileTrackBatches
+from .corridors import CorridorMatrix
+from .crossings import FindCrossings, SubsetPaths
+from .engine import IntersectTracks
+from .instrument import Instruments, STAGES
+from .lengths import LengthDistribution
+from .loader import SummaryFields
+from .periods import DateWindow, PERIOD_FIELD, PeriodKeys
+from .readers import ReadFeatures
+from .sketches import CellSketches, SketchedUniqueTotal, SketchedUniqueVessels
+from .summary import DIRECTION_FIELDS, SimplifySummary, SplitPeriods, SummarizeTransits
+from .visits import DwellSummary, PairVisits
+from .writer import PeriodName, WriteSummary
+
+
+## Headless Passage Line Summary on the NumPy engine, the same tables as the toolbox without ArcGIS. TrackLines and
+## PassageLines are GeoParquet, GeoJSON or CSV-WKT files (see ReadFeatures); arcpy is only imported for feature class
+## inputs or geodatabase outputs. Options follow the toolbox parameters; Directions adds the per-direction columns for
+## passage lines. Messages go to Message. Returns the summary table.
+## MemoryMB runs the summary in chunks (ChunkedSummary): the tracks are read and intersected in batches of about
+## MemoryMB each and folded into running totals, for track files too large for memory. The tables are the same as the
+## in-memory run. Unique="sketch" counts the unique vessels with HyperLogLog sketches of Precision instead of exact MMSI
+## sets, in memory or chunked (see SketchedUniqueVessels and SketchedUniqueTotal).
+## CorridorOutput writes the passage line corridor table (see CorridorMatrix), in crossing time order with CorridorOrder.
+## DwellOutput writes the visits and dwell table of polygon areas (see DwellSummary), with dwell times when TrackStartField
+## and TrackEndField name the start and end dates of every track. Chunked runs don't give the dwell table.
+def RunSummary(TrackLines, PassageLines, NameField, VesselTypes, MMSI, OutputName, LengthField="", MultipleInt="true", Simplified="false",
+               CustomName="", CustomTypes=None, Categories=None, DateField="", StartInterval="", EndInterval="", Period="",
+               PeriodOutput="Single table", LengthOutput="", Directions=False, Prefilter=True, PrefilterTolerance=0.0, GeometryField="WKT",
+               RunReport="", ProfileStage="", Message=print, MemoryMB=None, Unique="exact", CorridorOutput="", CorridorOrder=False, Precision=12,
+               DwellOutput="", TrackStartField="", TrackEndField=""):
+    if Unique not in ("exact", "sketch"):
+        raise ValueError(f"Unknown unique vessel mode: {Unique}")
+    instruments = Instruments(bool(RunReport or ProfileStage), Message, ProfileStage,
+                              f"{os.path.splitext(RunReport)[0] or 'PassageLineSummary'}_{ProfileStage}.prof")
+
+    with instruments.stage("load") as record:
+        lines, LineTable, shape_type = ReadFeatures(PassageLines, [NameField], GeometryField)
+        if not MemoryMB:
+            fields = SummaryFields(MMSI, VesselTypes, LengthField, DateField, *((TrackStartField, TrackEndField) if DwellOutput else ()))
+            tracks, TrackTable = ReadFeatures(TrackLines, fields, GeometryField)[:2]
+            record["rows_out"] = len(tracks.ids)
+    if DwellOutput and shape_type != "Polygon":
+        raise ValueError("The dwell table needs polygon areas")
+    if MemoryMB:
+        if DwellOutput:
+            raise ValueError("The dwell table is not available in chunked runs")
+        return _chunked_summary(TrackLines, PassageLines, lines, LineTable, shape_type, NameField, VesselTypes, MMSI, OutputName, LengthField,
+                                MultipleInt, Simplified, CustomName, CustomTypes, Categories, DateField, StartInterval, EndInterval, Period,
+                                PeriodOutput, LengthOutput, Directions, Prefilter, PrefilterTolerance, GeometryField, RunReport, Message,
+                                MemoryMB, Unique, CorridorOutput, CorridorOrder, Precision, instruments)
+    Message(f"Passage line input: {len(lines.ids)} items...")
+    Message(f"Track line input: {len(tracks.ids)} items...")
+    Polygon = shape_type == "Polygon"
+
+    if DateField and (StartInterval or EndInterval):
+        keep = DateWindow(TrackTable[DateField], StartInterval, EndInterval)
+        tracks, TrackTable = SubsetPaths(tracks, keep), TrackTable[keep]
+        Message(f"Running summary for data within the interval {StartInterval} to {EndInterval}: {len(tracks.ids)} items...")
+
+    with instruments.stage("geometry", len(tracks.ids)) as record:
+        temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable, MultipleInt, Polygon, Prefilter, PrefilterTolerance)
+        record["rows_out"] = len(temp_out_df)
+    Message(f"Found {temp_out_df['ORIG_FID_CALC'].sum()} interactions...")
+
+    PeriodField = None
+    if DateField and Period:
+        PeriodField = PERIOD_FIELD
+        temp_out_df[PeriodField] = PeriodKeys(temp_out_df[DateField], Period)
+        Message(f"Summarizing by period: {Period}...")
+
+    with instruments.stage("summary", len(temp_out_df)) as record:
+        new_df = SummarizeTransits(temp_out_df, NameField, VesselTypes, MMSI, PeriodField=PeriodField,
+                                   DirectionFields=DIRECTION_FIELDS if Directions and not Polygon else None)
+        Sketched = None
+        if Unique == "sketch":
+            Sketched = CellSketches(temp_out_df, NameField, VesselTypes, MMSI, PeriodField, Precision)
+            new_df = SketchedUniqueVessels(new_df, Sketched, PeriodField)
+        record["rows_out"] = len(new_df)
+
+    Passage_line_df = new_df
+    if Simplified == "true":
+        with instruments.stage("simplified", len(new_df)) as record:
+            Passage_line_df = SimplifySummary(new_df, temp_out_df, NameField, LengthField, CustomName, CustomTypes, Categories, PeriodField)
+            if Sketched is not None:
+                Passage_line_df = SketchedUniqueTotal(Passage_line_df, Sketched, PeriodField)
+            record["rows_out"] = len(Passage_line_df)
+
+    with instruments.stage("output", len(Passage_line_df)):
+        lengths = None
+        if LengthOutput and LengthField:
+            lengths = LengthDistribution(temp_out_df, NameField, LengthField, VesselTypes, PeriodField, CustomName, CustomTypes, Categories)
+        _write_outputs(Passage_line_df, lengths, OutputName, LengthOutput, PeriodField, PeriodOutput, Message)
+        if CorridorOutput:
+            corridors = CorridorMatrix(temp_out_df, NameField, VesselTypes, MMSI, CustomName, CustomTypes, Categories, _corridor_order(DateField, CorridorOrder))
+            Message(f"Corridor table written to {WriteSummary(corridors, CorridorOutput)}")
+        if DwellOutput:
+            visits = PairVisits(FindCrossings(tracks, lines), tracks, lines, TrackTable, TrackStartField, TrackEndField)
+            dwell = DwellSummary(visits, TrackTable, LineTable, NameField, VesselTypes, MMSI, CustomName, CustomTypes, Categories)
+            Message(f"Dwell table written to {WriteSummary(dwell, DwellOutput)}")
+
+    if RunReport:
+        instruments.report(RunReport, TrackLines=str(TrackLines), PassageLines=str(PassageLines), ShapeType=shape_type, MultipleInt=MultipleInt,
+                           Simplified=Simplified, Period=Period, Prefilter=Prefilter, Unique=Unique)
+        Message(f"Run report written to {RunReport}")
+    return Passage_line_df
+
+
+## Crossing order of the corridor table: the track date orders the tracks, as the toolbox orders them, and within one
+## track the crossings follow where they lie along it. First_Position only compares crossings of the same track, so
+## the track id comes before it (the order ranks are only compared within a vessel, see CorridorMatrix).
+def _corridor_order(DateField, CorridorOrder):
+    if not CorridorOrder:
+        return None
+    if not DateField:
+        raise ValueError("Ordering the corridor table by crossing time needs a date field")
+    return [DateField, "Track_ID", "First_Position"]
+
+
+## Write the summary table(s) and the length table of a run
+def _write_outputs(Passage_line_df, lengths, OutputName, LengthOutput, PeriodField, PeriodOutput, Message):
+    if PeriodField and PeriodOutput == "Table per period":
+        for period, period_df in SplitPeriods(Passage_line_df).items():
+            Message(f"Output written to {WriteSummary(period_df, PeriodName(OutputName, period))}")
+    else:
+        Message(f"Output written to {WriteSummary(Passage_line_df, OutputName)}")
+    if lengths is not None:
+        Message(f"Length distribution written to {WriteSummary(lengths, LengthOutput)}")
+
+
+## Chunked RunSummary: the tracks (any input, see FileTrackBatches) are read in batches sized to MemoryMB, each batch
+## is intersected and folded into the running aggregates and dropped
+def _chunked_summary(TrackLines, PassageLines, lines, LineTable, shape_type, NameField, VesselTypes, MMSI, OutputName, LengthField, MultipleInt,
+                     Simplified, CustomName, CustomTypes, Categories, DateField, StartInterval, EndInterval, Period, PeriodOutput, LengthOutput,
+                     Directions, Prefilter, PrefilterTolerance, GeometryField, RunReport, Message, MemoryMB, Unique, CorridorOutput, CorridorOrder,
+                     Precision, instruments):
+    if CorridorOutput and (CorridorOrder or Unique != "exact"):
+        raise ValueError("Chunked runs only give the unordered corridor table, with exact unique vessels")
+    Message(f"Passage line input: {len(lines.ids)} items...")
+    Message(f"Running the summary in chunks of about {MemoryMB} MB...")
+    fields = SummaryFields(MMSI, VesselTypes, LengthField, DateField)
+    batches = FileTrackBatches(TrackLines, fields, GeometryField, MemoryMB, DateField, StartInterval, EndInterval)
+
+    with instruments.stage("summary") as record:
+        running, Passage_line_df, lengths = ChunkedSummary(
+            batches, lines, LineTable, NameField, VesselTypes, MMSI, LengthField, MultipleInt, shape_type == "Polygon", Simplified, CustomName,
+            CustomTypes, Categories, DateField, Period or None, Unique, Precision, LengthOutput=bool(LengthOutput and LengthField), Prefilter=Prefilter,
+            PrefilterTolerance=PrefilterTolerance, Message=Message, Directions=Directions)
+        record["rows_out"] = len(Passage_line_df)
+    Message(f"Folded {running.batches} batches into {len(running.partial.cells)} cells...")
+
+    with instruments.stage("output", len(Passage_line_df)):
+        _write_outputs(Passage_line_df, lengths, OutputName, LengthOutput, PERIOD_FIELD if DateField and Period else None, PeriodOutput, Message)
+        if CorridorOutput:
+            ## the merged partial keeps every (line, type, MMSI) cell, all the unordered corridor table needs
+            corridors = CorridorMatrix(running.partial.cells, "Name", "Vessel_Type", "MMSI", CustomName, CustomTypes, Categories)
+            Message(f"Corridor table written to {WriteSummary(corridors, CorridorOutput)}")
+
+    if RunReport:
+        instruments.report(RunReport, TrackLines=str(TrackLines), PassageLines=str(PassageLines), ShapeType=shape_type, MultipleInt=MultipleInt,
+                           Simplified=Simplified, Period=Period, Prefilter=Prefilter, MemoryMB=MemoryMB, Batches=running.batches, Unique=Unique)
+        Message(f"Run report written to {RunReport}")
+    return Passage_line_df
+
+
+## argparse is imported here, so importing the package for RunSummary doesn't pay for it
+def _parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m passage_line", description="Passage line summary of AIS track lines, without ArcGIS.")
+    parser.add_argument("tracks", help="track lines (.parquet GeoParquet, .geojson or .csv with a WKT column)")
+    parser.add_argument("lines", help="passage lines or areas of interest (same formats)")
+    parser.add_argument("output", help="output table (.csv, .parquet or .sqlite)")
+    parser.add_argument("--name-field", required=True, help="passage line name/label field")
+    parser.add_argument("--mmsi", default="MMSI", help="unique vessel identifier field")
+    parser.add_argument("--vessel-type", default="VesselType", help="vessel type field")
+    parser.add_argument("--length", default="", help="vessel length field")
+    parser.add_argument("--single", action="store_true", help="count one interaction per track and line (multiple interactions off)")
+    parser.add_argument("--simplified", action="store_true", help="simplified/aggregated output by vessel category")
+    parser.add_argument("--custom-name", default="", help="custom category name")
+    parser.add_argument("--custom-types", nargs="*", type=int, default=None, help="vessel type codes of the custom category")
+    parser.add_argument("--categories", default=None, help="JSON category scheme file")
+    parser.add_argument("--date-field", default="", help="track date field")
+    parser.add_argument("--start", default="", help="start of the date interval")
+    parser.add_argument("--end", default="", help="end of the date interval")
+    parser.add_argument("--period", default="", help="summary period: day, week, month, quarter, year or ';' separated dates")
+    parser.add_argument("--table-per-period", action="store_true", help="one output table per period")
+    parser.add_argument("--length-output", default="", help="vessel length distribution table")
+    parser.add_argument("--directions", action="store_true", help="add per-direction columns (passage lines only)")
+    parser.add_argument("--no-prefilter", action="store_true", help="skip the envelope prefilter")
+    parser.add_argument("--prefilter-tolerance", type=float, default=0.0)
+    parser.add_argument("--wkt-field", default="WKT", help="WKT geometry column of CSV inputs")
+    parser.add_argument("--run-report", default="", help="JSON run report with per-stage timings")
+    parser.add_argument("--profile-stage", default="", choices=[""] + STAGES, help="stage to profile with cProfile")
+    parser.add_argument("--memory-mb", type=int, default=None, help="run in chunks of about this many MB (bounded memory)")
+    parser.add_argument("--unique", default="exact", choices=["exact", "sketch"], help="unique vessel counting: exact MMSI sets or HyperLogLog sketches")
+    parser.add_argument("--precision", type=int, default=12, help="HyperLogLog precision of --unique sketch (4 to 18)")
+    parser.add_argument("--corridors", default="", help="passage line corridor table: vessels shared by every pair of lines")
+    parser.add_argument("--corridor-order", action="store_true", help="add the vessels that crossed From before To (needs --date-field)")
+    parser.add_argument("--dwell", default="", help="visits and dwell table of polygon areas, per area and vessel category")
+    parser.add_argument("--track-start-field", default="", help="track start date field, for the dwell times of --dwell")
+    parser.add_argument("--track-end-field", default="", help="track end date field, for the dwell times of --dwell")
+    return parser
+
+
+## Command line entry point, python -m passage_line
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    RunSummary(args.tracks, args.lines, args.name_field, args.vessel_type, args.mmsi, args.output, args.length, "false" if args.single else "true",
+               "true" if args.simplified else "false", args.custom_name, args.custom_types, args.categories, args.date_field, args.start, args.end,
+               args.period, "Table per period" if args.table_per_period else "Single table", args.length_output, args.directions,
+               not args.no_prefilter, args.prefilter_tolerance, args.wkt_field, args.run_report, args.profile_stage,
+               MemoryMB=args.memory_mb, Unique=args.unique, CorridorOutput=args.corridors, CorridorOrder=args.corridor_order,
+               Precision=args.precision, DwellOutput=args.dwell, TrackStartField=args.track_start_field, TrackEndField=args.track_end_field)
+    return 0
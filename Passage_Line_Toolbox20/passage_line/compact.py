@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import json
+import os
+import shutil
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+## Compact crossing table, the columns the summary stages need as typed arrays in the row order of the intersect table
+## it was built from: 16 bytes per row with lengths and dates, against about 200 for an intersect DataFrame carrying
+## the usual AIS track columns.
+## names/types: dictionaries of the passage line names and vessel types, sorted so categoricals over them sort the same
+## line/vessel_type: codes into names/types, the smallest signed integer type pandas categoricals use, -1 for missing
+## mmsi: uint32, 0 for missing (None without an MMSI field); length: float32 (or LengthDtype), NaN for missing (None
+##         without a length field)
+## day: int32 days since 1970-01-01, MISSING_DAY for missing (None without a date field)
+## count: uint16 (uint32 if needed) interaction counts, ORIG_FID_CALC
+## fields: names of the source fields (NameField, VesselTypes, MMSI, LengthField, DateField, CountField), used as the
+##         column names of CompactFrame
+CompactCrossings = namedtuple("CompactCrossings", ["names", "types", "line", "vessel_type", "mmsi", "length", "day", "count", "fields"])
+
+MISSING_DAY = np.iinfo("int32").min
+
+## array members of a saved compact table, the dictionaries go to the JSON header
+_ARRAYS = ["line", "vessel_type", "mmsi", "length", "day", "count"]
+
+
+## Codes dtype pandas gives a categorical with n categories, so Categorical.from_codes takes the codes without a copy
+def _code_dtype(n):
+    for dtype in ("int8", "int16", "int32"):
+        if n < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype("int64")
+
+
+def _encode(values):
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes.astype(_code_dtype(len(uniques))), uniques
+
+
+## Build the compact table of an intersect table (temp_out_df, with the interaction counts in CountField).
+## MMSIs must be whole numbers up to 2^32 - 1 (MMSI "" leaves them out); lengths are kept at float32 precision and
+## dates at day precision, enough for vessel lengths and the day/week/month/quarter/year periods. LengthDtype="float64"
+## keeps the lengths as they are, for tables whose summaries must match the intersect table's to the last digit.
+def CompactCrossingTable(temp_out_df, NameField, VesselTypes, MMSI, LengthField="", DateField="", CountField="ORIG_FID_CALC", LengthDtype="float32"):
+    line, names = _encode(temp_out_df[NameField])
+    vessel_type, types = _encode(temp_out_df[VesselTypes])
+
+    mmsi = None
+    if MMSI:
+        mmsi = pd.to_numeric(temp_out_df[MMSI], errors="coerce").to_numpy(dtype="float64")
+        has_mmsi = ~np.isnan(mmsi)
+        bad = (mmsi[has_mmsi] < 1) | (mmsi[has_mmsi] > np.iinfo("uint32").max) | (mmsi[has_mmsi] % 1 != 0)
+        if np.any(bad) or np.any(~has_mmsi & temp_out_df[MMSI].notna().to_numpy()):
+            raise ValueError(f"{MMSI} values must be whole numbers from 1 to {np.iinfo('uint32').max} for a compact crossing table")
+        mmsi = np.where(has_mmsi, mmsi, 0).astype("uint32")
+
+    length = pd.to_numeric(temp_out_df[LengthField], errors="coerce").to_numpy(dtype=LengthDtype) if LengthField else None
+    day = None
+    if DateField:
+        dates = pd.to_datetime(temp_out_df[DateField]).to_numpy().astype("datetime64[D]")
+        day = np.where(np.isnat(dates), MISSING_DAY, dates.astype("int64")).astype("int32")
+    count = temp_out_df[CountField].to_numpy(dtype="int64")
+    count = count.astype("uint16" if len(count) == 0 or count.max() <= np.iinfo("uint16").max else "uint32")
+    return CompactCrossings(np.asarray(names, dtype=object), np.asarray(types), line, vessel_type, mmsi, length, day, count,
+                            (NameField, VesselTypes, MMSI, LengthField, DateField, CountField))
+
+
+## Bytes held by the arrays of a compact table
+def CompactBytes(crossings):
+    return sum(array.nbytes for array in (crossings.line, crossings.vessel_type, crossings.mmsi, crossings.length, crossings.day, crossings.count)
+               if array is not None)
+
+
+## Dates of a compact table as datetime64[D] (NaT for missing), for PeriodKeys
+def CompactDates(crossings):
+    days = crossings.day.astype("int64")
+    days[crossings.day == MISSING_DAY] = np.iinfo("int64").min
+    return days.view("datetime64[D]")
+
+
+## DataFrame over a compact table without copying the arrays, columns named by the source fields: names and vessel
+## types as categoricals over the codes, MMSI as a nullable UInt32 over the values (0 is missing), the lengths and
+## the counts. The dates stay in the table (see CompactDates). SummarizeTransits, SimplifySummary and LengthDistribution
+## take it as temp_out_df.
+def CompactFrame(crossings):
+    NameField, VesselTypes, MMSI, LengthField, DateField, CountField = crossings.fields
+    columns = {
+        NameField: pd.Categorical.from_codes(crossings.line, categories=pd.Index(crossings.names, dtype=object), validate=False),
+        VesselTypes: pd.Categorical.from_codes(crossings.vessel_type, categories=pd.Index(crossings.types), validate=False),
+        CountField: crossings.count,
+    }
+    if MMSI:
+        columns[MMSI] = pd.arrays.IntegerArray(crossings.mmsi, crossings.mmsi == 0)
+    if LengthField:
+        columns[LengthField] = crossings.length
+    return pd.DataFrame(columns, copy=False)
+
+
+## Vessel type dictionary of a compact table as JSON values and a dtype, so numeric types come back with the dtype they
+## were built with and string types (object arrays, which np.save can't write without pickle) as strings
+def _dictionary(values):
+    values = np.asarray(values)
+    return {"values": values.tolist(), "dtype": "O" if values.dtype == object else values.dtype.str}
+
+
+def _undictionary(header):
+    return np.asarray(header["values"], dtype=object if header["dtype"] == "O" else header["dtype"])
+
+
+## Save a compact table to a folder of .npy arrays and a JSON header (dictionaries, fields), written to a temporary
+## folder and renamed so an interrupted save never leaves a half written table behind; a failed save removes the
+## temporary folder
+def SaveCompact(crossings, path):
+    temp = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(temp, ignore_errors=True)
+    os.makedirs(temp)
+    try:
+        for name in _ARRAYS:
+            array = getattr(crossings, name)
+            if array is not None:
+                np.save(os.path.join(temp, f"{name}.npy"), array, allow_pickle=False)
+        with open(os.path.join(temp, "header.json"), "w", encoding="utf-8") as f:
+            json.dump({"names": crossings.names.tolist(), "types": _dictionary(crossings.types), "fields": list(crossings.fields)}, f,
+                      default=lambda value: value.item() if isinstance(value, np.generic) else str(value))
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temp, path)
+    except BaseException:
+        shutil.rmtree(temp, ignore_errors=True)
+        raise
+    return path
+
+
+## Load a compact table saved with SaveCompact. The arrays are memory-mapped read-only (mmap_mode="r"), so only the
+## pages a summary touches are read and several processes share them; mmap_mode=None reads them into memory.
+def LoadCompact(path, mmap_mode="r"):
+    with open(os.path.join(path, "header.json"), "r", encoding="utf-8") as f:
+        header = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) if os.path.exists(os.path.join(path, f"{name}.npy")) else None
+              for name in _ARRAYS}
+    return CompactCrossings(np.asarray(header["names"], dtype=object), _undictionary(header["types"]), fields=tuple(header["fields"]), **arrays)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import numpy as np
+import pandas as pd
+
+from .categories import BuildCategoryScheme, CategoryLookup, ClassifyVesselTypes, OTHER
+
+## crossing pairs generated at once for the ordered counts, bounds the working memory of CorridorMatrix
+_PAIR_BATCH = 4000000
+
+## order rank of crossings with a missing order field, sorts after every known rank and never counts as before/after
+_NO_RANK = np.iinfo("int64").max
+
+## total row of the corridor table, every vessel whatever its type
+TOTAL = "Total"
+
+
+## Vessel x passage line incidence of (vessel code, line code) pairs as a binary CSR matrix (scipy.sparse), one entry per
+## distinct pair. rank, when given, is the order rank of every pair; the first (lowest) rank of each entry is returned
+## aligned with the matrix entries, so the lines of a vessel can be put in crossing order (see _NO_RANK).
+def _incidence(vessel_codes, line_codes, n_vessels, n_lines, rank=None):
+    import scipy.sparse as sp
+
+    keys = vessel_codes.astype("int64") * n_lines + line_codes
+    order = np.lexsort((rank, keys)) if rank is not None else np.argsort(keys, kind="stable")
+    keys = keys[order]
+    first = np.r_[True, keys[1:] != keys[:-1]] if len(keys) else np.zeros(0, dtype=bool)
+    keys = keys[first]
+    indptr = np.zeros(n_vessels + 1, dtype="int64")
+    np.cumsum(np.bincount(keys // n_lines, minlength=n_vessels), out=indptr[1:])
+    matrix = sp.csr_matrix((np.ones(len(keys), dtype="int32"), keys % n_lines, indptr), shape=(n_vessels, n_lines))
+    return matrix, (rank[order][first] if rank is not None else None)
+
+
+## Vessel x passage line incidence matrix of a crossing table (temp_out_df, Partial.cells...): a binary scipy.sparse CSR
+## matrix with a 1 where the vessel crossed the line at least once. Returns the matrix, the vessels (row labels) and the
+## passage line names (column labels, sorted).
+def IncidenceMatrix(temp_out_df, NameField, MMSI):
+    rows = temp_out_df[(temp_out_df[NameField].notna() & temp_out_df[MMSI].notna()).to_numpy()]
+    vessel_codes, vessels = pd.factorize(rows[MMSI])
+    line_codes, names = pd.factorize(rows[NameField], sort=True)
+    return _incidence(vessel_codes, line_codes, len(vessels), len(names))[0], vessels, names
+
+
+## Number of vessels that crossed line a before line b, for every (a, b), from the incidence entries and their first
+## order ranks. The entries of every vessel are put in rank order and each later entry of the same vessel with a higher
+## rank makes one (earlier line, later line) pair; ties and _NO_RANK make none. Pairs are generated and summed into
+## a sparse matrix a batch of vessels at a time, so the working memory stays near _PAIR_BATCH pairs.
+def _forward_counts(matrix, first_rank):
+    import scipy.sparse as sp
+
+    n_lines = matrix.shape[1]
+    vessel = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    order = np.lexsort((first_rank, vessel))
+    line, rank = matrix.indices[order], first_rank[order]
+    end = matrix.indptr[1:][vessel]
+    later = end - np.arange(len(line)) - 1
+    forward = sp.csr_matrix((n_lines, n_lines), dtype="int64")
+
+    ## batch boundaries between vessels, every batch holding about _PAIR_BATCH pairs
+    sizes = np.diff(matrix.indptr)
+    batch = np.cumsum(sizes * (sizes - 1) // 2) // _PAIR_BATCH
+    cuts = matrix.indptr[1:-1][np.diff(batch) > 0]
+    for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(line)]):
+        counts = later[lo:hi]
+        src = np.repeat(np.arange(lo, hi), counts)
+        dst = src + 1 + np.arange(len(src)) - np.repeat(np.cumsum(counts) - counts, counts)
+        keep = (rank[src] < rank[dst]) & (rank[dst] != _NO_RANK)
+        forward = forward + sp.csr_matrix((np.ones(keep.sum(), dtype="int64"), (line[src[keep]], line[dst[keep]])), shape=(n_lines, n_lines))
+    return forward
+
+
+## Shared vessel (and ordered) counts of one category as a long table of the non-zero off-diagonal line pairs
+def _corridor_table(vessel_codes, line_codes, n_vessels, names, rank=None):
+    matrix, first_rank = _incidence(vessel_codes, line_codes, n_vessels, len(names), rank)
+    shared = (matrix.T @ matrix).tocoo()
+    off = shared.row != shared.col
+    row, col, data = shared.row[off], shared.col[off], shared.data[off]
+    order = np.lexsort((col, row))
+    row, col, data = row[order], col[order], data[order]
+    table = pd.DataFrame({
+        "From_Name": np.asarray(names, dtype=object)[row],
+        "To_Name": np.asarray(names, dtype=object)[col],
+        "From_Vessels": np.asarray(matrix.sum(axis=0)).ravel()[row].astype("int64"),
+        "Shared_Vessels": data.astype("int64"),
+    })
+    if rank is not None:
+        forward = _forward_counts(matrix, first_rank).tocsr()
+        table["Vessels_Forward"] = np.asarray(forward[row, col]).ravel().astype("int64") if len(row) else np.zeros(0, dtype="int64")
+    return table
+
+
+## Passage line corridor (origin-destination) table: for every pair of passage lines crossed by the same vessels, the
+## number of vessels that crossed both, by simplified vessel category and in total (Total counts a vessel reported under
+## several types once). A sparse vessel x line incidence matrix B is built per category and the line x line
+## co-occurrence is the sparse product B.T @ B, so nothing grows with lines x lines or vessels x lines beyond the pairs
+## that do occur. Rows: Category, From_Name, To_Name, From_Vessels (vessels of the category that crossed From),
+## Shared_Vessels (crossed both). OrderFields, columns that put the crossings in time order (i.e. the date field, or
+## the date field, Track_ID and First_Position of the NumPy engine), add Vessels_Forward: vessels whose first crossing of From came before their
+## first crossing of To. Both (a, b) and (b, a) rows are listed.
+def CorridorMatrix(temp_out_df, NameField, VesselTypes, MMSI, CustomName="", CustomTypes=None, Categories=None, OrderFields=None):
+    scheme = BuildCategoryScheme(Categories, CustomName, CustomTypes)
+    category_names = [name for name, codes in scheme] + [OTHER]
+    ## rows without a vessel type are left out like in the summary table, so Total is the same from a Partial's cells
+    rows = temp_out_df[(temp_out_df[NameField].notna() & temp_out_df[VesselTypes].notna() & temp_out_df[MMSI].notna()).to_numpy()]
+    vessel_codes, vessels = pd.factorize(rows[MMSI])
+    line_codes, names = pd.factorize(rows[NameField], sort=True)
+    rank = None
+    if OrderFields:
+        groups = rows.groupby(list(OrderFields), sort=True, dropna=True, observed=True).ngroup().to_numpy(dtype="float64")
+        rank = np.full(len(rows), _NO_RANK, dtype="int64")
+        rank[~np.isnan(groups)] = groups[~np.isnan(groups)]
+
+    category = ClassifyVesselTypes(rows[VesselTypes], CategoryLookup(scheme), len(scheme))
+    tables = []
+    for index, name in enumerate(category_names):
+        keep = category == index
+        table = _corridor_table(vessel_codes[keep], line_codes[keep], len(vessels), names, rank[keep] if rank is not None else None)
+        table.insert(0, "Category", name)
+        tables.append(table)
+    table = _corridor_table(vessel_codes, line_codes, len(vessels), names, rank)
+    table.insert(0, "Category", TOTAL)
+    tables.append(table)
+    return pd.concat(tables, ignore_index=True)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+## Polylines as flat vertex arrays. xy holds every vertex, offsets[k]:offsets[k + 1] are the vertices of path (part) k,
+## feature[k] is the feature index of path k and ids[feature index] is the feature id reported in the crossings.
+## The paths of one feature must be consecutive. Polygon rings are closed paths, so polygons need no conversion.
+Paths = namedtuple("Paths", ["xy", "offsets", "feature", "ids"])
+
+CROSSING_COLUMNS = ["Track_ID", "Line_ID", "X", "Y", "Track_Segment", "Track_Fraction", "Line_Segment", "Line_Fraction", "Direction"]
+
+## crossing directions relative to the digitized direction of the passage line: "Left" crossings move from its right
+## side to its left side, "Right" crossings the other way. Draw lines with the harbor on the left to read Left as inbound.
+DIRECTIONS = {1: "Left", -1: "Right"}
+
+
+## Build Paths from one entry per feature, each entry a list of parts and each part an (n, 2) array of x/y vertices.
+## A single (n, 2) array is also accepted as a one part feature.
+def BuildPaths(geometries, ids=None):
+    parts = []
+    feature = []
+    for index, geometry in enumerate(geometries):
+        if len(geometry) and np.ndim(geometry[0]) == 1:
+            geometry = [geometry]
+        for part in geometry:
+            parts.append(np.asarray(part, dtype="float64").reshape(-1, 2))
+            feature.append(index)
+    n_features = len(geometries)
+    lengths = np.array([len(part) for part in parts], dtype="int64")
+    offsets = np.zeros(len(parts) + 1, dtype="int64")
+    np.cumsum(lengths, out=offsets[1:])
+    xy = np.concatenate(parts) if parts else np.zeros((0, 2))
+    ids = np.arange(n_features) if ids is None else np.asarray(ids)
+    return Paths(xy, offsets, np.asarray(feature, dtype="int64"), ids)
+
+
+## Keep only the features where keep is True (one flag per feature), e.g. a date window or spatial prefilter mask
+def SubsetPaths(paths, keep):
+    keep = np.asarray(keep, dtype=bool)
+    path_keep = keep[paths.feature]
+    n_vertices = np.diff(paths.offsets)
+    offsets = np.zeros(path_keep.sum() + 1, dtype="int64")
+    np.cumsum(n_vertices[path_keep], out=offsets[1:])
+    feature = (np.cumsum(keep) - 1)[paths.feature[path_keep]]
+    return Paths(paths.xy[np.repeat(path_keep, n_vertices)], offsets, feature, paths.ids[keep])
+
+
+## Split paths into segments. Returns the segment end points, the feature index of each segment, the segment number
+## within its feature and whether the segment owns its end point (last segment of a path that is not a closed ring).
+def _segments(paths):
+    xy, offsets, feature = paths.xy, paths.offsets, paths.feature
+    n_vertices = np.diff(offsets)
+    is_last = np.zeros(len(xy) + 1, dtype=bool)
+    is_last[offsets[1:] - 1] = True
+    start = np.flatnonzero(~is_last[:len(xy)])
+    filled = n_vertices > 1
+    closed = (xy[offsets[:-1][filled]] == xy[offsets[1:][filled] - 1]).all(axis=1)
+    is_last[offsets[1:][filled][closed] - 1] = False
+    seg_feature = np.repeat(feature, n_vertices)[start]
+    if len(start):
+        first = np.r_[0, np.flatnonzero(np.diff(seg_feature)) + 1]
+        seg_number = np.arange(len(start)) - np.repeat(first, np.diff(np.r_[first, len(start)]))
+    else:
+        seg_number = np.zeros(0, dtype="int64")
+    return xy[start], xy[start + 1], seg_feature, seg_number, is_last[start + 1]
+
+
+## Uniform grid over the passage line segments, stored as a CSR list of segment indices per cell
+class _SegmentGrid:
+    def __init__(self, p0, p1, cell_size=None):
+        self.lo = np.minimum(p0, p1)
+        self.hi = np.maximum(p0, p1)
+        self.xmin, self.ymin = self.lo.min(axis=0)
+        xmax, ymax = self.hi.max(axis=0)
+        width, height = max(xmax - self.xmin, 1e-12), max(ymax - self.ymin, 1e-12)
+        ## about one segment per cell, but never smaller than a typical segment
+        if cell_size is None:
+            cell_size = max(np.sqrt(width * height / len(p0)), np.median((self.hi - self.lo).max(axis=1)), 1e-12)
+        self.cell_size = float(cell_size)
+        self.nx = int(width // self.cell_size) + 1
+        self.ny = int(height // self.cell_size) + 1
+        self.extent = (self.xmin, self.ymin, xmax, ymax)
+
+        cells, segment = self._cover(self.lo, self.hi)
+        order = np.argsort(cells, kind="stable")
+        self.segments = segment[order]
+        self.pointer = np.zeros(self.nx * self.ny + 1, dtype="int64")
+        np.cumsum(np.bincount(cells, minlength=self.nx * self.ny), out=self.pointer[1:])
+
+    def _cell(self, x, y):
+        ix = np.clip(((x - self.xmin) // self.cell_size).astype("int64"), 0, self.nx - 1)
+        iy = np.clip(((y - self.ymin) // self.cell_size).astype("int64"), 0, self.ny - 1)
+        return ix, iy
+
+    ## Expand boxes into (cell, box index) pairs for every grid cell each box touches
+    def _cover(self, lo, hi):
+        ix0, iy0 = self._cell(lo[:, 0], lo[:, 1])
+        ix1, iy1 = self._cell(hi[:, 0], hi[:, 1])
+        wide = ix1 - ix0 + 1
+        counts = wide * (iy1 - iy0 + 1)
+        box = np.repeat(np.arange(len(lo)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cx = ix0[box] + local % wide[box]
+        cy = iy0[box] + local // wide[box]
+        return cy * self.nx + cx, box
+
+    ## Candidate (query box, segment) pairs whose boxes overlap. A pair found in several cells is only kept in the cell
+    ## holding the lower left corner of the overlap of the two boxes, so every pair is reported once.
+    def candidates(self, lo, hi):
+        xmin, ymin, xmax, ymax = self.extent
+        near = np.flatnonzero((hi[:, 0] >= xmin) & (lo[:, 0] <= xmax) & (hi[:, 1] >= ymin) & (lo[:, 1] <= ymax))
+        cells, box = self._cover(lo[near], hi[near])
+        counts = self.pointer[cells + 1] - self.pointer[cells]
+        query = near[np.repeat(box, counts)]
+        cell = np.repeat(cells, counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        segment = self.segments[np.repeat(self.pointer[cells], counts) + local]
+
+        overlap_lo = np.maximum(lo[query], self.lo[segment])
+        overlap_hi = np.minimum(hi[query], self.hi[segment])
+        keep = (overlap_lo <= overlap_hi).all(axis=1)
+        ix, iy = self._cell(overlap_lo[:, 0], overlap_lo[:, 1])
+        keep &= (iy * self.nx + ix) == cell
+        return query[keep], segment[keep]
+
+
+## Find every crossing between track paths and passage line paths without arcpy or any intermediate feature class.
+## Passage line segments are indexed in a uniform grid and the track segments are tested against their candidates in
+## batches of batch_size track segments. A crossing that falls exactly on a shared vertex is reported once: segments
+## own their start point, and only the last segment of a path owns its end point. Collinear overlaps are not crossings.
+## Direction (see DIRECTIONS) is the sign of the cross product of the line and track segments, already at hand in the test.
+def FindCrossings(tracks, lines, cell_size=None, batch_size=250000):
+    t0, t1, t_feature, t_number, t_last = _segments(tracks)
+    l0, l1, l_feature, l_number, l_last = _segments(lines)
+    if len(t0) == 0 or len(l0) == 0:
+        return pd.DataFrame({column: [] for column in CROSSING_COLUMNS})
+    grid = _SegmentGrid(l0, l1, cell_size)
+
+    found = []
+    for start in range(0, len(t0), batch_size):
+        stop = min(start + batch_size, len(t0))
+        a0, a1 = t0[start:stop], t1[start:stop]
+        query, segment = grid.candidates(np.minimum(a0, a1), np.maximum(a0, a1))
+        query += start
+
+        ## batched parametric segment-segment test, p = t0 + t * r and q = l0 + u * s
+        r = t1[query] - t0[query]
+        s = l1[segment] - l0[segment]
+        qp = l0[segment] - t0[query]
+        denom = r[:, 0] * s[:, 1] - r[:, 1] * s[:, 0]
+        parallel = denom == 0
+        denom[parallel] = 1.0
+        t = (qp[:, 0] * s[:, 1] - qp[:, 1] * s[:, 0]) / denom
+        u = (qp[:, 0] * r[:, 1] - qp[:, 1] * r[:, 0]) / denom
+        hit = ~parallel & (t >= 0) & ((t < 1) | ((t == 1) & t_last[query])) & (u >= 0) & ((u < 1) | ((u == 1) & l_last[segment]))
+        query, segment, t, u = query[hit], segment[hit], t[hit], u[hit]
+        point = t0[query] + t[:, None] * r[hit]
+        direction = np.where(denom[hit] < 0, 1, -1).astype("int8")
+        found.append((query, segment, point, t, u, direction))
+
+    query, segment, point, t, u, direction = (np.concatenate(values) for values in zip(*found))
+    crossings = pd.DataFrame({
+        "Track_ID": tracks.ids[t_feature[query]],
+        "Line_ID": lines.ids[l_feature[segment]],
+        "X": point[:, 0],
+        "Y": point[:, 1],
+        "Track_Segment": t_number[query],
+        "Track_Fraction": t,
+        "Line_Segment": l_number[segment],
+        "Line_Fraction": u,
+        "Direction": direction,
+    })
+    return crossings.sort_values(["Track_ID", "Track_Segment", "Track_Fraction", "Line_ID"], kind="stable").reset_index(drop=True)
+
+
+## Crossing count per (track, passage line) pair, the same number MultipartToSinglepart gives per ORIG_FID.
+## Crossings with a Direction also give the count per direction and the direction of the first crossing along the track.
+## First_Position is where the first crossing lies along the track (segment number + fraction), to order crossings in time.
+def CrossingCounts(crossings):
+    grouped = crossings.groupby(["Track_ID", "Line_ID"], sort=True)
+    pairs = grouped.size().rename("Crossings").reset_index()
+    if "Direction" in crossings.columns:
+        left = (crossings["Direction"] == 1).groupby([crossings["Track_ID"], crossings["Line_ID"]], sort=True).sum().to_numpy(dtype="int64")
+        pairs[f"Crossings_{DIRECTIONS[1]}"] = left
+        pairs[f"Crossings_{DIRECTIONS[-1]}"] = pairs["Crossings"].to_numpy() - left
+        pairs["First_Direction"] = grouped["Direction"].first().to_numpy(dtype="int8")
+    first = grouped[["Track_Segment", "Track_Fraction"]].first()
+    pairs["First_Position"] = first["Track_Segment"].to_numpy(dtype="float64") + first["Track_Fraction"].to_numpy(dtype="float64")
+    return pairs
+
+
+## Equivalent of the multipoint PairwiseIntersect table: one row per (track, passage line) pair with the track and
+## passage line attributes joined on, an OBJECTID and the number of crossings. Attribute tables are indexed by the
+## ids used in BuildPaths; passage line columns that clash with track columns get a "_1" suffix like arcpy does.
+## Pairs (Track_ID, Line_ID) adds pairs without crossings, e.g. tracks that lie inside an area, with zero crossings
+## and a First_Position at the track start.
+def IntersectTable(crossings, TrackTable, LineTable, Pairs=None):
+    pairs = CrossingCounts(crossings)
+    if Pairs is not None and len(Pairs):
+        dtypes = pairs.dtypes
+        pairs = pairs.merge(Pairs[["Track_ID", "Line_ID"]].drop_duplicates(), on=["Track_ID", "Line_ID"], how="outer", sort=True)
+        for column in pairs.columns[2:]:
+            pairs[column] = pairs[column].fillna(0).astype(dtypes[column])
+    TrackTable = TrackTable.drop(columns="OBJECTID", errors="ignore")
+    LineTable = LineTable.drop(columns="OBJECTID", errors="ignore")
+    line_columns = {column: (f"{column}_1" if column in TrackTable.columns else column) for column in LineTable.columns}
+    temp_out_df = pd.concat([
+        pd.DataFrame({"OBJECTID": np.arange(1, len(pairs) + 1)}),
+        TrackTable.reindex(pairs["Track_ID"]).reset_index(drop=True),
+        LineTable.reindex(pairs["Line_ID"]).rename(columns=line_columns).reset_index(drop=True),
+        pairs,
+    ], axis=1)
+    return temp_out_df
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+from .crossings import FindCrossings, IntersectTable, SubsetPaths
+from .prefilter import EnvelopePrefilter
+from .summary import DIRECTION_FIELDS, DirectionRule, InteractionRule
+from .visits import PairVisits, VisitCounts
+
+
+## NumPy equivalent of the toolbox geometry stage (PairwiseIntersect, MultipartToSinglepart and the ORIG_FID_CALC
+## interaction counts). Returns the multipoint intersect table: one row per (track, passage line) pair with the
+## track and passage line attributes, Crossings and ORIG_FID_CALC. Polygon areas are passed as their rings; their
+## transits are the entry/exit visits of every (track, area) pair (PairVisits) instead of ceil(crossings / 2), and a
+## track that lies inside an area without crossing its boundary is one transit of that area.
+## Passage lines also get the directional counts of DIRECTION_FIELDS (ORIG_FID_LEFT/ORIG_FID_RIGHT, see DirectionRule).
+def IntersectTracks(tracks, lines, TrackTable, LineTable, MultipleInt="true", Polygon=False, Prefilter=True, PrefilterTolerance=0.0, cell_size=None):
+    if Prefilter:
+        tracks = SubsetPaths(tracks, EnvelopePrefilter(tracks, lines, PrefilterTolerance))
+    crossings = FindCrossings(tracks, lines, cell_size)
+    visits = VisitCounts(PairVisits(crossings, tracks, lines)) if Polygon else None
+    temp_out_df = IntersectTable(crossings, TrackTable, LineTable, visits)
+    if Polygon and MultipleInt == "true":
+        counts = temp_out_df[["Track_ID", "Line_ID"]].merge(visits, on=["Track_ID", "Line_ID"], how="left")["Visits"]
+        temp_out_df["ORIG_FID_CALC"] = counts.fillna(0).to_numpy(dtype="int64")
+    else:
+        temp_out_df["ORIG_FID_CALC"] = InteractionRule(temp_out_df["Crossings"], MultipleInt, Polygon)
+    if not Polygon:
+        temp_out_df[DIRECTION_FIELDS["Left"]], temp_out_df[DIRECTION_FIELDS["Right"]] = DirectionRule(
+            temp_out_df["Crossings_Left"], temp_out_df["Crossings_Right"], temp_out_df["First_Direction"], MultipleInt)
+    return temp_out_df
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .aggregate import MergePartials, PartialAggregate, PartialSummary
+from .crossings import SubsetPaths
+from .engine import IntersectTracks
+from .periods import PERIOD_FIELD, PeriodKeys
+
+## Persisted state of an incremental summary.
+## partial: the merged exact partial of every track folded in so far (transit sums and MMSI sets per cell).
+## mark: high-water mark, the largest MarkField value (track id by default, or e.g. the track date) already folded in.
+## options: the run options the state was built with, a state is only ever extended with the same options.
+State = namedtuple("State", ["partial", "mark", "options"])
+
+
+def LoadState(path):
+    return pd.read_pickle(path) if os.path.exists(path) else None
+
+
+## Save the state next to its final path first, so a failed run leaves the previous state intact
+def SaveState(state, path):
+    temp = f"{path}.tmp"
+    pd.to_pickle(state, temp)
+    os.replace(temp, path)
+
+
+## Mask of the tracks above the high-water mark (all of them for a new state). Tracks without a mark value are only
+## taken by the first run.
+def NewTracks(marks, mark=None):
+    marks = pd.Series(marks)
+    if mark is None:
+        return np.ones(len(marks), dtype=bool)
+    return (marks > mark).to_numpy()
+
+
+## Incremental run for feeds that only ever add tracks (i.e. one day of AIS a night). Only the tracks above the
+## high-water mark of the state in StatePath are intersected, their partial is folded into the stored partial and the
+## state is saved with the new mark. MarkField is the TrackTable column that grows with the feed, blank for the track
+## ids. Because partials are exact and ordered by track id, the table equals a full recompute over every track so far.
+## Returns the merged partial, the summary table and the number of new tracks.
+def AppendSummary(StatePath, tracks, lines, TrackTable, LineTable, NameField, VesselTypes, MMSI, LengthField="", MultipleInt="true",
+                  Polygon=False, Simplified="false", CustomName="", CustomTypes=None, Categories=None, DateField="", Period=None,
+                  MarkField="", Prefilter=True, PrefilterTolerance=0.0):
+    options = {
+        "NameField": NameField, "VesselTypes": VesselTypes, "MMSI": MMSI, "LengthField": LengthField, "MultipleInt": MultipleInt,
+        "Polygon": Polygon, "DateField": DateField, "Period": Period, "MarkField": MarkField,
+    }
+    state = LoadState(StatePath)
+    if state is not None and state.options != options:
+        changed = ", ".join(option for option in options if state.options.get(option) != options[option])
+        raise ValueError(f"{StatePath} was built with different options ({changed}), start a new state")
+
+    marks = TrackTable[MarkField].reindex(tracks.ids) if MarkField else pd.Series(tracks.ids)
+    keep = NewTracks(marks, state.mark if state is not None else None)
+    new_tracks = SubsetPaths(tracks, keep)
+    temp_out_df = IntersectTracks(new_tracks, lines, TrackTable.reindex(new_tracks.ids), LineTable, MultipleInt, Polygon, Prefilter, PrefilterTolerance)
+    PeriodField = None
+    if DateField and Period:
+        PeriodField = PERIOD_FIELD
+        temp_out_df[PeriodField] = PeriodKeys(temp_out_df[DateField], Period)
+    partial = PartialAggregate(temp_out_df, NameField, VesselTypes, MMSI, LengthField, PeriodField, OrderFields=("Track_ID", "Line_ID"))
+
+    if state is not None:
+        partial = MergePartials([state.partial, partial])
+    new_marks = pd.Series(marks.to_numpy()[keep])
+    mark = state.mark if state is not None else None
+    if new_marks.notna().any():
+        mark = new_marks.max() if mark is None else max(mark, new_marks.max())
+    SaveState(State(partial, mark, options), StatePath)
+    return partial, PartialSummary(partial, Simplified, CustomName, CustomTypes, Categories, Period, LengthField), int(keep.sum())
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import math
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .aggregate import MergePartials, PartialAggregate, PartialSummary
+from .batch import ExpandDatasets
+from .crossings import Paths
+from .engine import IntersectTracks
+from .loader import FILE_EXTENSIONS
+from .periods import PERIOD_FIELD, PeriodKeys
+
+## raw AIS point fields (MarineCadastre names) by role
+POINT_FIELDS = {"MMSI": "MMSI", "Time": "BaseDateTime", "Lat": "LAT", "Lon": "LON", "VesselType": "VesselType", "Length": "Length"}
+
+## default track split gaps: time between consecutive points in minutes and great circle jump in kilometres
+GAP_MINUTES = 60.0
+GAP_KM = 25.0
+
+## working bytes per point while a partition is sorted and split (typed columns, sort order and copies)
+_POINT_BYTES = 160
+_EARTH_KM = 6371.0088
+
+
+## Great circle distance in km between consecutive points of two coordinate arrays
+def _haversine(lat0, lon0, lat1, lon1):
+    lat0, lon0, lat1, lon1 = (np.radians(values) for values in (lat0, lon0, lat1, lon1))
+    a = np.sin((lat1 - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat1) * np.sin((lon1 - lon0) / 2) ** 2
+    return 2 * _EARTH_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+## Raw point chunks of every source (CSV or Parquet) with only the point fields, typed: MMSI int64, time as int64
+## nanoseconds, coordinates and length float64. Points without MMSI, time or a valid position (AIS sends 91/181 for
+## "not available") are dropped.
+def _point_chunks(sources, Fields, ChunkRows):
+    columns = list(dict.fromkeys(field for field in Fields.values() if field))
+    for source in sources:
+        if FILE_EXTENSIONS.get(os.path.splitext(source)[1].lower()) == "parquet":
+            import pyarrow.parquet as pq
+            chunks = (batch.to_pandas() for batch in pq.ParquetFile(source).iter_batches(batch_size=ChunkRows, columns=columns))
+        else:
+            chunks = pd.read_csv(source, usecols=columns, chunksize=ChunkRows)
+        for chunk in chunks:
+            points = pd.DataFrame({
+                "MMSI": pd.to_numeric(chunk[Fields["MMSI"]], errors="coerce"),
+                "Time": pd.to_datetime(chunk[Fields["Time"]], errors="coerce").astype("datetime64[ns]"),
+                "Lat": pd.to_numeric(chunk[Fields["Lat"]], errors="coerce"),
+                "Lon": pd.to_numeric(chunk[Fields["Lon"]], errors="coerce"),
+                "VesselType": pd.to_numeric(chunk[Fields["VesselType"]], errors="coerce") if Fields.get("VesselType") else np.nan,
+                "Length": pd.to_numeric(chunk[Fields["Length"]], errors="coerce") if Fields.get("Length") else np.nan,
+            })
+            valid = (points["MMSI"].notna() & points["Time"].notna() & points["Lat"].abs().le(90) & points["Lon"].abs().le(180)).to_numpy()
+            points = points[valid]
+            yield pd.DataFrame({
+                "MMSI": points["MMSI"].to_numpy(dtype="int64"),
+                "Time": points["Time"].to_numpy().view("int64"),
+                "Lat": points["Lat"].to_numpy(dtype="float64"),
+                "Lon": points["Lon"].to_numpy(dtype="float64"),
+                "VesselType": points["VesselType"].to_numpy(dtype="float64"),
+                "Length": points["Length"].to_numpy(dtype="float64"),
+            })
+
+
+def _empty_points():
+    return pd.DataFrame({column: np.zeros(0, dtype=dtype) for column, dtype in
+                         (("MMSI", "int64"), ("Time", "int64"), ("Lat", "float64"), ("Lon", "float64"), ("VesselType", "float64"), ("Length", "float64"))})
+
+
+## Estimated number of points in the sources: Parquet footers, CSV size over the mean line length of the first MB
+def _estimate_points(sources):
+    total = 0
+    for source in sources:
+        if FILE_EXTENSIONS.get(os.path.splitext(source)[1].lower()) == "parquet":
+            import pyarrow.parquet as pq
+            total += pq.ParquetFile(source).metadata.num_rows
+            continue
+        with open(source, "rb") as f:
+            sample = f.read(1 << 20)
+        total += os.path.getsize(source) * max(sample.count(b"\n"), 1) // max(len(sample), 1)
+    return total
+
+
+## Number of MMSI partitions so one partition fits in MemoryMB while it is sorted and split
+def PartitionCount(sources, MemoryMB=1024):
+    points = _estimate_points(ExpandDatasets(sources))
+    return max(1, math.ceil(points * _POINT_BYTES / (MemoryMB * 1024 ** 2)))
+
+
+## Split the points of one partition into tracks. Points are ordered by (MMSI, time), repeated (MMSI, time) reports
+## dropped, and a new track starts at every new MMSI, wherever consecutive points are more than GapMinutes or GapKm
+## apart and at the antimeridian. Tracks of a single point are dropped. Vertices are (LON, LAT). The track table
+## (indexed by track id, from FirstId on) holds MMSI, VesselType and Length (first reported value),
+## BaseDateTime/EndDateTime and Points.
+def SplitTracks(points, FirstId=0, GapMinutes=GAP_MINUTES, GapKm=GAP_KM):
+    mmsi, time = points["MMSI"].to_numpy(), points["Time"].to_numpy()
+    order = np.lexsort((time, mmsi))
+    mmsi, time = mmsi[order], time[order]
+    repeat = np.r_[False, (mmsi[1:] == mmsi[:-1]) & (time[1:] == time[:-1])]
+    order, mmsi, time = order[~repeat], mmsi[~repeat], time[~repeat]
+    lat, lon = points["Lat"].to_numpy()[order], points["Lon"].to_numpy()[order]
+
+    breaks = np.r_[True, (mmsi[1:] != mmsi[:-1]) | (np.abs(np.diff(lon)) > 180)]
+    if GapMinutes:
+        breaks[1:] |= np.diff(time) > GapMinutes * 60e9
+    if GapKm:
+        breaks[1:] |= _haversine(lat[:-1], lon[:-1], lat[1:], lon[1:]) > GapKm
+    track = np.cumsum(breaks) - 1
+    n_points = np.bincount(track) if len(track) else np.zeros(0, dtype="int64")
+    kept = n_points >= 2
+    keep = kept[track]
+    track = (np.cumsum(kept) - 1)[track[keep]]
+    n_points = n_points[kept]
+
+    offsets = np.zeros(len(n_points) + 1, dtype="int64")
+    np.cumsum(n_points, out=offsets[1:])
+    first, last = offsets[:-1], offsets[1:] - 1
+    ids = np.arange(FirstId, FirstId + len(n_points))
+    tracks = Paths(np.column_stack([lon[keep], lat[keep]]), offsets, np.arange(len(n_points)), ids)
+
+    time = time[keep]
+    attributes = pd.DataFrame({
+        "VesselType": points["VesselType"].to_numpy()[order][keep],
+        "Length": points["Length"].to_numpy()[order][keep],
+    }).groupby(track, sort=True).first()
+    TrackTable = pd.DataFrame({
+        "MMSI": mmsi[keep][first],
+        "VesselType": attributes["VesselType"].to_numpy(),
+        "Length": attributes["Length"].to_numpy(),
+        "BaseDateTime": time[first].astype("datetime64[ns]"),
+        "EndDateTime": time[last].astype("datetime64[ns]"),
+        "Points": n_points,
+    }, index=pd.Index(ids, name="Track_ID"))
+    return tracks, TrackTable
+
+
+## Stream track lines out of raw AIS point files (paths, glob patterns; CSV or Parquet) with bounded memory. Points are
+## read ChunkRows at a time and, when the estimated points don't fit in MemoryMB, spilled to Parquet partitions by
+## MMSI in TempFolder (the system temp folder by default), so every vessel lands in one partition. Each partition is
+## then loaded on its own, sorted by MMSI and time and split into tracks (SplitTracks). Yields (Paths, TrackTable)
+## per partition with track ids running on across partitions; Fields maps the point roles to the file's column names.
+def StreamTracks(sources, Fields=None, GapMinutes=GAP_MINUTES, GapKm=GAP_KM, MemoryMB=1024, ChunkRows=None, TempFolder=None):
+    Fields = dict(POINT_FIELDS, **(Fields or {}))
+    sources = ExpandDatasets(sources)
+    ChunkRows = ChunkRows or max(10000, MemoryMB * 1024 ** 2 // (_POINT_BYTES * 4))
+    n_partitions = PartitionCount(sources, MemoryMB)
+    FirstId = 0
+    if n_partitions == 1:
+        chunks = list(_point_chunks(sources, Fields, ChunkRows))
+        points = pd.concat(chunks, ignore_index=True) if chunks else _empty_points()
+        yield SplitTracks(points, FirstId, GapMinutes, GapKm)
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    folder = tempfile.mkdtemp(prefix="ais_points_", dir=TempFolder)
+    writers = {}
+    try:
+        for chunk in _point_chunks(sources, Fields, ChunkRows):
+            partition = pd.util.hash_array(chunk["MMSI"].to_numpy()) % n_partitions
+            for index in np.unique(partition):
+                table = pa.Table.from_pandas(chunk[partition == index], preserve_index=False)
+                if index not in writers:
+                    writers[index] = pq.ParquetWriter(os.path.join(folder, f"points_{index:05d}.parquet"), table.schema)
+                writers[index].write_table(table)
+        for writer in writers.values():
+            writer.close()
+        for index in sorted(writers):
+            points = pd.read_parquet(os.path.join(folder, f"points_{index:05d}.parquet"))
+            tracks, TrackTable = SplitTracks(points, FirstId, GapMinutes, GapKm)
+            FirstId += len(tracks.ids)
+            yield tracks, TrackTable
+    finally:
+        for writer in writers.values():
+            writer.close()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+## Summary straight from raw AIS points: every partition of StreamTracks goes through the crossing engine and is
+## reduced to its partial, and the partials are folded as they come, so only one partition of points and tracks is
+## ever held. Passage lines must be in the point coordinates (longitude/latitude). Period summarizes by track start
+## date. Returns the merged partial and the summary table.
+def PointSummary(sources, lines, LineTable, NameField, Fields=None, MultipleInt="true", Polygon=False, Simplified="false", CustomName="",
+                 CustomTypes=None, Categories=None, Period=None, GapMinutes=GAP_MINUTES, GapKm=GAP_KM, MemoryMB=1024, ChunkRows=None,
+                 TempFolder=None, Prefilter=True, PrefilterTolerance=0.0):
+    partial = None
+    for tracks, TrackTable in StreamTracks(sources, Fields, GapMinutes, GapKm, MemoryMB, ChunkRows, TempFolder):
+        temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable, MultipleInt, Polygon, Prefilter, PrefilterTolerance)
+        PeriodField = None
+        if Period:
+            PeriodField = PERIOD_FIELD
+            temp_out_df[PeriodField] = PeriodKeys(temp_out_df["BaseDateTime"], Period)
+        part = PartialAggregate(temp_out_df, NameField, "VesselType", "MMSI", "Length", PeriodField, OrderFields=("Track_ID", "Line_ID"))
+        partial = part if partial is None else MergePartials([partial, part])
+    return partial, PartialSummary(partial, Simplified, CustomName, CustomTypes, Categories, Period, "Length")
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import cProfile
+import json
+import os
+import platform
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+
+## stages of a PassageLineSummary run, in run order
+STAGES = ["count", "geometry", "load", "interactions", "summary", "simplified", "output"]
+
+## Measurements of one stage. wall and cpu are seconds; peak_rss is the process peak resident set in bytes at the
+## end of the stage (a high-water mark, so the stage where it jumps is the one that needed the memory), None where
+## the platform can't tell; rows_in/rows_out are the row counts going into and out of the stage, None if not set.
+StageRecord = namedtuple("StageRecord", ["stage", "wall", "cpu", "peak_rss", "rows_in", "rows_out"])
+
+
+## Peak resident set of this process in bytes: getrusage on Linux/macOS, psutil (peak working set) on Windows
+def PeakRSS():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        memory = psutil.Process().memory_info()
+        return getattr(memory, "peak_wset", memory.rss)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _megabytes(size):
+    return "n/a" if size is None else f"{size / 1024 ** 2:,.0f} MB"
+
+
+def _count(rows):
+    return "-" if rows is None else f"{rows:,}"
+
+
+## Per-stage instrumentation of a run. Wrap every stage in stage(name, rows_in) and set rows_out on the record dict it
+## yields; every finished stage is sent to Message (i.e. arcpy.AddMessage) and kept for the JSON run report.
+## ProfileStage names a stage to run under cProfile, its stats are dumped to ProfilePath (.prof, for pstats/snakeviz).
+## Disabled, stage() hands out an empty context and measures nothing.
+class Instruments:
+
+    def __init__(self, Enabled=True, Message=print, ProfileStage="", ProfilePath=""):
+        self.enabled = Enabled
+        self.message = Message
+        self.profile_stage = ProfileStage
+        self.profile_path = ProfilePath or f"{ProfileStage}.prof"
+        self.records = []
+        self.profiled = False
+        self.started = time.perf_counter()
+
+    def stage(self, name, rows_in=None):
+        if not self.enabled:
+            return nullcontext({})
+        return self._measure(name, rows_in)
+
+    @contextmanager
+    def _measure(self, name, rows_in):
+        record = {"rows_in": rows_in, "rows_out": None}
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(self.profile_path)
+                self.profiled = True
+            stage = StageRecord(name, time.perf_counter() - wall, time.process_time() - cpu, PeakRSS(), record["rows_in"], record["rows_out"])
+            self.records.append(stage)
+            rows = "" if stage.rows_in is None and stage.rows_out is None else f", rows {_count(stage.rows_in)} -> {_count(stage.rows_out)}"
+            self.message(f"Stage {name}: {stage.wall:.2f} s wall, {stage.cpu:.2f} s CPU, peak RSS {_megabytes(stage.peak_rss)}{rows}")
+
+    ## Stage records as a list of dicts, stages run more than once (i.e. output per period) kept as separate entries
+    def summary(self):
+        return [stage._asdict() for stage in self.records]
+
+    ## Write the JSON run report: run information, every stage record and the slowest stage. Returns the path.
+    def report(self, path, **info):
+        stages = self.summary()
+        slowest = max(stages, key=lambda stage: stage["wall"])["stage"] if stages else None
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "platform": platform.platform(),
+            "wall": time.perf_counter() - self.started, "peak_rss": PeakRSS(), "slowest": slowest, "stages": stages,
+            "profile": os.path.abspath(self.profile_path) if self.profiled else None,
+            "run": info,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        return path
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .categories import BuildCategoryScheme, CategoryLookup, ClassifyVesselTypes, OTHER
+from .summary import LengthMean
+
+## Mergeable vessel length sketch of every group (i.e. period, passage line, vessel category).
+## stats: one row per group, the keys columns with Count, Sum, Min, Max and the fixed-bin histogram counts.
+## centroids: t-digest centroids of the groups (Group: stats row, Mean, Weight, Pure), sorted by group and mean, at
+##            most about compression per group. Pure centroids hold a single repeated length.
+## Sketches of partitions, files or periods merge by concatenating and re-compressing.
+LengthSketch = namedtuple("LengthSketch", ["keys", "stats", "centroids", "bins", "compression"])
+
+## histogram bin edges (m), the last bin is open ended
+LENGTH_BINS = (0, 10, 20, 30, 50, 75, 100, 150, 200, 250, 300, 400)
+COMPRESSION = 100
+QUANTILES = {"Median_Len": 0.5, "P90_Len": 0.9, "P95_Len": 0.95}
+TOTAL = "Total"
+
+
+def _bin_names(bins):
+    edges = list(bins) + [None]
+    return [f"Len_{lo}_{hi}" if hi is not None else f"Len_{lo}_up" for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+## Codes of the distinct key rows of a frame (first appearance order) and the distinct keys. Every column is factorized
+## on its own and the codes combined, which is much faster than hashing row tuples.
+def _factorize_keys(frame):
+    combined = np.zeros(len(frame), dtype="int64")
+    for column in frame.columns:
+        codes, uniques = pd.factorize(frame[column], use_na_sentinel=False)
+        combined = combined * max(len(uniques), 1) + codes
+    codes, uniques = pd.factorize(combined)
+    first = np.unique(codes, return_index=True)[1]
+    return codes, frame.iloc[first].reset_index(drop=True)
+
+
+## Position of every row within its run of equal codes (codes sorted), and the weight summed before it in the run
+def _run_cumsum(codes, weight):
+    cumulative = np.cumsum(weight)
+    starts = np.r_[0, np.flatnonzero(np.diff(codes)) + 1]
+    before = np.repeat(cumulative[starts] - weight[starts], np.diff(np.r_[starts, len(codes)]))
+    return cumulative - before
+
+
+## Merge the centroids of every group into at most about compression clusters. Centroids are sorted by mean within
+## their group and assigned to the unit of the k1 scale (compression / pi * asin(2q - 1)) holding their mid quantile,
+## so clusters are small in the tails (where p90/p95 are read) and larger around the median.
+def _compress(group, mean, weight, pure, compression, n_groups):
+    order = np.lexsort((mean, group))
+    group, mean, weight, pure = group[order], mean[order], weight[order], pure[order]
+    if not len(group):
+        return pd.DataFrame({"Group": group, "Mean": mean, "Weight": weight, "Pure": pure})
+    total = np.bincount(group, weights=weight, minlength=n_groups)[group]
+    middle = np.clip((_run_cumsum(group, weight) - weight / 2) / total, 0, 1)
+    bucket = np.floor(compression / np.pi * np.arcsin(2 * middle - 1)).astype("int64")
+    starts = np.r_[0, np.flatnonzero((np.diff(group) != 0) | (np.diff(bucket) != 0)) + 1]
+    ends = np.r_[starts[1:], len(group)] - 1
+    merged_weight = np.add.reduceat(weight, starts)
+    return pd.DataFrame({
+        "Group": group[starts],
+        "Mean": np.add.reduceat(mean * weight, starts) / merged_weight,
+        "Weight": merged_weight,
+        "Pure": np.logical_and.reduceat(pure, starts) & (mean[starts] == mean[ends]),
+    })
+
+
+## Combine stats rows (and their centroids) that share the same keys, for merges and collapses onto fewer keys
+def _combine(stats, centroids, keys, bins, compression):
+    codes, key_rows = _factorize_keys(stats[keys])
+    histogram = _bin_names(bins)
+    grouped = stats[["Count", "Sum"] + histogram].groupby(codes, sort=True).sum()
+    merged = key_rows.copy()
+    merged["Count"] = grouped["Count"].to_numpy()
+    merged["Sum"] = grouped["Sum"].to_numpy()
+    merged["Min"] = stats["Min"].groupby(codes, sort=True).min().to_numpy()
+    merged["Max"] = stats["Max"].groupby(codes, sort=True).max().to_numpy()
+    for name in histogram:
+        merged[name] = grouped[name].to_numpy()
+    centroids = _compress(codes[centroids["Group"].to_numpy()], centroids["Mean"].to_numpy(), centroids["Weight"].to_numpy(dtype="float64"),
+                          centroids["Pure"].to_numpy(dtype=bool), compression, len(merged))
+    return LengthSketch(list(keys), merged, centroids, tuple(bins), compression)
+
+
+## Length sketch of every KeyFields group of a crossing table (one length per row, missing lengths ignored)
+def LengthSketches(temp_out_df, KeyFields, LengthField, Bins=LENGTH_BINS, Compression=COMPRESSION):
+    keys = list(KeyFields)
+    lengths = pd.to_numeric(temp_out_df[LengthField], errors="coerce")
+    valid = lengths.notna().to_numpy()
+    group, key_rows = _factorize_keys(temp_out_df.loc[valid, keys])
+    length = lengths.to_numpy(dtype="float64")[valid]
+    n_groups = len(key_rows)
+
+    order = np.lexsort((length, group))
+    group, length = group[order], length[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(group)) + 1] if len(group) else np.zeros(0, dtype="int64")
+    stats = key_rows.copy()
+    stats["Count"] = np.bincount(group, minlength=n_groups)
+    stats["Sum"] = np.bincount(group, weights=length, minlength=n_groups)
+    stats["Min"] = length[starts]
+    stats["Max"] = length[np.r_[starts[1:], len(group)] - 1] if len(group) else length[starts]
+    histogram = _bin_names(Bins)
+    bin_index = np.clip(np.searchsorted(np.asarray(Bins, dtype="float64"), length, side="right") - 1, 0, len(Bins) - 1)
+    counts = np.bincount(group * len(histogram) + bin_index, minlength=n_groups * len(histogram)).reshape(n_groups, len(histogram))
+    for index, name in enumerate(histogram):
+        stats[name] = counts[:, index]
+
+    ## one pure centroid per distinct length of a group
+    distinct = np.r_[0, np.flatnonzero((np.diff(group) != 0) | (np.diff(length) != 0)) + 1] if len(group) else starts
+    weight = np.diff(np.r_[distinct, len(group)]).astype("float64")
+    centroids = _compress(group[distinct], length[distinct], weight, np.ones(len(distinct), dtype=bool), Compression, n_groups)
+    return LengthSketch(keys, stats, centroids, tuple(Bins), Compression)
+
+
+## Merge length sketches of partitions, files or runs group by group. All must share keys, bins and compression.
+def MergeLengthSketches(sketches):
+    sketches = list(sketches)
+    first = sketches[0]
+    if any(sketch.keys != first.keys or sketch.bins != first.bins for sketch in sketches):
+        raise ValueError("Only length sketches with the same keys and bins can be merged")
+    offsets = np.cumsum([0] + [len(sketch.stats) for sketch in sketches])
+    stats = pd.concat([sketch.stats for sketch in sketches], ignore_index=True)
+    centroids = pd.concat([sketch.centroids.assign(Group=sketch.centroids["Group"] + offset) for sketch, offset in zip(sketches, offsets)],
+                          ignore_index=True)
+    return _combine(stats, centroids, first.keys, first.bins, first.compression)
+
+
+## Combine groups over the key columns not listed in by, i.e. by=["Name"] gives the all-category (and all-period)
+## distribution of every line
+def CollapseLengthSketches(sketch, by):
+    return _combine(sketch.stats, sketch.centroids, list(by), sketch.bins, sketch.compression)
+
+
+## Quantiles of every group of a sketch, in stats row order. Values are interpolated between the centroids (Min at 0,
+## Max at 1), mixed centroids sitting at their mid cumulative weight and pure ones spanning the positions of their
+## repeated length, which equals the "hazen" sample quantile while a group has fewer distinct lengths than the
+## narrowest k1 unit holds apart (about 2 / pi * compression, where the units around the median start merging).
+def LengthQuantiles(sketch, quantiles=tuple(QUANTILES.values())):
+    stats = sketch.stats
+    n_groups = len(stats)
+    quantiles = np.asarray(quantiles, dtype="float64")
+    if not n_groups:
+        return np.zeros((0, len(quantiles)))
+    centroids = sketch.centroids
+    codes = centroids["Group"].to_numpy()
+    mean = centroids["Mean"].to_numpy()
+    weight = centroids["Weight"].to_numpy(dtype="float64")
+    pure = centroids["Pure"].to_numpy(dtype=bool)
+    cumulative = _run_cumsum(codes, weight)
+    total = np.bincount(codes, weights=weight, minlength=n_groups)[codes]
+    first = np.where(pure, cumulative - weight + 0.5, cumulative - weight / 2) / total
+    last = np.where(pure, cumulative - 0.5, cumulative - weight / 2) / total
+
+    group = np.arange(n_groups)
+    codes = np.concatenate([group, codes, codes, group])
+    position = np.concatenate([np.zeros(n_groups), first, last, np.ones(n_groups)])
+    values = np.concatenate([stats["Min"].to_numpy(dtype="float64"), mean, mean, stats["Max"].to_numpy(dtype="float64")])
+    order = np.lexsort((position, codes))
+    key = codes[order] * 2.0 + position[order]
+    values = values[order]
+
+    target = (group[:, None] * 2.0 + quantiles[None, :]).ravel()
+    upper = np.clip(np.searchsorted(key, target, side="left"), 1, len(key) - 1)
+    lower = upper - 1
+    span = key[upper] - key[lower]
+    fraction = np.where(span > 0, (target - key[lower]) / np.where(span > 0, span, 1), 1.0)
+    result = values[lower] + fraction * (values[upper] - values[lower])
+    result = np.where(key[upper] == target, values[upper], result)
+    return result.reshape(n_groups, len(quantiles))
+
+
+## Length distribution table of a sketch: Count, Max_Len, Avg_Len, Median_Len, P90_Len, P95_Len and the histogram
+def LengthTable(sketch):
+    stats = sketch.stats
+    table = stats[sketch.keys].copy()
+    table["Count"] = stats["Count"].to_numpy(dtype="int64")
+    table["Max_Len"] = stats["Max"].round(2).to_numpy()
+    table["Avg_Len"] = np.round(LengthMean(stats["Sum"], stats["Count"]), 2)
+    values = LengthQuantiles(sketch, list(QUANTILES.values()))
+    for index, name in enumerate(QUANTILES):
+        table[name] = np.round(values[:, index], 2)
+    for name in _bin_names(sketch.bins):
+        table[name] = stats[name].to_numpy(dtype="int64")
+    return table
+
+
+## Length sketch of a crossing table keyed by ([PeriodField,] NameField, "Category"), the simplified category of every
+## row. Sketches of batches or partitions merge with MergeLengthSketches into the Sketch LengthDistribution takes.
+def CategoryLengthSketches(temp_out_df, NameField, LengthField, VesselTypes, PeriodField=None, CustomName="", CustomTypes=None, Categories=None,
+                           Bins=LENGTH_BINS, Compression=COMPRESSION):
+    scheme = BuildCategoryScheme(Categories, CustomName, CustomTypes)
+    names = [name for name, codes in scheme] + [OTHER]
+    line_keys = ([PeriodField] if PeriodField else []) + [NameField]
+    rows = temp_out_df[temp_out_df[NameField].notna().to_numpy()].copy()
+    if PeriodField:
+        rows = rows[rows[PeriodField].notna().to_numpy()]
+        rows[PeriodField] = np.asarray(rows[PeriodField], dtype=object)
+    rows["Category"] = np.asarray(names, dtype=object)[ClassifyVesselTypes(rows[VesselTypes], CategoryLookup(scheme), len(scheme))]
+    return LengthSketches(rows, line_keys + ["Category"], LengthField, Bins, Compression)
+
+
+## Vessel length distribution per passage line (and period) and simplified vessel category, plus a "Total" row per
+## line over every category, from one grouped pass over the crossing table (one length per crossing row, like
+## Max_Len/Avg_Len of the simplified table). Sketch takes an already merged LengthSketch keyed by ([PeriodField,]
+## NameField, "Category"), i.e. from CategoryLengthSketches over partitions merged with MergeLengthSketches.
+def LengthDistribution(temp_out_df, NameField, LengthField, VesselTypes, PeriodField=None, CustomName="", CustomTypes=None, Categories=None,
+                       Bins=LENGTH_BINS, Compression=COMPRESSION, Sketch=None):
+    scheme = BuildCategoryScheme(Categories, CustomName, CustomTypes)
+    names = [name for name, codes in scheme] + [OTHER]
+    line_keys = ([PeriodField] if PeriodField else []) + [NameField]
+    if Sketch is None:
+        Sketch = CategoryLengthSketches(temp_out_df, NameField, LengthField, VesselTypes, PeriodField, CustomName, CustomTypes, Categories, Bins, Compression)
+
+    by_category = LengthTable(Sketch)
+    total = LengthTable(CollapseLengthSketches(Sketch, line_keys))
+    total.insert(len(line_keys), "Category", TOTAL)
+    table = pd.concat([by_category, total], ignore_index=True)
+    rank = {name: index for index, name in enumerate(names + [TOTAL])}
+    table["_rank"] = table["Category"].map(rank)
+    sort = line_keys + ["_rank"]
+    if PeriodField and temp_out_df is not None and isinstance(temp_out_df[PeriodField].dtype, pd.CategoricalDtype):
+        periods = temp_out_df[PeriodField].cat.categories
+        table[PeriodField] = pd.Categorical(table[PeriodField], categories=periods, ordered=True)
+    table = table.sort_values(sort, kind="stable").drop(columns="_rank").reset_index(drop=True)
+    if PeriodField:
+        table[PeriodField] = table[PeriodField].astype(object)
+    return table.rename(columns={NameField: "Name"})
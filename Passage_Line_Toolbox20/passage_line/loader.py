@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import os
+
+import numpy as np
+import pandas as pd
+
+## placeholder TableToNumPyArray writes for null integers, turned back into NaN after the read
+INT_NULL = np.iinfo("int32").min
+## placeholder for null text, a Unicode noncharacter that can't be in the data and fits any field width (an empty
+## string would be taken for a null, and NumPy drops a NUL character)
+STRING_NULL = "\uffff"
+
+FILE_EXTENSIONS = {".parquet": "parquet", ".pq": "parquet", ".csv": "csv", ".txt": "csv"}
+
+
+## Field names the summary reads from the intersect output, in order and without blanks or repeats
+def SummaryFields(*fields):
+    needed = []
+    for field in fields:
+        if field and field not in needed:
+            needed.append(field)
+    return needed
+
+
+## Bulk read of a geodatabase table or feature class, only the requested fields, as typed NumPy columns
+def _load_arcpy(source, fields, where_clause):
+    import arcpy
+
+    field_types = {field.name: field.type for field in arcpy.ListFields(source)}
+    missing = [field for field in fields if field not in field_types]
+    if missing:
+        raise ValueError(f"{source} has no field(s): {', '.join(missing)}")
+
+    nulls = {}
+    for field in fields:
+        if field_types[field] in ("Double", "Single"):
+            nulls[field] = np.nan
+        elif field_types[field] in ("Integer", "SmallInteger", "BigInteger"):
+            nulls[field] = INT_NULL
+        elif field_types[field] in ("String", "GUID", "GlobalID"):
+            nulls[field] = STRING_NULL
+        elif field_types[field] == "Date":
+            nulls[field] = np.datetime64("NaT")
+    array = arcpy.da.TableToNumPyArray(source, fields, where_clause=where_clause or "", null_value=nulls)
+    columns = pd.DataFrame(array)
+    for field in fields:
+        if nulls.get(field) is INT_NULL and (columns[field] == INT_NULL).any():
+            columns[field] = columns[field].where(columns[field] != INT_NULL)
+        elif nulls.get(field) is STRING_NULL and (columns[field] == STRING_NULL).any():
+            columns[field] = columns[field].where(columns[field] != STRING_NULL)
+    return columns
+
+
+## Read a columnar file, only the requested fields
+def _load_file(source, fields, kind, dates):
+    if kind == "parquet":
+        columns = pd.read_parquet(source, columns=list(fields))
+    else:
+        columns = pd.read_csv(source, usecols=list(fields), parse_dates=[field for field in dates if field in fields])
+    return columns[list(fields)]
+
+
+## Load only the named columns of a table into a DataFrame of typed arrays. Sources ending in .parquet/.pq/.csv/.txt
+## are read with pandas, anything else is treated as an arcpy table or feature class and read with TableToNumPyArray.
+## where_clause only applies to arcpy sources; dates lists the CSV fields to parse as datetimes.
+def LoadColumns(source, fields, where_clause=None, dates=()):
+    fields = SummaryFields(*fields)
+    kind = FILE_EXTENSIONS.get(os.path.splitext(str(source))[1].lower())
+    if kind:
+        return _load_file(source, fields, kind, dates)
+    return _load_arcpy(source, fields, where_clause)
+
+
+## Number of lines of a text file, the last one counted whether or not it ends with a newline
+def _line_count(source):
+    lines, last = 0, b"\n"
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    return lines + (last != b"\n")
+
+
+## Number of rows of a table without reading any attributes: GetCount for arcpy sources, the footer metadata for
+## Parquet files and a line count for CSV files (less the header).
+def CountRows(source):
+    kind = FILE_EXTENSIONS.get(os.path.splitext(str(source))[1].lower())
+    if kind == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(source).metadata.num_rows
+    if kind == "csv":
+        return max(_line_count(source) - 1, 0)
+    import arcpy
+    return int(arcpy.management.GetCount(source)[0])
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .aggregate import MergePartials, PartialAggregate, PartialSummary
+from .crossings import SubsetPaths
+from .engine import IntersectTracks
+from .periods import PERIOD_FIELD, PeriodKeys
+from .prefilter import FeatureEnvelopes
+
+## passage lines and run options, sent to every worker once by the pool initializer
+_WORKER = {}
+
+
+## Split track features into partitions of at most PartitionSize tracks. "oid" partitions are runs of the track ids in
+## sorted order, "tile" partitions group tracks by the square tile (TileSize map units) holding their envelope centre.
+## Every track lands in exactly one partition, so per-pair crossing counts never straddle partitions.
+def PartitionTracks(tracks, PartitionSize=50000, Partition="oid", TileSize=None):
+    order = np.argsort(tracks.ids, kind="stable")
+    if Partition == "tile":
+        lo, hi = FeatureEnvelopes(tracks)
+        centre = np.where(np.isfinite(lo), (lo + hi) / 2, 0.0)
+        if not TileSize:
+            extent = centre.max(axis=0) - centre.min(axis=0) if len(centre) else np.ones(2)
+            TileSize = max(extent.max() / 8, 1e-12)
+        tile = np.floor((centre - centre.min(axis=0)) / TileSize).astype("int64")
+        tile_key = tile[:, 1] * (tile[:, 0].max(initial=0) + 1) + tile[:, 0]
+        order = order[np.argsort(tile_key[order], kind="stable")]
+        groups = np.split(order, np.flatnonzero(np.diff(tile_key[order])) + 1)
+    elif Partition == "oid":
+        groups = [order]
+    else:
+        raise ValueError(f"Unknown partition mode: {Partition}")
+    partitions = []
+    for group in groups:
+        partitions.extend(group[start:start + PartitionSize] for start in range(0, len(group), PartitionSize))
+    return [partition for partition in partitions if len(partition)]
+
+
+def _init_worker(state):
+    _WORKER.clear()
+    _WORKER.update(state)
+
+
+## Crossing detection and (line, type, MMSI) aggregation of one partition, run inside a worker process
+def _partition_partial(tracks, TrackTable):
+    state = _WORKER
+    temp_out_df = IntersectTracks(tracks, state["lines"], TrackTable, state["LineTable"], state["MultipleInt"], state["Polygon"],
+                                  state["Prefilter"], state["PrefilterTolerance"])
+    PeriodField = None
+    if state["Period"] and state["DateField"]:
+        PeriodField = PERIOD_FIELD
+        temp_out_df[PeriodField] = PeriodKeys(temp_out_df[state["DateField"]], state["Period"])
+    return PartialAggregate(temp_out_df, state["NameField"], state["VesselTypes"], state["MMSI"], state["LengthField"], PeriodField,
+                            OrderFields=("Track_ID", "Line_ID"))
+
+
+## Parallel NumPy run: the tracks are split into partitions (PartitionTracks), every partition is intersected and
+## reduced to a partial in a ProcessPoolExecutor with Workers processes, and the partials are merged in partition
+## order. Because partials keep exact MMSI sets and first-row order keys, the tables are identical to a serial run.
+## Returns the merged partial and the summary table.
+def ParallelSummary(tracks, lines, TrackTable, LineTable, NameField, VesselTypes, MMSI, LengthField="", MultipleInt="true", Polygon=False,
+                    Simplified="false", CustomName="", CustomTypes=None, Categories=None, DateField="", Period=None,
+                    Workers=None, PartitionSize=50000, Partition="oid", TileSize=None, Prefilter=True, PrefilterTolerance=0.0):
+    state = {
+        "lines": lines, "LineTable": LineTable, "NameField": NameField, "VesselTypes": VesselTypes, "MMSI": MMSI,
+        "LengthField": LengthField, "MultipleInt": MultipleInt, "Polygon": Polygon, "DateField": DateField, "Period": Period,
+        "Prefilter": Prefilter, "PrefilterTolerance": PrefilterTolerance,
+    }
+    jobs = []
+    for partition in PartitionTracks(tracks, PartitionSize, Partition, TileSize):
+        keep = np.zeros(len(tracks.ids), dtype=bool)
+        keep[partition] = True
+        subset = SubsetPaths(tracks, keep)
+        jobs.append((subset, TrackTable.reindex(subset.ids)))
+
+    Workers = Workers or os.cpu_count() or 1
+    if Workers == 1:
+        _init_worker(state)
+        partials = [_partition_partial(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=Workers, initializer=_init_worker, initargs=(state,)) as executor:
+            partials = list(executor.map(_partition_partial, *zip(*jobs))) if jobs else []
+
+    if not partials:
+        _init_worker(state)
+        partials = [_partition_partial(SubsetPaths(tracks, np.zeros(len(tracks.ids), dtype=bool)), TrackTable.iloc[:0])]
+    merged = MergePartials(partials)
+    return merged, PartialSummary(merged, Simplified, CustomName, CustomTypes, Categories, Period, LengthField)
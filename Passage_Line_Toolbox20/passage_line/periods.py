@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import numpy as np
+import pandas as pd
+
+## Period names accepted for interval binning and the pandas period frequency behind each
+PERIODS = {"day": "D", "week": "W", "month": "M", "quarter": "Q", "year": "Y"}
+
+PERIOD_FIELD = "Period"
+
+
+## Parse a period setting. Returns a pandas frequency for a named period, or sorted bin edges for an explicit list of
+## dates (a list, or a ";" separated string like the toolbox multi-value parameters).
+def ParsePeriod(Period):
+    if isinstance(Period, str):
+        if Period.strip().lower() in PERIODS:
+            return PERIODS[Period.strip().lower()]
+        Period = [edge.strip() for edge in Period.split(";") if edge.strip()]
+    edges = pd.DatetimeIndex(pd.to_datetime(list(Period))).sort_values()
+    if len(edges) < 2:
+        raise ValueError("Explicit period bins need at least two edges")
+    return edges
+
+
+## Label of each pandas Period, days and weeks by their start date
+def _period_names(labels, freq):
+    if freq == "D" or freq == "W":
+        return [str(label.start_time.date()) for label in labels]
+    return [str(label) for label in labels]
+
+
+## Complete chronological list of period labels spanning a set of labels, as PeriodKeys would have produced over all
+## their dates together. Used when partial results (partitions, files, runs) each only saw part of the date range.
+def CompletePeriods(labels, Period):
+    bins = ParsePeriod(Period)
+    if not isinstance(bins, str):
+        return [f"{start.date()}_{end.date()}" for start, end in zip(bins[:-1], bins[1:])]
+    periods = [pd.Period(label, freq=bins) for label in pd.unique(pd.Series(list(labels)).dropna())]
+    if not periods:
+        return []
+    return _period_names(pd.period_range(min(periods), max(periods), freq=bins), bins)
+
+
+## Label every date with its period key as an ordered categorical (chronological categories, including empty periods
+## between the first and last date). Named periods are labelled like "2021-03", "2021Q1" or "2021"; explicit bins are
+## half open [edge, next edge) and labelled "start_end". Dates outside the bins or missing get no label (NaN).
+def PeriodKeys(dates, Period):
+    dates = pd.Series(pd.to_datetime(dates))
+    bins = ParsePeriod(Period)
+    if isinstance(bins, str):
+        periods = dates.dt.to_period(bins)
+        valid = periods.dropna()
+        if len(valid):
+            labels = pd.period_range(valid.min(), valid.max(), freq=bins)
+        else:
+            labels = pd.PeriodIndex([], freq=bins)
+        names = _period_names(labels, bins)
+        codes = pd.Index(labels).get_indexer(periods)
+    else:
+        names = [f"{start.date()}_{end.date()}" for start, end in zip(bins[:-1], bins[1:])]
+        codes = np.searchsorted(bins.values, dates.values, side="right") - 1
+        codes[(codes >= len(names)) | dates.isna().to_numpy()] = -1
+    return pd.Categorical.from_codes(codes, categories=names, ordered=True)
+
+
+## Date window filter on the date field, both ends inclusive. Blank ends leave that side open.
+def DateWindow(dates, StartInterval="", EndInterval=""):
+    dates = pd.Series(pd.to_datetime(dates))
+    keep = np.ones(len(dates), dtype=bool)
+    if StartInterval:
+        keep &= (dates >= pd.to_datetime(StartInterval)).to_numpy()
+    if EndInterval:
+        keep &= (dates <= pd.to_datetime(EndInterval)).to_numpy()
+    return keep
+
+
+## SQL where clause for the same window, so the tracks can be filtered before the geometry stage. field is the
+## delimited field name (arcpy.AddFieldDelimiters); dates use the file geodatabase date 'YYYY-MM-DD HH:MM:SS' form.
+def DateWhereClause(field, StartInterval="", EndInterval=""):
+    clauses = []
+    if StartInterval:
+        clauses.append(f"{field} >= date '{pd.to_datetime(StartInterval):%Y-%m-%d %H:%M:%S}'")
+    if EndInterval:
+        clauses.append(f"{field} <= date '{pd.to_datetime(EndInterval):%Y-%m-%d %H:%M:%S}'")
+    return " AND ".join(clauses)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import numpy as np
+
+from .crossings import _SegmentGrid
+
+
+## Envelope (xmin, ymin) / (xmax, ymax) of every feature of a Paths. Features without vertices get an empty envelope.
+def FeatureEnvelopes(paths):
+    n_features = len(paths.ids)
+    lo = np.full((n_features, 2), np.inf)
+    hi = np.full((n_features, 2), -np.inf)
+    vertex_feature = np.repeat(paths.feature, np.diff(paths.offsets))
+    if len(vertex_feature):
+        ## paths of a feature are consecutive, so each feature is one run of vertices
+        starts = np.r_[0, np.flatnonzero(np.diff(vertex_feature)) + 1]
+        features = vertex_feature[starts]
+        lo[features] = np.minimum.reduceat(paths.xy, starts, axis=0)
+        hi[features] = np.maximum.reduceat(paths.xy, starts, axis=0)
+    return lo, hi
+
+
+## Flag the tracks whose envelope touches the envelope of at least one passage line, grown by tolerance on every
+## side. Tracks that fail cannot cross any passage line and can be dropped before the crossing stage.
+def EnvelopePrefilter(tracks, lines, tolerance=0.0):
+    keep = np.zeros(len(tracks.ids), dtype=bool)
+    line_lo, line_hi = FeatureEnvelopes(lines)
+    filled = np.isfinite(line_lo).all(axis=1)
+    if not filled.any():
+        return keep
+    grid = _SegmentGrid(line_lo[filled] - tolerance, line_hi[filled] + tolerance)
+    track_lo, track_hi = FeatureEnvelopes(tracks)
+    query, line = grid.candidates(track_lo, track_hi)
+    keep[query] = True
+    return keep
+
+
+## Buffer distance of the toolbox envelope prefilter, as a linear unit string: the tolerance when one above zero was
+## given (a GPLinearUnit such as "100 Meters"), else ten XY tolerances in the units of the passage lines. The envelope
+## of a straight, axis-aligned passage line has no area, the buffer gives it one.
+def PrefilterDistance(PrefilterTolerance, XYTolerance=None):
+    value = str(PrefilterTolerance or "").split()
+    if value and float(value[0].replace(",", ".")) > 0:
+        return " ".join(value)
+    return repr(10 * (XYTolerance if XYTolerance and XYTolerance > 0 else 0.001))
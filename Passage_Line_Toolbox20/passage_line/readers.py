@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import itertools
+import json
+import os
+import re
+import struct
+
+import numpy as np
+import pandas as pd
+
+from .crossings import BuildPaths
+
+## geometry file formats read without arcpy, by extension. Anything else is read as a feature class through arcpy.
+GEOMETRY_EXTENSIONS = {".parquet": "geoparquet", ".geoparquet": "geoparquet", ".pq": "geoparquet", ".geojson": "geojson",
+                       ".json": "geojson", ".csv": "wkt", ".txt": "wkt"}
+
+## WKB/WKT/GeoJSON geometry types by their base WKB type code, and the codes of the polygon types
+_POLYGON_TYPES = {3, 6}
+_WKB_TYPES = {1: "Point", 2: "LineString", 3: "Polygon", 4: "MultiPoint", 5: "MultiLineString", 6: "MultiPolygon", 7: "GeometryCollection"}
+
+
+## Parts ((n, 2) x/y arrays: line parts, polygon rings) of one WKB geometry, read from offset. Handles both byte
+## orders, ISO (1000/2000/3000) and EWKB (flag bits) Z/M dimensions and SRIDs. Returns the parts, the base type
+## codes met and the offset after the geometry.
+def _wkb_parts(data, offset=0):
+    order = "<" if data[offset] == 1 else ">"
+    code = struct.unpack_from(f"{order}I", data, offset + 1)[0]
+    offset += 5
+    dims = 2 + bool(code & 0x80000000) + bool(code & 0x40000000)
+    if code & 0x20000000:
+        offset += 4
+    code &= 0x0FFFFFFF
+    dims += {1: 1, 2: 1, 3: 2}.get(code // 1000, 0)
+    code %= 1000
+
+    def points(offset):
+        count = struct.unpack_from(f"{order}I", data, offset)[0]
+        values = np.frombuffer(data, dtype=f"{order}f8", count=count * dims, offset=offset + 4).reshape(count, dims)
+        return values[:, :2].astype("float64"), offset + 4 + 8 * count * dims
+
+    if code == 1:
+        return [], {code}, offset + 8 * dims
+    if code == 2:
+        part, offset = points(offset)
+        return [part], {code}, offset
+    count = struct.unpack_from(f"{order}I", data, offset)[0]
+    offset += 4
+    parts, codes = [], {code}
+    for index in range(count):
+        if code == 3:
+            part, offset = points(offset)
+            parts.append(part)
+        else:
+            sub_parts, sub_codes, offset = _wkb_parts(data, offset)
+            parts.extend(sub_parts)
+            codes |= sub_codes
+    return parts, codes, offset
+
+
+## Parts of one WKT geometry: every innermost parenthesised coordinate list is one line part or ring
+def _wkt_parts(text):
+    if not isinstance(text, str) or "EMPTY" in text.upper():
+        return [], set()
+    kind = text.strip().split("(", 1)[0].strip().split()[0].upper()
+    codes = {code for code, name in _WKB_TYPES.items() if name.upper() == kind}
+    parts = [np.array([point.split()[:2] for point in group.split(",")], dtype="float64") for group in re.findall(r"\(([^()]*)\)", text)]
+    return parts, codes
+
+
+## Parts of one GeoJSON geometry
+def _geojson_parts(geometry):
+    if not geometry:
+        return [], set()
+    kind = geometry["type"]
+    codes = {code for code, name in _WKB_TYPES.items() if name == kind}
+    if kind == "GeometryCollection":
+        parts = []
+        for member in geometry["geometries"]:
+            member_parts, member_codes = _geojson_parts(member)
+            parts.extend(member_parts)
+            codes |= member_codes
+        return parts, codes
+    coordinates = geometry["coordinates"]
+    if kind == "LineString":
+        coordinates = [coordinates]
+    elif kind == "MultiPolygon":
+        coordinates = [ring for polygon in coordinates for ring in polygon]
+    elif kind not in ("MultiLineString", "Polygon"):
+        coordinates = []
+    return [np.asarray(part, dtype="float64")[:, :2].reshape(-1, 2) for part in coordinates], codes
+
+
+## Shape type of a set of geometry type codes, "Polygon" when any feature is a (multi)polygon
+def _shape_type(codes):
+    return "Polygon" if codes & _POLYGON_TYPES else "Polyline"
+
+
+## Attribute columns of a table, only the requested fields (all of them when fields is None)
+def _columns(table, fields, source):
+    if fields is None:
+        return table
+    missing = [field for field in fields if field not in table.columns]
+    if missing:
+        raise ValueError(f"{source} has no field(s): {', '.join(missing)}")
+    return table[list(fields)]
+
+
+## Geometry column and the columns to read of a GeoParquet file
+def _geoparquet_columns(source, fields):
+    import pyarrow.parquet as pq
+
+    schema = pq.read_schema(source)
+    metadata = json.loads((schema.metadata or {}).get(b"geo", b"{}"))
+    geometry_field = metadata.get("primary_column", "geometry")
+    columns = None
+    if fields is not None:
+        columns = list(dict.fromkeys(list(fields) + [field for field in ("OBJECTID", geometry_field) if field in schema.names]))
+    return geometry_field, columns
+
+
+def _wkb_geometries(table, geometry_field):
+    geometries, codes = [], set()
+    for value in table.pop(geometry_field):
+        parts, part_codes, offset = _wkb_parts(value) if value is not None else ([], set(), 0)
+        geometries.append(parts)
+        codes |= part_codes
+    return geometries, codes, table
+
+
+def _read_geoparquet(source, fields):
+    import pyarrow.parquet as pq
+
+    geometry_field, columns = _geoparquet_columns(source, fields)
+    return _wkb_geometries(pq.read_table(source, columns=columns).to_pandas(), geometry_field)
+
+
+## Features of a GeoJSON file one at a time: the members of the "features" array of a FeatureCollection are decoded
+## from a buffer read 1 MB at a time, so only the features being batched are held; a file without a features array
+## (a single Feature or geometry) is read whole and yielded as one feature
+def _geojson_features(source):
+    decoder = json.JSONDecoder()
+    with open(source, "r", encoding="utf-8") as f:
+        text = ""
+        while True:
+            match = re.search(r'"features"\s*:\s*\[', text)
+            if match:
+                break
+            more = f.read(1 << 20)
+            if not more:
+                yield json.loads(text)
+                return
+            text += more
+        text, position = text[match.end():], 0
+        while True:
+            while position < len(text) and text[position] in " \t\r\n,":
+                position += 1
+            if position < len(text) and text[position] == "]":
+                return
+            if position < len(text):
+                try:
+                    feature, position = decoder.raw_decode(text, position)
+                    yield feature
+                    continue
+                except json.JSONDecodeError:
+                    pass
+            ## incomplete feature at the end of the buffer, read on
+            more = f.read(1 << 20)
+            if not more:
+                raise ValueError(f"{source} ends inside its features array")
+            text, position = text[position:] + more, 0
+
+
+def _geojson_table(features):
+    geometries, codes = [], set()
+    for feature in features:
+        parts, part_codes = _geojson_parts(feature.get("geometry"))
+        geometries.append(parts)
+        codes |= part_codes
+    return geometries, codes, pd.DataFrame([feature.get("properties") or {} for feature in features])
+
+
+def _geojson_batches(source, BatchRows):
+    features = _geojson_features(source)
+    while True:
+        batch = list(itertools.islice(features, BatchRows))
+        if not batch:
+            return
+        yield _geojson_table(batch)
+
+
+def _read_geojson(source, fields):
+    return _geojson_table(list(_geojson_features(source)))
+
+
+def _read_wkt(source, fields, GeometryField, table=None):
+    table = pd.read_csv(source) if table is None else table
+    geometries, codes = [], set()
+    for text in table.pop(GeometryField):
+        parts, part_codes = _wkt_parts(text)
+        geometries.append(parts)
+        codes |= part_codes
+    return geometries, codes, table
+
+
+## Features of a feature class or layer through a search cursor, BatchRows at a time (all at once without): parts of
+## every geometry (polygon rings are split at the null points between them), the attribute table and the shape type
+def _arcpy_batches(source, fields, where_clause, BatchRows=None):
+    import arcpy
+
+    fields = [field.name for field in arcpy.ListFields(source) if field.type not in ("Geometry", "OID", "Blob", "Raster")] if fields is None else list(fields)
+    shape_type = "Polygon" if arcpy.Describe(source).shapeType == "Polygon" else "Polyline"
+    geometries, rows = [], []
+    with arcpy.da.SearchCursor(source, ["OID@", "SHAPE@"] + fields, where_clause=where_clause or "") as cursor:
+        for row in cursor:
+            parts = []
+            for part in (row[1] or []):
+                ring = []
+                for point in part:
+                    if point is None:
+                        parts.append(np.array(ring, dtype="float64").reshape(-1, 2))
+                        ring = []
+                    else:
+                        ring.append((point.X, point.Y))
+                parts.append(np.array(ring, dtype="float64").reshape(-1, 2))
+            geometries.append(parts)
+            rows.append((row[0],) + tuple(row[2:]))
+            if BatchRows and len(rows) == BatchRows:
+                yield geometries, pd.DataFrame(rows, columns=["OBJECTID"] + fields), shape_type
+                geometries, rows = [], []
+    if rows or not BatchRows:
+        yield geometries, pd.DataFrame(rows, columns=["OBJECTID"] + fields), shape_type
+
+
+def _read_arcpy(source, fields, where_clause):
+    return next(_arcpy_batches(source, fields, where_clause))
+
+
+## Read line or polygon features for the NumPy engine: GeoParquet (WKB), GeoJSON and CSV with a WKT column
+## (GeometryField) without arcpy, any other source as a feature class through arcpy. Returns the Paths (polygons as
+## their rings), the attribute table indexed by the feature ids and the shape type ("Polyline" or "Polygon").
+## Feature ids are an OBJECTID column when there is one, else 1..n. fields limits the attributes read.
+def ReadFeatures(source, fields=None, GeometryField="WKT", where_clause=None):
+    kind = GEOMETRY_EXTENSIONS.get(os.path.splitext(str(source))[1].lower())
+    if kind is None:
+        geometries, table, shape_type = _read_arcpy(source, fields, where_clause)
+    else:
+        if kind == "geoparquet":
+            geometries, codes, table = _read_geoparquet(source, fields)
+        elif kind == "geojson":
+            geometries, codes, table = _read_geojson(source, fields)
+        else:
+            geometries, codes, table = _read_wkt(source, fields, GeometryField)
+        shape_type = _shape_type(codes)
+    return _features(geometries, table, shape_type, fields, source)
+
+
+## Paths and attribute table of read features, ids from an OBJECTID column or numbered from FirstId on
+def _features(geometries, table, shape_type, fields, source, FirstId=1):
+    ids = table["OBJECTID"].to_numpy() if "OBJECTID" in table.columns else np.arange(FirstId, FirstId + len(geometries))
+    table = _columns(table, fields, source).set_axis(pd.Index(ids, name="OBJECTID"))
+    return BuildPaths(geometries, ids=ids), table, shape_type
+
+
+## Read features in batches of BatchRows features (GeoParquet record batches, CSV chunks, GeoJSON features decoded
+## one at a time, search cursor rows) for chunked runs that never hold every feature at once. Yields the same (Paths,
+## table, shape type) as ReadFeatures, ids running on across batches.
+def ReadFeatureBatches(source, fields=None, GeometryField="WKT", BatchRows=100000, where_clause=None):
+    kind = GEOMETRY_EXTENSIONS.get(os.path.splitext(str(source))[1].lower())
+    if kind is None:
+        for geometries, table, shape_type in _arcpy_batches(source, fields, where_clause, BatchRows):
+            yield _features(geometries, table, shape_type, fields, source)
+        return
+    if kind == "geoparquet":
+        import pyarrow.parquet as pq
+
+        geometry_field, columns = _geoparquet_columns(source, fields)
+        batches = (_wkb_geometries(batch.to_pandas(), geometry_field) for batch in pq.ParquetFile(source).iter_batches(batch_size=BatchRows, columns=columns))
+    elif kind == "geojson":
+        batches = _geojson_batches(source, BatchRows)
+    else:
+        batches = (_read_wkt(source, fields, GeometryField, chunk) for chunk in pd.read_csv(source, chunksize=BatchRows))
+    FirstId = 1
+    for geometries, codes, table in batches:
+        yield _features(geometries, table, _shape_type(codes), fields, source, FirstId)
+        FirstId += len(geometries)
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .categories import BuildCategoryScheme, CategoryLookup, ClassifyVesselTypes, OTHER
+from .periods import PERIOD_FIELD
+
+## HyperLogLog sketches of unique vessels, one per cell (i.e. period, passage line, vessel type).
+## keys: one row per cell. registers: the non-empty registers of every cell as (Cell, Register, Rank) rows, so a
+## cell never holds more than 2 ** precision entries and cells with a handful of vessels stay small.
+## Sketches union by taking the register maximum, across types, periods, partitions, files or runs.
+Sketches = namedtuple("Sketches", ["keys", "registers", "precision"])
+
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+
+
+## 64 bit hash of the vessel ids, stable between runs and processes. Numeric ids are hashed as int64 so a table
+## read with float MMSIs (a column with nulls) sketches the same registers as one read with integers.
+def _hash(values):
+    values = np.asarray(values)
+    if values.dtype.kind in "fiub":
+        values = values.astype("int64")
+    return pd.util.hash_array(values)
+
+
+## Number of significant bits of every uint64
+def _bit_length(values):
+    values = values.copy()
+    length = np.zeros(values.shape, dtype="int64")
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= (np.uint64(1) << np.uint64(shift))
+        length[high] += shift
+        values[high] >>= np.uint64(shift)
+    return length + (values > 0)
+
+
+## Codes of the distinct key rows of a frame (first appearance order) and the distinct keys
+def _factorize_keys(frame):
+    columns = list(frame.columns)
+    if len(columns) > 1:
+        codes, index = pd.MultiIndex.from_frame(frame.astype(object)).factorize()
+        return codes, pd.DataFrame(list(index), columns=columns)
+    codes, index = pd.factorize(frame.iloc[:, 0])
+    return codes, pd.DataFrame({columns[0]: np.asarray(index)})
+
+
+## Register maximum per (cell, register), the sketch union
+def _max_registers(cell, register, rank):
+    frame = pd.DataFrame({"Cell": cell, "Register": register, "Rank": rank})
+    return frame.groupby(["Cell", "Register"], sort=True)["Rank"].max().reset_index()
+
+
+## Sketch the distinct MMSIs of every KeyFields cell of a crossing table (intersect table, partial cells...)
+def BuildSketches(temp_out_df, KeyFields, MMSI, precision=12):
+    if not MIN_PRECISION <= precision <= MAX_PRECISION:
+        raise ValueError(f"HyperLogLog precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+    rows = temp_out_df[temp_out_df[MMSI].notna().to_numpy()]
+    cell, keys = _factorize_keys(rows[list(KeyFields)])
+    hashed = _hash(rows[MMSI].to_numpy())
+    register = (hashed >> np.uint64(64 - precision)).astype("int64")
+    remainder = hashed & np.uint64((1 << (64 - precision)) - 1)
+    rank = (64 - precision - _bit_length(remainder) + 1).astype("uint8")
+    return Sketches(keys, _max_registers(cell, register, rank), precision)
+
+
+## Re-key sketches to new_keys (one row per existing cell) and union the cells that end up with the same key
+def _rekey(sketches, new_keys):
+    codes, keys = _factorize_keys(new_keys)
+    registers = sketches.registers
+    return Sketches(keys, _max_registers(codes[registers["Cell"].to_numpy()], registers["Register"], registers["Rank"]), sketches.precision)
+
+
+## Union sketch sets from partitions, files or runs cell by cell. All must share the precision and key columns.
+def MergeSketches(sketch_sets):
+    sketch_sets = list(sketch_sets)
+    if len({sketches.precision for sketches in sketch_sets}) != 1:
+        raise ValueError("Only sketches with the same precision can be merged")
+    offsets = np.cumsum([0] + [len(sketches.keys) for sketches in sketch_sets])
+    keys = pd.concat([sketches.keys for sketches in sketch_sets], ignore_index=True)
+    registers = pd.concat([sketches.registers.assign(Cell=sketches.registers["Cell"] + offset)
+                           for sketches, offset in zip(sketch_sets, offsets)], ignore_index=True)
+    return _rekey(Sketches(keys, registers, sketch_sets[0].precision), keys)
+
+
+## Union cells over the key columns not listed in by, i.e. by=["Name"] unions every type (and period) of a line
+def CollapseSketches(sketches, by):
+    return _rekey(sketches, sketches.keys[list(by)])
+
+
+## Relative standard error of a HyperLogLog estimate with this precision
+def RelativeError(precision):
+    return 1.04 / np.sqrt(2 ** precision)
+
+
+## Distinct count estimate of every cell, with a z-sigma (95% by default) interval
+def EstimateSketches(sketches, z=1.96):
+    m = 2 ** sketches.precision
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    registers = sketches.registers
+    n_cells = len(sketches.keys)
+    cells = registers["Cell"].to_numpy()
+    filled = np.bincount(cells, minlength=n_cells)
+    harmonic = np.bincount(cells, weights=np.exp2(-registers["Rank"].to_numpy(dtype="float64")), minlength=n_cells) + (m - filled)
+    estimate = alpha * m * m / harmonic
+    ## small range correction, linear counting while registers are still empty
+    zeros = m - filled
+    small = (estimate <= 2.5 * m) & (zeros > 0)
+    estimate[small] = m * np.log(m / zeros[small])
+    error = z * RelativeError(sketches.precision) * estimate
+    estimates = sketches.keys.copy()
+    estimates["Estimate"] = estimate
+    estimates["Low"] = np.maximum(estimate - error, 0)
+    estimates["High"] = estimate + error
+    return estimates
+
+
+## Sketches of the ([PeriodField,] NameField, VesselTypes) cells of a crossing table, the cells of the line x vessel type
+## table. Rows without a name, type or period are left out, like the unique vessels of SummarizeTransits.
+def CellSketches(temp_out_df, NameField, VesselTypes, MMSI, PeriodField=None, precision=12):
+    keep = temp_out_df[NameField].notna() & temp_out_df[VesselTypes].notna()
+    if PeriodField:
+        keep &= temp_out_df[PeriodField].notna()
+    rows = temp_out_df[keep.to_numpy()]
+    if PeriodField:
+        rows = rows.assign(**{PeriodField: np.asarray(rows[PeriodField], dtype=object)})
+    return BuildSketches(rows, ([PeriodField] if PeriodField else []) + [NameField, VesselTypes], MMSI, precision)
+
+
+## Put the sketch estimates in a line x vessel type table (SummarizeTransits, PartialSummary): Unique_Vessels becomes
+## the rounded estimate of every ([period,] line, type) cell of CellSketches, with Unique_Vessels_Low/High 95% bounds,
+## 0 for cells without a sketch. The simplified table sums the per-type estimates into Unique_<category> like the exact
+## counts; its Unique_Total comes from the union of the types (see SketchedUniqueTotal).
+def SketchedUniqueVessels(new_df, Sketched, PeriodField=None):
+    estimates = EstimateSketches(Sketched)
+    index = pd.MultiIndex.from_frame(Sketched.keys.astype(object))
+    cells = new_df[([PERIOD_FIELD] if PeriodField else []) + ["Name", "Vessel_Type"]].astype(object)
+    position = index.get_indexer(pd.MultiIndex.from_frame(cells))
+    new_df = new_df.copy()
+    for column, value in (("Unique_Vessels", "Estimate"), ("Unique_Vessels_Low", "Low"), ("Unique_Vessels_High", "High")):
+        new_df[column] = np.where(position >= 0, np.round(estimates[value].to_numpy()[position]), 0).astype("int64")
+    return new_df
+
+
+## Unique_Total of a simplified table (SimplifySummary, PartialSummary) from the union of the line's type sketches,
+## so a vessel reported under two type codes is one vessel, with Unique_Total_Low/High 95% bounds of that union
+## estimate. Sketched are the CellSketches of the table; lines without a sketch get 0.
+def SketchedUniqueTotal(Passage_line_df, Sketched, PeriodField=None):
+    line_keys = list(Sketched.keys.columns[:-1])
+    total = EstimateSketches(CollapseSketches(Sketched, line_keys))
+    index = pd.MultiIndex.from_frame(total[line_keys].astype(object))
+    rows = Passage_line_df[([PERIOD_FIELD] if PeriodField else []) + ["Name"]].astype(object)
+    position = index.get_indexer(pd.MultiIndex.from_frame(rows))
+    Passage_line_df = Passage_line_df.copy()
+    for column, value in (("Unique_Total", "Estimate"), ("Unique_Total_Low", "Low"), ("Unique_Total_High", "High")):
+        Passage_line_df[column] = np.where(position >= 0, np.round(total[value].to_numpy()[position]), 0).astype("int64")
+    return Passage_line_df
+
+
+## Save sketches so runs over different files, months or machines can be unioned later (MergeSketches)
+def SaveSketches(sketches, path):
+    pd.to_pickle(sketches, path)
+
+
+def LoadSketches(path):
+    return pd.read_pickle(path)
+
+
+## Unique vessels per passage line (and period) by simplified category, Other and Total, counted as distinct vessels
+## over the union of the vessel types, so a vessel reported under two type codes is one vessel in its category and in
+## the total (the sketched summary tables only take Unique_Total from the union, see SketchedUniqueTotal).
+## Mode "exact" counts the MMSI sets, mode "sketch" unions HyperLogLog sketches with the given precision and adds
+## Unique_Total_Low/Unique_Total_High 95% bounds. source is any crossing table, e.g. temp_out_df or Partial.cells.
+def UniqueVesselSummary(source, NameField, VesselTypes, MMSI, PeriodField=None, Mode="exact", precision=12,
+                        CustomName="", CustomTypes=None, Categories=None, Sketched=None):
+    scheme = BuildCategoryScheme(Categories, CustomName, CustomTypes)
+    names = [name for name, codes in scheme] + [OTHER]
+    line_keys = ([PeriodField] if PeriodField else []) + [NameField]
+
+    if Mode == "sketch":
+        if Sketched is None:
+            Sketched = BuildSketches(source, line_keys + [VesselTypes], MMSI, precision)
+        keys = Sketched.keys.copy()
+        keys["Category"] = np.asarray(names, dtype=object)[ClassifyVesselTypes(keys[VesselTypes], CategoryLookup(scheme), len(scheme))]
+        by_category = EstimateSketches(_rekey(Sketched, keys[line_keys + ["Category"]]))
+        total = EstimateSketches(CollapseSketches(Sketched, line_keys))
+        unique = by_category.pivot_table(index=line_keys, columns="Category", values="Estimate", aggfunc="sum", observed=True)
+        total = total.set_index(line_keys)
+    elif Mode == "exact":
+        rows = source[source[MMSI].notna().to_numpy()]
+        category = pd.Series(np.asarray(names, dtype=object)[ClassifyVesselTypes(rows[VesselTypes], CategoryLookup(scheme), len(scheme))], index=rows.index, name="Category")
+        keys = [rows[key] for key in line_keys]
+        unique = rows[MMSI].groupby(keys + [category], observed=True).nunique().unstack("Category")
+        total = rows[MMSI].groupby(keys, observed=True).nunique().rename("Estimate").to_frame()
+    else:
+        raise ValueError(f"Unknown unique vessel mode: {Mode}")
+
+    summary = pd.DataFrame(index=total.index)
+    for name in names:
+        summary[f"Unique_{name}"] = unique[name].reindex(summary.index).fillna(0).round().astype("int64") if name in unique else 0
+    summary["Unique_Total"] = total["Estimate"].round().astype("int64")
+    if Mode == "sketch":
+        summary["Unique_Total_Low"] = total["Low"].round().astype("int64")
+        summary["Unique_Total_High"] = total["High"].round().astype("int64")
+    summary = summary.reset_index().sort_values(line_keys, kind="stable").reset_index(drop=True)
+    return summary.rename(columns={NameField: "Name"})
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import numpy as np
+import pandas as pd
+
+from .categories import BuildCategoryScheme, CategoryLookup, ClassifyVesselTypes, OTHER
+from .periods import PERIOD_FIELD
+
+## directional count columns of the intersect table by direction label (see DIRECTIONS)
+DIRECTION_FIELDS = {"Left": "ORIG_FID_LEFT", "Right": "ORIG_FID_RIGHT"}
+
+
+## Number of interactions per multipoint intersect feature, from one map of OBJECTID onto the ORIG_FID group sizes of
+## the singlepart output. For areas a pass through creates an entry and an exit point, so the count is halved and
+## rounded up. With MultipleInt off every feature counts once.
+def InteractionCounts(ObjectIDs, OrigFIDs, MultipleInt, Polygon=False):
+    if MultipleInt != "true":
+        return np.ones(len(ObjectIDs), dtype="int64")
+    sizes = pd.Series(OrigFIDs).value_counts(sort=False)
+    return InteractionRule(pd.Series(ObjectIDs).map(sizes).fillna(0), MultipleInt, Polygon)
+
+
+## The same rule applied to crossing counts that are already known per (track, passage line) pair
+def InteractionRule(Crossings, MultipleInt, Polygon=False):
+    counts = np.asarray(Crossings, dtype="int64")
+    if MultipleInt != "true":
+        return np.ones(len(counts), dtype="int64")
+    if Polygon:
+        counts = (counts + 1) // 2
+    return counts
+
+
+## Directional interaction counts per (track, passage line) pair from the crossing counts per direction (see
+## CrossingCounts). With MultipleInt off the single transit goes to the direction of the first crossing.
+def DirectionRule(Left, Right, FirstDirection, MultipleInt):
+    if MultipleInt != "true":
+        left = (np.asarray(FirstDirection) == 1).astype("int64")
+        return left, 1 - left
+    return np.asarray(Left, dtype="int64"), np.asarray(Right, dtype="int64")
+
+
+## Period codes and labels of the optional period column, or a single unnamed period when there is none
+def _period_codes(df, PeriodField):
+    if not PeriodField:
+        return np.zeros(len(df), dtype="int64"), None
+    periods = pd.Categorical(df[PeriodField])
+    return periods.codes.astype("int64"), periods.categories
+
+
+## Build the complete passage line x vessel type table (zeros included) in one grouped pass.
+## Names and vessel types are factorized in order of first appearance, the same order pd.unique gives, so each
+## crossing row maps to the grid cell name_code * n_types + type_code and the counts are bincounts over those cells.
+## With a PeriodField (see PeriodKeys) the grid gets a leading period axis and a "Period" column, every period holding
+## the full line x type grid, so all periods come out of the same pass.
+## DirectionFields maps direction labels to count columns (i.e. DIRECTION_FIELDS), adding Total_Transits_<label> and
+## Unique_Vessels_<label> columns from the same cells; a vessel is counted for a direction it crossed in.
+def SummarizeTransits(temp_out_df, NameField, VesselTypes, MMSI, CountField="ORIG_FID_CALC", PeriodField=None, DirectionFields=None):
+    period_codes, periods = _period_codes(temp_out_df, PeriodField)
+    name_codes, names = pd.factorize(temp_out_df[NameField], use_na_sentinel=False)
+    type_codes, types = pd.factorize(temp_out_df[VesselTypes], use_na_sentinel=False)
+    n_periods = 1 if periods is None else len(periods)
+    n_types = len(types)
+    n_cells = n_periods * len(names) * n_types
+
+    ## groupby drops missing keys, so rows with a missing name or type only show up as an empty cell in the grid
+    valid = temp_out_df[NameField].notna().to_numpy() & temp_out_df[VesselTypes].notna().to_numpy() & (period_codes >= 0)
+    cells = (period_codes[valid] * len(names) + name_codes[valid]) * n_types + type_codes[valid]
+
+    ## total transits, sum of the interaction counts in each cell
+    weights = temp_out_df[CountField].to_numpy(dtype="float64")[valid]
+    transits = np.rint(np.bincount(cells, weights=weights, minlength=n_cells)).astype("int64")
+
+    ## unique vessels, number of distinct (cell, MMSI) pairs in each cell
+    mmsi_codes, mmsi_values = pd.factorize(temp_out_df[MMSI])
+    mmsi_codes = mmsi_codes[valid].astype("int64")
+    has_mmsi = mmsi_codes >= 0
+    n_mmsi = max(len(mmsi_values), 1)
+
+    def unique_vessels(rows):
+        pairs = np.unique(cells[rows].astype("int64") * n_mmsi + mmsi_codes[rows])
+        return np.bincount(pairs // n_mmsi, minlength=n_cells).astype("int64")
+
+    new_df = pd.DataFrame({
+        "Name": np.tile(np.repeat(np.asarray(names), n_types), n_periods),
+        "Vessel_Type": np.tile(np.asarray(types), len(names) * n_periods),
+        "Total_Transits": transits,
+        "Unique_Vessels": unique_vessels(has_mmsi),
+    })
+    for label, field in (DirectionFields or {}).items():
+        counts = temp_out_df[field].to_numpy(dtype="float64")[valid]
+        new_df[f"Total_Transits_{label}"] = np.rint(np.bincount(cells, weights=counts, minlength=n_cells)).astype("int64")
+        new_df[f"Unique_Vessels_{label}"] = unique_vessels(has_mmsi & (counts > 0))
+    if periods is not None:
+        new_df.insert(0, PERIOD_FIELD, pd.Categorical.from_codes(np.repeat(np.arange(n_periods), len(names) * n_types), categories=periods, ordered=True))
+    return new_df
+
+
+## Mean length from a sum and count of lengths. The sum is rounded to 6 decimals first so the float noise of adding the
+## lengths in another order (partitions, batches, files) can't move a mean that ends on a half cent across the 2 decimal
+## rounding of Avg_Len.
+def LengthMean(Length_Sum, Length_Count):
+    Length_Sum = np.round(np.asarray(Length_Sum, dtype="float64"), 6)
+    Length_Count = np.asarray(Length_Count, dtype="float64")
+    return np.where(Length_Count > 0, Length_Sum / np.maximum(Length_Count, 1), np.nan)
+
+
+## Max and average vessel length per passage line (and period), ignoring missing lengths. Rows without any length get 0.
+## LengthStats, a table of "max"/"mean" indexed by name (or period, name), replaces the grouped pass over temp_out_df
+## when the stats were already merged from partial results.
+def LengthSummary(temp_out_df, NameField, LengthField, names, PeriodField=None, periods=None, LengthStats=None):
+    if not LengthField:
+        return np.zeros(len(names)), np.zeros(len(names))
+    index = pd.MultiIndex.from_arrays([periods, names]) if PeriodField else names
+    if LengthStats is None:
+        lengths = pd.to_numeric(temp_out_df[LengthField], errors="coerce")
+        if PeriodField:
+            keys = [pd.Series(np.asarray(temp_out_df[PeriodField], dtype=object), index=temp_out_df.index), temp_out_df[NameField]]
+        else:
+            keys = temp_out_df[NameField]
+        LengthStats = lengths.groupby(keys).agg(["max", "sum", "count"])
+        LengthStats["mean"] = LengthMean(LengthStats["sum"], LengthStats["count"])
+    stats = LengthStats.reindex(index)
+    return stats["max"].fillna(0).to_numpy(), stats["mean"].round(2).fillna(0).to_numpy()
+
+
+## Collapse the line x vessel type table into one row per passage line with Unique_/Transits_ columns per category.
+## Every new_df row is classified through the category lookup array, then each measure is a single bincount over
+## line_code * (n_categories + 1) + category. "Other" is the line total minus every listed category.
+## With a PeriodField there is one row per period and passage line, periods in chronological order.
+## Directional new_df columns (SummarizeTransits DirectionFields) add Unique_/Transits_<category>_<direction> columns.
+def SimplifySummary(new_df, temp_out_df, NameField, LengthField="", CustomName="", CustomTypes=None, Categories=None, PeriodField=None, LengthStats=None):
+    scheme = BuildCategoryScheme(Categories, CustomName, CustomTypes)
+    n_cat = len(scheme)
+    category = ClassifyVesselTypes(new_df["Vessel_Type"], CategoryLookup(scheme), n_cat)
+
+    ## passage lines in sorted order, as the grouped name list of the original table
+    names = pd.Index(new_df["Name"].dropna().unique()).sort_values()
+    period_codes, periods = _period_codes(new_df, PERIOD_FIELD if PeriodField else None)
+    n_periods = 1 if periods is None else len(periods)
+    n_rows = n_periods * len(names)
+    row_codes = period_codes * len(names) + names.get_indexer(new_df["Name"])
+    keep = (names.get_indexer(new_df["Name"]) >= 0) & (period_codes >= 0)
+    cells = row_codes[keep] * (n_cat + 1) + category[keep]
+
+    Passage_line_df = pd.DataFrame({"Name": np.tile(np.asarray(names), n_periods)})
+    if periods is not None:
+        row_periods = np.repeat(np.arange(n_periods), len(names))
+        Passage_line_df.insert(0, PERIOD_FIELD, pd.Categorical.from_codes(row_periods, categories=periods, ordered=True))
+        Passage_line_df["Max_Len"], Passage_line_df["Avg_Len"] = LengthSummary(
+            temp_out_df, NameField, LengthField, Passage_line_df["Name"], PeriodField, np.asarray(periods)[row_periods], LengthStats)
+    else:
+        Passage_line_df["Max_Len"], Passage_line_df["Avg_Len"] = LengthSummary(temp_out_df, NameField, LengthField, names, LengthStats=LengthStats)
+
+    directions = [column[len("Total_Transits_"):] for column in new_df.columns if column.startswith("Total_Transits_")]
+    measures = [("Unique", "Unique_Vessels"), ("Transits", "Total_Transits")]
+    for label in directions:
+        measures += [(f"Unique_{label}", f"Unique_Vessels_{label}"), (f"Transits_{label}", f"Total_Transits_{label}")]
+    columns = {}
+    for prefix, measure in measures:
+        weights = new_df[measure].to_numpy(dtype="float64")[keep]
+        grid = np.bincount(cells, weights=weights, minlength=n_rows * (n_cat + 1)).reshape(n_rows, n_cat + 1)
+        grid = np.rint(grid).astype("int64")
+        total = grid.sum(axis=1)
+        for index, (name, codes) in enumerate(scheme):
+            columns[f"{prefix}_{name}"] = grid[:, index]
+        columns[f"{prefix}_{OTHER}"] = total - grid[:, :n_cat].sum(axis=1)
+        columns[f"{prefix}_Total"] = total
+
+    ## interleave Unique_/Transits_ columns per category, Other and Total last
+    for name in [name for name, codes in scheme] + [OTHER, "Total"]:
+        Passage_line_df[f"Unique_{name}"] = columns[f"Unique_{name}"]
+        Passage_line_df[f"Transits_{name}"] = columns[f"Transits_{name}"]
+    for label in directions:
+        for name in [name for name, codes in scheme] + [OTHER, "Total"]:
+            Passage_line_df[f"Unique_{name}_{label}"] = columns[f"Unique_{label}_{name}"]
+            Passage_line_df[f"Transits_{name}_{label}"] = columns[f"Transits_{label}_{name}"]
+    return Passage_line_df
+
+
+## Split a summary table with a "Period" column into one table per period, in chronological order
+def SplitPeriods(summary_df):
+    return {str(period): table.drop(columns=PERIOD_FIELD).reset_index(drop=True)
+            for period, table in summary_df.groupby(PERIOD_FIELD, sort=True, observed=True)}
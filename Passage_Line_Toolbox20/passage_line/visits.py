@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import numpy as np
+import pandas as pd
+
+from .categories import BuildCategoryScheme, CategoryLookup, ClassifyVesselTypes, OTHER
+from .crossings import _SegmentGrid, _segments
+from .prefilter import FeatureEnvelopes
+
+VISIT_COLUMNS = ["Track_ID", "Line_ID", "Entry_Distance", "Exit_Distance", "Dwell_Distance", "Entered", "Exited", "Consistent"]
+
+
+## Even-odd point in polygon test of every point against one area each (area_index: feature index into areas, whose
+## paths are the closed rings). A horizontal ray from each point to the right edge of its area is tested against the
+## ring segments found through the segment grid, so only nearby segments are ever touched.
+def PointsInAreas(points, areas, area_index, grid=None):
+    points = np.asarray(points, dtype="float64").reshape(-1, 2)
+    area_index = np.asarray(area_index, dtype="int64")
+    inside = np.zeros(len(points), dtype=bool)
+    a0, a1, a_feature, a_number, a_last = _segments(areas)
+    if not len(points) or not len(a0):
+        return inside
+    if grid is None:
+        grid = _SegmentGrid(a0, a1)
+    lo, hi = FeatureEnvelopes(areas)
+    ray_end = np.column_stack([np.maximum(hi[area_index, 0], points[:, 0]), points[:, 1]])
+    query, segment = grid.candidates(points, ray_end)
+    own = a_feature[segment] == area_index[query]
+    query, segment = query[own], segment[own]
+    p0, p1, point = a0[segment], a1[segment], points[query]
+    straddle = (p0[:, 1] > point[:, 1]) != (p1[:, 1] > point[:, 1])
+    dy = np.where(straddle, p1[:, 1] - p0[:, 1], 1.0)
+    x = p0[:, 0] + (point[:, 1] - p0[:, 1]) * (p1[:, 0] - p0[:, 0]) / dy
+    hits = np.bincount(query[straddle & (x > point[:, 0])], minlength=len(points))
+    return hits % 2 == 1
+
+
+## Distance along its track of every crossing, and the length of every track (features of tracks)
+def _track_distances(crossings, tracks):
+    t0, t1, t_feature, t_number, t_last = _segments(tracks)
+    length = np.hypot(*(t1 - t0).T)
+    n_features = len(tracks.ids)
+    counts = np.bincount(t_feature, minlength=n_features)
+    first = np.zeros(n_features, dtype="int64")
+    np.cumsum(counts[:-1], out=first[1:])
+    before = np.cumsum(length) - length
+    before -= np.repeat(before[first[counts > 0]], counts[counts > 0])
+    feature = pd.Index(tracks.ids).get_indexer(crossings["Track_ID"])
+    segment = first[feature] + crossings["Track_Segment"].to_numpy()
+    distance = before[segment] + crossings["Track_Fraction"].to_numpy() * length[segment]
+    return feature, distance, np.bincount(t_feature, weights=length, minlength=n_features)
+
+
+## First and last vertex of every track feature
+def _track_ends(tracks):
+    n_vertices = np.diff(tracks.offsets)
+    n_features = len(tracks.ids)
+    first_path = np.full(n_features, -1)
+    last_path = np.full(n_features, -1)
+    filled = np.flatnonzero(n_vertices > 0)
+    first_path[tracks.feature[filled][::-1]] = filled[::-1]
+    last_path[tracks.feature[filled]] = filled
+    start = tracks.xy[tracks.offsets[:-1][np.maximum(first_path, 0)]] if len(tracks.xy) else np.zeros((n_features, 2))
+    end = tracks.xy[tracks.offsets[1:][np.maximum(last_path, 0)] - 1] if len(tracks.xy) else np.zeros((n_features, 2))
+    return start, end
+
+
+## (track feature, area) pairs whose track starts inside the area, from the area envelopes holding the first vertex of
+## every track with vertices and a point in polygon test of those candidates
+def _start_inside_pairs(start, tracks, areas, grid):
+    lo, hi = FeatureEnvelopes(areas)
+    filled = np.flatnonzero(np.isfinite(lo).all(axis=1))
+    has_vertices = np.bincount(tracks.feature, weights=np.diff(tracks.offsets), minlength=len(tracks.ids)) > 0
+    if not len(filled) or not has_vertices.any():
+        return np.zeros(0, dtype="int64"), np.zeros(0, dtype="int64")
+    features = np.flatnonzero(has_vertices)
+    query, candidate = _SegmentGrid(lo[filled], hi[filled]).candidates(start[features], start[features])
+    feature, area = features[query], filled[candidate]
+    inside = PointsInAreas(start[feature], areas, area, grid)
+    return feature[inside], area[inside]
+
+
+## Pair the boundary crossings of polygon areas (FindCrossings of tracks against the area rings) into visits.
+## The crossings of every (track, area) pair are ordered by distance along the track; the state before the first one
+## comes from a point in polygon test of the track start, and every crossing flips it, so crossings alternate between
+## entries and exits. A track that starts inside gets a visit opened at distance 0 (Entered False), one that ends
+## inside a visit closed at the track length (Exited False); a track that never crosses the boundary of an area it
+## starts in is one visit over its whole length. Consistent is False when the end point test disagrees with the
+## crossing parity (touching a vertex, running along the boundary); those visits follow the crossings.
+## Multipart tracks are treated as one path. With a TrackTable and StartField/EndField (track start and end dates),
+## entry and exit times are interpolated along the track and the Dwell_Time is added.
+## Visits come out ordered by track, area and distance along the track.
+def PairVisits(crossings, tracks, areas, TrackTable=None, StartField="", EndField=""):
+    feature, distance, track_length = _track_distances(crossings, tracks)
+    area = pd.Index(areas.ids).get_indexer(crossings["Line_ID"])
+    order = np.lexsort((distance, area, feature))
+    feature, area, distance = feature[order], area[order], distance[order]
+
+    pair_start = np.r_[0, np.flatnonzero((np.diff(feature) != 0) | (np.diff(area) != 0)) + 1] if len(feature) else np.zeros(0, dtype="int64")
+    n_crossings = np.diff(np.r_[pair_start, len(feature)])
+    pair_feature, pair_area = feature[pair_start], area[pair_start]
+    start, end = _track_ends(tracks)
+    a0, a1 = _segments(areas)[:2]
+    grid = _SegmentGrid(a0, a1) if len(a0) else None
+
+    ## pairs without crossings where the track starts inside the area, added after the crossing pairs
+    inside_feature, inside_area = _start_inside_pairs(start, tracks, areas, grid) if grid is not None else (np.zeros(0, dtype="int64"),) * 2
+    n_areas = max(len(areas.ids), 1)
+    extra = ~np.isin(inside_feature * n_areas + inside_area, pair_feature.astype("int64") * n_areas + pair_area)
+    pair_feature = np.concatenate([pair_feature, inside_feature[extra]]).astype("int64")
+    pair_area = np.concatenate([pair_area, inside_area[extra]]).astype("int64")
+    n_crossings = np.concatenate([n_crossings, np.zeros(extra.sum(), dtype="int64")])
+
+    start_inside = PointsInAreas(start[pair_feature], areas, pair_area, grid)
+    end_inside = PointsInAreas(end[pair_feature], areas, pair_area, grid)
+    closes_inside = start_inside ^ (n_crossings % 2 == 1)
+    consistent = closes_inside == end_inside
+
+    ## event list per pair: [track start] + crossings + [track end], ordered, always an even number of events
+    n_pairs = len(pair_feature)
+    pair_of_crossing = np.repeat(np.arange(n_pairs), n_crossings)
+    open_pairs = np.flatnonzero(start_inside)
+    close_pairs = np.flatnonzero(closes_inside)
+    event_pair = np.concatenate([open_pairs, pair_of_crossing, close_pairs])
+    event_rank = np.concatenate([np.full(len(open_pairs), -1), np.arange(len(distance)), np.full(len(close_pairs), len(distance))])
+    event_distance = np.concatenate([np.zeros(len(open_pairs)), distance, track_length[pair_feature[close_pairs]]])
+    event_crossing = np.concatenate([np.zeros(len(open_pairs), dtype=bool), np.ones(len(distance), dtype=bool), np.zeros(len(close_pairs), dtype=bool)])
+    pair_rank = np.empty(n_pairs, dtype="int64")
+    pair_rank[np.lexsort((pair_area, pair_feature))] = np.arange(n_pairs)
+    order = np.lexsort((event_rank, pair_rank[event_pair]))
+    event_pair, event_distance, event_crossing = event_pair[order], event_distance[order], event_crossing[order]
+
+    visit_pair = event_pair[0::2]
+    visits = pd.DataFrame({
+        "Track_ID": tracks.ids[pair_feature[visit_pair]],
+        "Line_ID": areas.ids[pair_area[visit_pair]],
+        "Entry_Distance": event_distance[0::2],
+        "Exit_Distance": event_distance[1::2],
+        "Dwell_Distance": event_distance[1::2] - event_distance[0::2],
+        "Entered": event_crossing[0::2],
+        "Exited": event_crossing[1::2],
+        "Consistent": consistent[visit_pair],
+    })
+    if TrackTable is not None and StartField and EndField:
+        begin = pd.to_datetime(TrackTable[StartField].reindex(visits["Track_ID"])).to_numpy()
+        duration = pd.to_datetime(TrackTable[EndField].reindex(visits["Track_ID"])).to_numpy() - begin
+        total = track_length[pair_feature[visit_pair]]
+        total = np.where(total > 0, total, np.inf)
+        visits["Entry_Time"] = begin + (duration * (visits["Entry_Distance"].to_numpy() / total)).astype("timedelta64[ns]")
+        visits["Exit_Time"] = begin + (duration * (visits["Exit_Distance"].to_numpy() / total)).astype("timedelta64[ns]")
+        visits["Dwell_Time"] = visits["Exit_Time"] - visits["Entry_Time"]
+    return visits
+
+
+## Visits per (track, area) pair, the polygon transit count that replaces ceil(crossings / 2)
+def VisitCounts(visits):
+    return visits.groupby(["Track_ID", "Line_ID"], sort=True).size().rename("Visits").reset_index()
+
+
+## Visits, unique vessels and dwell statistics per area and simplified vessel category, plus a "Total" row per area.
+## Dwell times are in hours (needs PairVisits with StartField/EndField), dwell distances in map units.
+def DwellSummary(visits, TrackTable, LineTable, NameField, VesselTypes, MMSI, CustomName="", CustomTypes=None, Categories=None):
+    scheme = BuildCategoryScheme(Categories, CustomName, CustomTypes)
+    names = [name for name, codes in scheme] + [OTHER]
+    rows = pd.DataFrame({
+        "Name": LineTable[NameField].reindex(visits["Line_ID"]).to_numpy(),
+        "Category": np.asarray(names, dtype=object)[ClassifyVesselTypes(TrackTable[VesselTypes].reindex(visits["Track_ID"]), CategoryLookup(scheme), len(scheme))],
+        "MMSI": TrackTable[MMSI].reindex(visits["Track_ID"]).to_numpy(),
+        "Dwell_Distance": visits["Dwell_Distance"].to_numpy(),
+    })
+    timed = "Dwell_Time" in visits.columns
+    if timed:
+        rows["Dwell_Hours"] = visits["Dwell_Time"].dt.total_seconds().to_numpy() / 3600
+    rows = pd.concat([rows, rows.assign(Category="Total")], ignore_index=True)
+
+    aggregations = {"Visits": ("Dwell_Distance", "size"), "Unique_Vessels": ("MMSI", "nunique"), "Avg_Dwell_Distance": ("Dwell_Distance", "mean")}
+    if timed:
+        aggregations.update({
+            "Total_Dwell_Hours": ("Dwell_Hours", "sum"), "Avg_Dwell_Hours": ("Dwell_Hours", "mean"),
+            "Median_Dwell_Hours": ("Dwell_Hours", "median"), "Max_Dwell_Hours": ("Dwell_Hours", "max"),
+        })
+    summary = rows.groupby(["Name", "Category"], sort=False).agg(**aggregations).reset_index()
+    rank = {name: index for index, name in enumerate(names + ["Total"])}
+    summary = summary.sort_values(["Name", "Category"], key=lambda column: column.map(rank) if column.name == "Category" else column, kind="stable")
+    return summary.round(2).reset_index(drop=True)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+# import dependencies and libraries
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+## output backends by file extension, anything else is written as a geodatabase table through arcpy
+BACKENDS = {".csv": "csv", ".txt": "csv", ".parquet": "parquet", ".pq": "parquet", ".sqlite": "sqlite", ".db": "sqlite", ".gpkg": "geopackage"}
+
+## GeoPackage (OGC 1.4) header values and the metadata tables and reference systems every .gpkg file must have, so
+## ArcGIS, QGIS and GDAL open the summary as an attributes table
+GPKG_APPLICATION_ID = 0x47504B47
+GPKG_USER_VERSION = 10400
+_GPKG_TABLES = """
+CREATE TABLE IF NOT EXISTS gpkg_spatial_ref_sys (srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, organization TEXT NOT NULL,
+    organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, description TEXT);
+CREATE TABLE IF NOT EXISTS gpkg_contents (table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, identifier TEXT UNIQUE,
+    description TEXT DEFAULT '', last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')), min_x DOUBLE, min_y DOUBLE,
+    max_x DOUBLE, max_y DOUBLE, srs_id INTEGER, CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys(srs_id));
+INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES ('WGS 84 geodetic', 4326, 'EPSG', 4326, 'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,AUTHORITY["EPSG","7030"]],AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4326"]]', 'longitude/latitude coordinates in decimal degrees on the WGS 84 spheroid');
+INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', 'undefined cartesian coordinate reference system');
+INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', 'undefined geographic coordinate reference system');
+"""
+
+
+## convert output name to ESRI friendly format (no characters, spaces, and starts with an alpha character.)
+def TableName(OutputName):
+    name = "".join(char for char in str(OutputName) if char.isalnum())
+    if not name or name[0].isnumeric():
+        name = "A" + name
+    return name
+
+
+## Output name of one period table: the period is added before the file extension, if any
+def PeriodName(OutputName, period):
+    root, extension = os.path.splitext(str(OutputName))
+    if extension.lower() in BACKENDS:
+        return f"{root}_{period}{extension}"
+    return f"{OutputName}_{period}"
+
+
+## Summary table as a typed structured array in one step: text columns (Name, Period...) as fixed width unicode,
+## integer counts as int32 (int64 when they don't fit), lengths and other floats as float64, dates as datetime64.
+## Missing text becomes "", missing integers make the column float64 so NaN survives.
+def StructuredArray(Passage_line_df):
+    columns = []
+    for field in Passage_line_df.columns:
+        column = Passage_line_df[field]
+        if pd.api.types.is_bool_dtype(column):
+            values = column.to_numpy(dtype="int16")
+        elif pd.api.types.is_integer_dtype(column) and not column.isna().any():
+            values = column.to_numpy(dtype="int64")
+            if len(values) == 0 or (values.min() >= np.iinfo("int32").min and values.max() <= np.iinfo("int32").max):
+                values = values.astype("int32")
+        elif pd.api.types.is_numeric_dtype(column):
+            values = column.to_numpy(dtype="float64", na_value=np.nan)
+        elif pd.api.types.is_datetime64_any_dtype(column):
+            values = column.to_numpy(dtype="datetime64[us]")
+        else:
+            values = column.astype(object).where(column.notna(), "").astype(str).to_numpy(dtype=str)
+            if values.dtype.itemsize == 0:
+                values = values.astype("<U1")
+        columns.append((str(field), values))
+    array = np.empty(len(Passage_line_df), dtype=[(field, values.dtype) for field, values in columns])
+    for field, values in columns:
+        array[field] = values
+    return array
+
+
+## GeoPackage column type of a structured array field
+def _gpkg_type(dtype):
+    if dtype.kind in "iu":
+        return "INTEGER"
+    if dtype.kind == "f":
+        return "DOUBLE"
+    if dtype.kind == "M":
+        return "DATETIME"
+    return "TEXT"
+
+
+## Write a summary table to a GeoPackage as an attributes table with an integer fid primary key, registered in
+## gpkg_contents (replaced if it exists). Dates are written in the GeoPackage ISO 8601 form.
+def _write_geopackage(array, OutputName, name):
+    table = pd.DataFrame(array)
+    for field in table.columns:
+        if array.dtype[field].kind == "M":
+            table[field] = table[field].dt.strftime("%Y-%m-%dT%H:%M:%S.%f").str[:-3] + "Z"
+    columns = ", ".join(f'"{field}" {_gpkg_type(array.dtype[field])}' for field in array.dtype.names)
+    with sqlite3.connect(str(OutputName)) as connection:
+        connection.execute(f"PRAGMA application_id = {GPKG_APPLICATION_ID}")
+        connection.execute(f"PRAGMA user_version = {GPKG_USER_VERSION}")
+        connection.executescript(_GPKG_TABLES)
+        connection.execute(f'DROP TABLE IF EXISTS "{name}"')
+        connection.execute("DELETE FROM gpkg_contents WHERE table_name = ?", (name,))
+        connection.execute(f'CREATE TABLE "{name}" (fid INTEGER PRIMARY KEY AUTOINCREMENT, {columns})')
+        table.to_sql(name, connection, if_exists="append", index=False)
+        connection.execute("INSERT INTO gpkg_contents (table_name, data_type, identifier) VALUES (?, 'attributes', ?)", (name, name))
+    connection.close()
+
+
+## Write a summary table in one call. OutputName ending in .csv/.txt, .parquet/.pq, .sqlite/.db or .gpkg is written
+## to that file (SQLite and GeoPackage: a table named after the file, replaced if it exists; a GeoPackage table is
+## registered as an attributes table, see _write_geopackage); any other name becomes a geodatabase table in Workspace
+## (arcpy.env.workspace by default) through NumPyArrayToTable. Returns the path written.
+def WriteSummary(Passage_line_df, OutputName, Workspace=None):
+    array = StructuredArray(Passage_line_df)
+    backend = BACKENDS.get(os.path.splitext(str(OutputName))[1].lower())
+    if backend in ("csv", "parquet"):
+        table = pd.DataFrame(array)
+        if backend == "csv":
+            table.to_csv(OutputName, index=False)
+        else:
+            table.to_parquet(OutputName, index=False)
+        return str(OutputName)
+    if backend in ("sqlite", "geopackage"):
+        name = TableName(os.path.splitext(os.path.basename(str(OutputName)))[0])
+        if backend == "geopackage":
+            _write_geopackage(array, OutputName, name)
+        else:
+            with sqlite3.connect(str(OutputName)) as connection:
+                pd.DataFrame(array).to_sql(name, connection, if_exists="replace", index=False)
+            connection.close()
+        return f"{OutputName}/{name}"
+
+    import arcpy
+
+    Workspace = Workspace or arcpy.env.workspace
+    path = os.path.join(Workspace, TableName(OutputName))
+    arcpy.da.NumPyArrayToTable(array, path)
+    return path
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+## Micro-benchmark of the ORIG_FID_CALC step: the former per-row .loc loop against InteractionCounts.
+## python benchmarks/interaction_counts.py [--rows 100000 1000000] [--loop-sample 20000]
+## The row loop is linear in the number of rows, so above --loop-sample rows it is timed on a sample and scaled up.
+
+# import dependencies and libraries
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Passage_Line_Toolbox20"))
+from passage_line import InteractionCounts
+
+
+## multipoint table with OBJECTIDs 1..n and the ORIG_FID column of its singlepart output (1 to 4 points per feature)
+def synthetic_intersect(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    temp_out_df = pd.DataFrame({"OBJECTID": np.arange(1, rows + 1)})
+    temp_int_df = pd.DataFrame({"ORIG_FID": np.repeat(temp_out_df["OBJECTID"].to_numpy(), rng.integers(1, 5, rows))})
+    return temp_out_df, temp_int_df
+
+
+## the loop PassageLineSummary used before InteractionCounts
+def row_loop(temp_out_df, temp_int_df, MultipleInt, Polygon):
+    temp_orig_fid = temp_int_df.groupby(by="ORIG_FID").size()
+    temp_out_df["ORIG_FID_CALC"] = 0
+    for i in temp_out_df.index:
+        if MultipleInt == "true":
+            if Polygon:
+                temp_out_df.loc[i, "ORIG_FID_CALC"] = math.ceil(temp_orig_fid[temp_out_df["OBJECTID"][i]] / 2)
+            else:
+                temp_out_df.loc[i, "ORIG_FID_CALC"] = temp_orig_fid[temp_out_df["OBJECTID"][i]]
+        else:
+            temp_out_df.loc[i, "ORIG_FID_CALC"] = 1
+    return temp_out_df["ORIG_FID_CALC"].to_numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ORIG_FID_CALC interaction count step.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--loop-sample", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'polygon':>8} {'row loop (s)':>14} {'vectorized (s)':>15} {'speedup':>9}")
+    for rows in args.rows:
+        temp_out_df, temp_int_df = synthetic_intersect(rows)
+        for polygon in (False, True):
+            start = time.perf_counter()
+            counts = InteractionCounts(temp_out_df["OBJECTID"], temp_int_df["ORIG_FID"], "true", polygon)
+            vectorized = time.perf_counter() - start
+
+            sample = min(rows, args.loop_sample)
+            sample_out = temp_out_df.iloc[:sample].copy()
+            sample_int = temp_int_df[temp_int_df["ORIG_FID"] <= sample]
+            start = time.perf_counter()
+            expected = row_loop(sample_out, sample_int, "true", polygon)
+            loop = (time.perf_counter() - start) * rows / sample
+            assert (expected == counts[:sample]).all()
+
+            estimate = "~" if sample < rows else " "
+            print(f"{rows:>10} {str(polygon):>8} {estimate}{loop:>13.2f} {vectorized:>15.4f} {loop / vectorized:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
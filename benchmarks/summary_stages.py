@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+## Stage benchmark of the PassageLineSummary pipeline on the NumPy engine, on seeded synthetic tracks (no ArcGIS).
+## python benchmarks/summary_stages.py [--segments 1e3 1e4 1e5 1e6 1e7] [--geometry line polygon] [--repeat 3]
+##                                     [--output results.json] [--format csv]
+## Every stage is timed on its own: loading (track attributes from Parquet, geometry from .npy), crossing detection
+## (envelope prefilter and FindCrossings), interaction counting (intersect table and ORIG_FID_CALC, visits for
+## polygons), summary (SummarizeTransits), simplified aggregation (SimplifySummary) and output (WriteSummary).
+## The best of --repeat runs is kept per stage. Results are written as JSON to compare versions.
+
+# import dependencies and libraries
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_ais import SyntheticAreas, SyntheticLines, SyntheticTracks
+from passage_line import (DIRECTION_FIELDS, DirectionRule, EnvelopePrefilter, FindCrossings, IntersectTable, InteractionRule, LoadColumns,
+                          PairVisits, Paths, SimplifySummary, SubsetPaths, SummarizeTransits, VisitCounts, WriteSummary)
+
+STAGES = ["loading", "crossings", "interactions", "summary", "simplified", "output"]
+
+
+## Save the synthetic tracks the way a run reads them: the attribute table as Parquet, the vertex arrays as .npy
+def save_tracks(folder, tracks, TrackTable):
+    TrackTable.reset_index().to_parquet(os.path.join(folder, "tracks.parquet"), index=False)
+    for field in Paths._fields:
+        np.save(os.path.join(folder, f"tracks_{field}.npy"), getattr(tracks, field))
+
+
+def load_tracks(folder):
+    TrackTable = LoadColumns(os.path.join(folder, "tracks.parquet"), ["Track_ID", "MMSI", "VesselType", "Length", "BaseDateTime"])
+    tracks = Paths(*(np.load(os.path.join(folder, f"tracks_{field}.npy")) for field in Paths._fields))
+    return tracks, TrackTable.set_index("Track_ID")
+
+
+## One pass over every stage, returns the stage timings in seconds and the row counts between stages
+def run_stages(folder, lines, LineTable, Polygon, OutputFormat):
+    timings, counts = {}, {}
+
+    start = time.perf_counter()
+    tracks, TrackTable = load_tracks(folder)
+    timings["loading"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tracks = SubsetPaths(tracks, EnvelopePrefilter(tracks, lines))
+    crossings = FindCrossings(tracks, lines)
+    timings["crossings"] = time.perf_counter() - start
+    counts["tracks"], counts["crossings"] = len(tracks.ids), len(crossings)
+
+    start = time.perf_counter()
+    temp_out_df = IntersectTable(crossings, TrackTable, LineTable)
+    if Polygon:
+        visits = VisitCounts(PairVisits(crossings, tracks, lines))
+        temp_out_df["ORIG_FID_CALC"] = temp_out_df[["Track_ID", "Line_ID"]].merge(visits, on=["Track_ID", "Line_ID"], how="left")["Visits"].fillna(0).to_numpy(dtype="int64")
+    else:
+        temp_out_df["ORIG_FID_CALC"] = InteractionRule(temp_out_df["Crossings"], "true")
+        temp_out_df[DIRECTION_FIELDS["Left"]], temp_out_df[DIRECTION_FIELDS["Right"]] = DirectionRule(
+            temp_out_df["Crossings_Left"], temp_out_df["Crossings_Right"], temp_out_df["First_Direction"], "true")
+    timings["interactions"] = time.perf_counter() - start
+    counts["pairs"] = len(temp_out_df)
+
+    start = time.perf_counter()
+    new_df = SummarizeTransits(temp_out_df, "NAME", "VesselType", "MMSI")
+    timings["summary"] = time.perf_counter() - start
+    counts["summary_rows"] = len(new_df)
+
+    start = time.perf_counter()
+    Passage_line_df = SimplifySummary(new_df, temp_out_df, "NAME", "Length")
+    timings["simplified"] = time.perf_counter() - start
+    counts["simplified_rows"] = len(Passage_line_df)
+
+    start = time.perf_counter()
+    WriteSummary(Passage_line_df, os.path.join(folder, f"summary.{OutputFormat}"))
+    timings["output"] = time.perf_counter() - start
+    return timings, counts
+
+
+## Commit of the working tree, if it is a git checkout
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the passage line summary on synthetic AIS tracks.")
+    parser.add_argument("--segments", type=float, nargs="+", default=[1e3, 1e4, 1e5, 1e6, 1e7])
+    parser.add_argument("--geometry", nargs="+", choices=["line", "polygon"], default=["line", "polygon"])
+    parser.add_argument("--lines", type=int, default=50, help="passage lines or polygon areas")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", dest="OutputFormat", choices=["csv", "parquet", "sqlite"], default="csv")
+    parser.add_argument("--output", default="summary_stages.json")
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "summary_stages", "commit": git_commit(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__, "platform": platform.platform(),
+        "seed": args.seed, "repeat": args.repeat, "results": [],
+    }
+    print(f"{'segments':>10} {'geometry':>9} " + " ".join(f"{stage:>12}" for stage in STAGES) + f" {'total':>9}")
+    for segments in args.segments:
+        tracks, TrackTable = SyntheticTracks(segments, seed=args.seed)
+        for geometry in args.geometry:
+            if geometry == "polygon":
+                lines, LineTable = SyntheticAreas(args.lines, seed=args.seed + 2)
+            else:
+                lines, LineTable = SyntheticLines(args.lines, seed=args.seed + 1)
+            best = {}
+            with tempfile.TemporaryDirectory(prefix="passage_bench_") as folder:
+                save_tracks(folder, tracks, TrackTable)
+                for run in range(args.repeat):
+                    timings, counts = run_stages(folder, lines, LineTable, geometry == "polygon", args.OutputFormat)
+                    best = {stage: min(timings[stage], best.get(stage, np.inf)) for stage in STAGES}
+            report["results"].append({
+                "segments": int(len(tracks.xy) - len(tracks.ids)), "tracks": int(len(tracks.ids)), "geometry": geometry,
+                "lines": args.lines, "stages": best, "total": sum(best.values()), "counts": counts,
+            })
+            print(f"{int(segments):>10} {geometry:>9} " + " ".join(f"{best[stage]:>12.4f}" for stage in STAGES) + f" {sum(best.values()):>9.3f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
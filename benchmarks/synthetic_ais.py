@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+## Seeded synthetic AIS track lines, passage lines and polygon areas for the benchmarks, no ArcGIS needed.
+## Tracks are random walks with a steady heading in a square study area, vessels own several tracks each and the
+## vessel type codes cover every default category, unlisted codes and missing types.
+
+# import dependencies and libraries
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Passage_Line_Toolbox20"))
+from passage_line import DEFAULT_CATEGORIES, Paths
+
+## side of the square study area in map units (metres)
+EXTENT = 100000.0
+
+## vessel type codes drawn for the tracks: every code of every default category plus codes that fall in "Other"
+VESSEL_TYPES = np.array(sorted({code for name, codes in DEFAULT_CATEGORIES for code in codes} | {0, 20, 40, 90, 99, 1001, 1019}), dtype="float64")
+
+
+## Track lines with about Segments segments in total (MeanSegments per track on average), as Paths and a track table
+## indexed by track id with MMSI, VesselType (a few missing), Length (a few missing) and BaseDateTime over one year.
+def SyntheticTracks(Segments, MeanSegments=20, TracksPerVessel=5, seed=0):
+    rng = np.random.default_rng(seed)
+    n_tracks = max(1, int(Segments) // MeanSegments)
+    n_vertices = rng.integers(2, 2 * MeanSegments + 1, n_tracks)
+    offsets = np.zeros(n_tracks + 1, dtype="int64")
+    np.cumsum(n_vertices, out=offsets[1:])
+    track = np.repeat(np.arange(n_tracks), n_vertices)
+
+    ## steps along a per-track heading with some wander, summed from a random start point per track
+    heading = rng.uniform(0, 2 * np.pi, n_tracks)[track] + rng.normal(0, 0.3, offsets[-1])
+    step = rng.uniform(200, 800, offsets[-1])[:, None] * np.column_stack([np.cos(heading), np.sin(heading)])
+    step[offsets[:-1]] = rng.uniform(0, EXTENT, (n_tracks, 2))
+    xy = np.cumsum(step, axis=0)
+    xy -= np.repeat(np.cumsum(step, axis=0)[offsets[:-1]] - step[offsets[:-1]], n_vertices, axis=0)
+
+    ids = np.arange(1, n_tracks + 1)
+    n_vessels = max(1, n_tracks // TracksPerVessel)
+    vessel = rng.integers(0, n_vessels, n_tracks)
+    vessel_type = VESSEL_TYPES[rng.integers(0, len(VESSEL_TYPES), n_vessels)]
+    vessel_type[rng.random(n_vessels) < 0.02] = np.nan
+    length = np.round(rng.lognormal(3.6, 0.8, n_vessels), 1)
+    length[rng.random(n_vessels) < 0.05] = np.nan
+    TrackTable = pd.DataFrame({
+        "MMSI": 200000000 + vessel * 37,
+        "VesselType": vessel_type[vessel],
+        "Length": length[vessel],
+        "BaseDateTime": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 366 * 24 * 3600, n_tracks), unit="s"),
+    }, index=pd.Index(ids, name="Track_ID"))
+    return Paths(xy, offsets, np.arange(n_tracks), ids), TrackTable
+
+
+## Straight passage lines across the study area (Vertices vertices each) and their table with a NAME field
+def SyntheticLines(Lines=50, Vertices=3, seed=1):
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(0, EXTENT, (Lines, 2))
+    end = start + rng.normal(0, EXTENT / 10, (Lines, 2))
+    fraction = np.linspace(0, 1, Vertices)
+    xy = (start[:, None, :] + fraction[None, :, None] * (end - start)[:, None, :]).reshape(-1, 2)
+    offsets = np.arange(Lines + 1, dtype="int64") * Vertices
+    LineTable = pd.DataFrame({"NAME": [f"Line_{index:03d}" for index in range(Lines)]})
+    return Paths(xy, offsets, np.arange(Lines), np.arange(Lines)), LineTable
+
+
+## Convex polygon areas as closed rings (Vertices corners each) and their table with a NAME field
+def SyntheticAreas(Areas=30, Vertices=12, seed=2):
+    rng = np.random.default_rng(seed)
+    centre = rng.uniform(0, EXTENT, (Areas, 2))
+    radius = rng.uniform(EXTENT / 100, EXTENT / 20, Areas)
+    angle = np.linspace(0, 2 * np.pi, Vertices + 1)
+    angle[-1] = 0.0
+    xy = (centre[:, None, :] + radius[:, None, None] * np.stack([np.cos(angle), np.sin(angle)], axis=-1)[None]).reshape(-1, 2)
+    offsets = np.arange(Areas + 1, dtype="int64") * (Vertices + 1)
+    LineTable = pd.DataFrame({"NAME": [f"Area_{index:03d}" for index in range(Areas)]})
+    return Paths(xy, offsets, np.arange(Areas), np.arange(Areas)), LineTable
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+## Shared fixtures of the passage_line tests: the package and the seeded synthetic AIS generators of benchmarks/,
+## run with python -m pytest -q from the repository root (no ArcGIS needed).
+
+# import dependencies and libraries
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Passage_Line_Toolbox20"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from synthetic_ais import SyntheticLines, SyntheticTracks
+
+
+## Seeded tracks (VesselType and Length with missing values) and passage lines, 10000 tracks and about 1500 crossings of 30 lines
+@pytest.fixture(scope="session")
+def synthetic():
+    tracks, TrackTable = SyntheticTracks(200000, MeanSegments=20, TracksPerVessel=5, seed=0)
+    lines, LineTable = SyntheticLines(30, seed=1)
+    return tracks, TrackTable, lines, LineTable
+
+
+## Write features to a CSV file with a WKT geometry column
+def write_wkt(path, paths, table):
+    wkt = []
+    for feature in range(len(paths.ids)):
+        xy = paths.xy[paths.offsets[feature]:paths.offsets[feature + 1]]
+        wkt.append("LINESTRING (" + ", ".join(f"{float(x)!r} {float(y)!r}" for x, y in xy) + ")")
+    table.reset_index(drop=True).assign(WKT=wkt).to_csv(path, index=False)
+
+
+## The synthetic tracks and lines written as CSV-WKT files, for the file readers and RunSummary
+@pytest.fixture(scope="session")
+def track_files(synthetic, tmp_path_factory):
+    tracks, TrackTable, lines, LineTable = synthetic
+    folder = tmp_path_factory.mktemp("track_files")
+    write_wkt(folder / "tracks.csv", tracks, TrackTable.reindex(tracks.ids).assign(OBJECTID=tracks.ids))
+    write_wkt(folder / "lines.csv", lines, LineTable)
+    return str(folder / "tracks.csv"), str(folder / "lines.csv")
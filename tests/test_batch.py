@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+## Partial-based drivers against one in-memory summary: BatchSummary over crossing table files and PointSummary over raw
+## AIS points, both with missing vessel types
+
+# import dependencies and libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import write_wkt
+from passage_line import (BatchSummary, BuildPaths, IntersectTracks, LoadColumns, PeriodKeys, PointSummary, SimplifySummary, StreamTracks,
+                          SubsetPaths, SummarizeTransits)
+
+
+def summarize(temp_out_df, Simplified, PeriodField=None):
+    new_df = SummarizeTransits(temp_out_df, "NAME", "VesselType", "MMSI", PeriodField=PeriodField)
+    if Simplified != "true":
+        return new_df
+    return SimplifySummary(new_df, temp_out_df, "NAME", "Length", PeriodField=PeriodField)
+
+
+@pytest.mark.parametrize("Simplified", ["false", "true"])
+@pytest.mark.parametrize("Period", [None, "quarter"])
+def test_batch_matches_one_table(synthetic, tmp_path, Simplified, Period):
+    tracks, TrackTable, lines, LineTable = synthetic
+    fields = ["NAME", "VesselType", "MMSI", "Length", "BaseDateTime", "ORIG_FID_CALC"]
+    crossings = IntersectTracks(tracks, lines, TrackTable, LineTable)[fields]
+    paths = []
+    for index, rows in enumerate(np.array_split(np.arange(len(crossings)), 3)):
+        paths.append(str(tmp_path / f"crossings_{index}.csv"))
+        crossings.iloc[rows].to_csv(paths[-1], index=False)
+
+    temp_out_df = pd.concat([LoadColumns(path, fields, dates=["BaseDateTime"]) for path in paths], ignore_index=True)
+    assert temp_out_df["VesselType"].isna().any()
+    PeriodField = None
+    if Period:
+        PeriodField = "Period"
+        temp_out_df[PeriodField] = PeriodKeys(temp_out_df["BaseDateTime"], Period)
+    merged, table = BatchSummary(paths, "NAME", "VesselType", "MMSI", "Length", "ORIG_FID_CALC", "BaseDateTime", Period, Simplified, Workers=1)
+    pd.testing.assert_frame_equal(table, summarize(temp_out_df, Simplified, PeriodField), check_dtype=False, check_categorical=False)
+
+
+## Raw track files intersected with the passage lines in the workers give the table of one in-memory run
+@pytest.mark.parametrize("Simplified,Workers", [("false", 1), ("true", 2)])
+def test_batch_track_files_match_one_run(synthetic, track_files, tmp_path, Simplified, Workers):
+    tracks, TrackTable, lines, LineTable = synthetic
+    paths = []
+    for index, rows in enumerate(np.array_split(np.arange(len(tracks.ids)), 3)):
+        keep = np.zeros(len(tracks.ids), dtype=bool)
+        keep[rows] = True
+        paths.append(str(tmp_path / f"tracks_{index}.csv"))
+        write_wkt(paths[-1], SubsetPaths(tracks, keep), TrackTable[keep])
+
+    temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable)
+    temp_out_df["Period"] = PeriodKeys(temp_out_df["BaseDateTime"], "quarter")
+    merged, table = BatchSummary(str(tmp_path / "tracks_*.csv"), "NAME", "VesselType", "MMSI", "Length", DateField="BaseDateTime",
+                                 Period="quarter", Simplified=Simplified, Workers=Workers, PassageLines=track_files[1])
+    pd.testing.assert_frame_equal(table, summarize(temp_out_df, Simplified, "Period"), check_dtype=False, check_categorical=False)
+
+
+## Seeded raw AIS points of 60 vessels around two gates, a quarter of the vessels without a type
+@pytest.fixture(scope="module")
+def points(tmp_path_factory):
+    rng = np.random.default_rng(7)
+    frames = []
+    for vessel in range(60):
+        n = int(rng.integers(50, 300))
+        times = pd.Timestamp("2023-01-01") + pd.to_timedelta(np.cumsum(rng.integers(10, 300, n)), unit="s")
+        frames.append(pd.DataFrame({
+            "MMSI": 366000000 + vessel * 7, "BaseDateTime": times.strftime("%Y-%m-%dT%H:%M:%S"),
+            "LAT": 30 + np.cumsum(rng.normal(0, 0.005, n)) + rng.uniform(-0.3, 0.3),
+            "LON": -80 + np.cumsum(rng.normal(0, 0.005, n)) + rng.uniform(-0.3, 0.3),
+            "VesselType": rng.choice([30, 70, 80, np.nan]), "Length": rng.uniform(10, 300)}))
+    path = tmp_path_factory.mktemp("ais") / "points.csv"
+    pd.concat(frames).sample(frac=1, random_state=1).to_csv(path, index=False)
+    lines = BuildPaths([np.array([[-80.0, 29.0], [-80.0, 31.0]]), np.array([[-81.0, 30.0], [-79.0, 30.0]])])
+    return str(path), lines, pd.DataFrame({"NAME": ["A", "B"]})
+
+
+@pytest.mark.parametrize("Simplified", ["false", "true"])
+def test_point_summary_matches_one_table(points, Simplified):
+    path, lines, LineTable = points
+    (tracks, TrackTable), = StreamTracks(path)
+    temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable)
+    assert temp_out_df["VesselType"].isna().any()
+    expected = summarize(temp_out_df, Simplified)
+    partial, table = PointSummary(path, lines, LineTable, "NAME", Simplified=Simplified)
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False, check_categorical=False)
+    if Simplified == "true":
+        ## several MMSI partitions give other track ids, so only the order-free simplified table can be compared
+        partial, table = PointSummary(path, lines, LineTable, "NAME", Simplified=Simplified, MemoryMB=0.2, ChunkRows=2000)
+        pd.testing.assert_frame_equal(table, expected, check_dtype=False, check_categorical=False)
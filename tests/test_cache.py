@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+## Intersection cache keys: file inputs keyed on path, size and modification time, the content hash only on request
+
+# import dependencies and libraries
+import os
+
+from passage_line import CacheKey, DatasetFingerprint
+
+
+def test_file_fingerprint(tmp_path):
+    source = tmp_path / "tracks.csv"
+    source.write_text("WKT,MMSI\n")
+    fingerprint = DatasetFingerprint(str(source))
+    assert "hash" not in fingerprint
+    assert "hash" in DatasetFingerprint(str(source), Hash=True)
+    assert CacheKey(DatasetFingerprint(str(source))) == CacheKey(fingerprint)
+
+    ## a new modification time makes a new key, the content hash stays the same
+    hashed = DatasetFingerprint(str(source), Hash=True)
+    os.utime(source, ns=(fingerprint["modified"] + 10 ** 9, fingerprint["modified"] + 10 ** 9))
+    assert CacheKey(DatasetFingerprint(str(source))) != CacheKey(fingerprint)
+    assert DatasetFingerprint(str(source), Hash=True)["hash"] == hashed["hash"]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+## Category schemes from JSON files (LoadCategoryScheme): file order, code ranges, the summary columns they give, and
+## the errors for unknown codes, codes listed under two categories and reserved or repeated names
+
+# import dependencies and libraries
+import json
+
+import pandas as pd
+import pytest
+
+from passage_line import BuildCategoryScheme, LoadCategoryScheme, SimplifySummary, SummarizeTransits
+
+
+def write_scheme(tmp_path, scheme, name="scheme.json"):
+    path = tmp_path / name
+    path.write_text(json.dumps(scheme), encoding="utf-8")
+    return str(path)
+
+
+def test_load_scheme(tmp_path):
+    path = write_scheme(tmp_path, {"Tanker": ["80-82", 89], "Fishing": 30, "Passenger": ["60 - 61"]})
+    assert LoadCategoryScheme(path) == [("Tanker", [80, 81, 82, 89]), ("Fishing", [30]), ("Passenger", [60, 61])]
+    assert LoadCategoryScheme(write_scheme(tmp_path, [["Cargo", ["70-79"]]], "pairs.json")) == [("Cargo", list(range(70, 80)))]
+
+    ## a custom category keeps the codes the file already lists in their own category
+    assert BuildCategoryScheme(path, "Custom", [30, 31])[-1] == ("Custom", [30, 31])
+    temp_out_df = pd.DataFrame({"NAME": ["A"] * 5, "VesselType": [80, 89, 30, 61, 31], "MMSI": [1, 2, 3, 4, 5], "ORIG_FID_CALC": [1, 2, 1, 1, 1]})
+    new_df = SummarizeTransits(temp_out_df, "NAME", "VesselType", "MMSI")
+    summary = SimplifySummary(new_df, temp_out_df, "NAME", CustomName="Custom", CustomTypes=[30, 31], Categories=path)
+    assert list(summary.columns[3::2]) == ["Unique_Tanker", "Unique_Fishing", "Unique_Passenger", "Unique_Custom", "Unique_Other", "Unique_Total"]
+    assert summary.loc[0, ["Transits_Tanker", "Transits_Fishing", "Transits_Passenger", "Transits_Custom", "Transits_Other"]].tolist() == [3, 1, 1, 1, 0]
+
+
+@pytest.mark.parametrize("scheme", [
+    {"Fishing": ["thirty"]},
+    {"Fishing": [30.5]},
+    {"Fishing": [-30]},
+    {"Passenger": ["69-60"]},
+    {"Passenger": ["60-69-70"]},
+    {"Fishing": [True]},
+    {"Cargo": ["70-79"], "Tanker": ["79-89"]},
+    {"Fishing": [30], "Tug_Tow": [31, 30]},
+    {"Other": [99]},
+    [["Fishing", [30]], ["Fishing", [31]]],
+])
+def test_bad_schemes_raise(tmp_path, scheme):
+    with pytest.raises(ValueError):
+        LoadCategoryScheme(write_scheme(tmp_path, scheme))
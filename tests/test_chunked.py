@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+## Chunked (bounded-memory) runs against the in-memory NumPy run, on tracks with missing vessel types and lengths
+
+# import dependencies and libraries
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from passage_line import (CellSketches, ChunkedSummary, DIRECTION_FIELDS, IntersectTracks, LengthDistribution, PartialAggregate, PartialSummary,
+                          PeriodKeys, ReadFeatureBatches, ReadFeatures, RunSummary, SimplifySummary, SummarizeTransits, TrackBatches)
+
+
+def in_memory_summary(tracks, TrackTable, lines, LineTable, Simplified, Period):
+    temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable)
+    PeriodField = None
+    if Period:
+        PeriodField = "Period"
+        temp_out_df[PeriodField] = PeriodKeys(temp_out_df["BaseDateTime"], Period)
+    new_df = SummarizeTransits(temp_out_df, "NAME", "VesselType", "MMSI", PeriodField=PeriodField)
+    if Simplified == "true":
+        new_df = SimplifySummary(new_df, temp_out_df, "NAME", "Length", PeriodField=PeriodField)
+    return new_df, LengthDistribution(temp_out_df, "NAME", "Length", "VesselType", PeriodField)
+
+
+@pytest.mark.parametrize("Simplified", ["false", "true"])
+@pytest.mark.parametrize("Period", [None, "month"])
+@pytest.mark.parametrize("BatchSize", [700, 2999])
+def test_chunked_matches_in_memory(synthetic, Simplified, Period, BatchSize):
+    tracks, TrackTable, lines, LineTable = synthetic
+    expected, expected_lengths = in_memory_summary(tracks, TrackTable, lines, LineTable, Simplified, Period)
+    running, table, lengths = ChunkedSummary(TrackBatches(tracks, TrackTable, BatchSize=BatchSize), lines, LineTable, "NAME", "VesselType", "MMSI",
+                                             "Length", Simplified=Simplified, DateField="BaseDateTime", Period=Period, LengthOutput=True)
+    assert running.batches > 1
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(lengths, expected_lengths, check_dtype=False)
+
+
+## Sketch mode counts like exact mode, at a precision where the estimates of these small cells are exact: per-type
+## estimates summed into the categories, and Unique_Total the distinct vessels of the line over all its types
+@pytest.mark.parametrize("Simplified", ["false", "true"])
+def test_sketch_mode_matches_exact_mode(synthetic, Simplified):
+    tracks, TrackTable, lines, LineTable = synthetic
+    tables = {}
+    for Mode in ("exact", "sketch"):
+        running, tables[Mode], lengths = ChunkedSummary(TrackBatches(tracks, TrackTable, BatchSize=700), lines, LineTable, "NAME", "VesselType", "MMSI",
+                                                        "Length", Simplified=Simplified, DateField="BaseDateTime", Period="month", Mode=Mode, precision=14)
+    bounds = ["Unique_Total_Low", "Unique_Total_High"] if Simplified == "true" else ["Unique_Vessels_Low", "Unique_Vessels_High"]
+    assert list(tables["sketch"].columns) == list(tables["exact"].columns) + bounds
+    summed = [column for column in tables["exact"].columns if column != "Unique_Total"]
+    pd.testing.assert_frame_equal(tables["sketch"][summed], tables["exact"][summed], check_dtype=False, check_categorical=False)
+    if Simplified == "true":
+        temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable)
+        temp_out_df["Period"] = PeriodKeys(temp_out_df["BaseDateTime"], "month")
+        rows = temp_out_df[temp_out_df["VesselType"].notna() & temp_out_df["MMSI"].notna()]
+        union = rows.groupby(["Period", "NAME"])["MMSI"].nunique()
+        expected = union.reindex(pd.MultiIndex.from_arrays([tables["sketch"]["Period"].astype(str), tables["sketch"]["Name"]])).fillna(0)
+        assert (tables["sketch"]["Unique_Total"].to_numpy() == expected.to_numpy()).all()
+        assert (tables["sketch"]["Unique_Total"] <= tables["exact"]["Unique_Total"]).all()
+
+
+## One vessel reported as two cargo type codes counts once per type, and once in the sketched Unique_Total
+def test_vessel_under_two_types():
+    temp_out_df = pd.DataFrame({"OBJECTID": [1, 2], "NAME": ["A", "A"], "VesselType": [70, 71], "MMSI": [367000001, 367000001],
+                                "ORIG_FID_CALC": [1, 1]})
+    partial = PartialAggregate(temp_out_df, "NAME", "VesselType", "MMSI")
+    exact = PartialSummary(partial, "true")
+    sketch = PartialSummary(partial, "true", Sketched=CellSketches(temp_out_df, "NAME", "VesselType", "MMSI"))
+    assert exact.loc[0, "Unique_Cargo"] == 2 and exact.loc[0, "Unique_Total"] == 2
+    assert sketch.loc[0, "Unique_Cargo"] == 2 and sketch.loc[0, "Unique_Total"] == 1
+    assert sketch.loc[0, "Unique_Total_Low"] <= 1 <= sketch.loc[0, "Unique_Total_High"]
+
+
+## Batch partials merged every few batches (a tiny pending limit) give the same tables as one merge at the end
+def test_periodic_merges_match_in_memory(synthetic, monkeypatch):
+    import passage_line.chunked
+
+    monkeypatch.setattr(passage_line.chunked, "_MIN_PENDING_CELLS", 1)
+    tracks, TrackTable, lines, LineTable = synthetic
+    expected, expected_lengths = in_memory_summary(tracks, TrackTable, lines, LineTable, "true", "month")
+    merges = []
+    flush = passage_line.chunked.FlushRunning
+    monkeypatch.setattr(passage_line.chunked, "FlushRunning", lambda running: merges.append(len(running.pending)) or flush(running))
+    running, table, lengths = ChunkedSummary(TrackBatches(tracks, TrackTable, BatchSize=500), lines, LineTable, "NAME", "VesselType", "MMSI",
+                                             "Length", Simplified="true", DateField="BaseDateTime", Period="month", LengthOutput=True)
+    assert len([count for count in merges if count]) > 2 and running.pending == ()
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(lengths, expected_lengths, check_dtype=False)
+
+
+## A GeoJSON track file is read a few features at a time and the chunked command line run matches the in-memory one
+def test_chunked_geojson_tracks(synthetic, track_files, tmp_path):
+    tracks, TrackTable, lines, LineTable = synthetic
+    table = TrackTable.reindex(tracks.ids)
+    features = []
+    for feature, track in enumerate(tracks.ids):
+        xy = tracks.xy[tracks.offsets[feature]:tracks.offsets[feature + 1]]
+        properties = {"OBJECTID": int(track), "MMSI": int(table.loc[track, "MMSI"]), "BaseDateTime": str(table.loc[track, "BaseDateTime"]),
+                      "VesselType": None if pd.isna(table.loc[track, "VesselType"]) else float(table.loc[track, "VesselType"]),
+                      "Length": None if pd.isna(table.loc[track, "Length"]) else float(table.loc[track, "Length"])}
+        features.append({"type": "Feature", "properties": properties, "geometry": {"type": "LineString", "coordinates": xy.tolist()}})
+    source = tmp_path / "tracks.geojson"
+    source.write_text(json.dumps({"type": "FeatureCollection", "name": "tracks", "features": features}, indent=1))
+    assert source.stat().st_size > 3 * 1024 ** 2
+
+    batches = list(ReadFeatureBatches(str(source), ["MMSI", "VesselType"], BatchRows=3000))
+    whole = ReadFeatures(str(source), ["MMSI", "VesselType"])
+    assert len(batches) == -(-len(tracks.ids) // 3000)
+    assert np.array_equal(np.concatenate([batch[0].ids for batch in batches]), whole[0].ids)
+    assert np.array_equal(np.concatenate([batch[0].xy for batch in batches]), whole[0].xy)
+    pd.testing.assert_frame_equal(pd.concat([batch[1] for batch in batches]), whole[1])
+
+    tables = {}
+    for MemoryMB in (None, 1):
+        tables[MemoryMB] = RunSummary(str(source), track_files[1], "NAME", "VesselType", "MMSI", str(tmp_path / f"out_{MemoryMB}.csv"),
+                                      "Length", Simplified="true", DateField="BaseDateTime", Period="month", Message=lambda text: None,
+                                      MemoryMB=MemoryMB)
+    pd.testing.assert_frame_equal(tables[1], tables[None], check_dtype=False, check_categorical=False)
+
+
+## Per-direction columns of a chunked run match the in-memory run; sketch mode has no per-direction MMSI sets
+@pytest.mark.parametrize("Simplified", ["false", "true"])
+def test_chunked_directions_match_in_memory(synthetic, Simplified):
+    tracks, TrackTable, lines, LineTable = synthetic
+    temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable)
+    temp_out_df["Period"] = PeriodKeys(temp_out_df["BaseDateTime"], "month")
+    expected = SummarizeTransits(temp_out_df, "NAME", "VesselType", "MMSI", PeriodField="Period", DirectionFields=DIRECTION_FIELDS)
+    if Simplified == "true":
+        expected = SimplifySummary(expected, temp_out_df, "NAME", "Length", PeriodField="Period")
+    running, table, lengths = ChunkedSummary(TrackBatches(tracks, TrackTable, BatchSize=700), lines, LineTable, "NAME", "VesselType", "MMSI",
+                                             "Length", Simplified=Simplified, DateField="BaseDateTime", Period="month", Directions=True)
+    assert any(column.endswith("_Left") for column in table.columns)
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False, check_categorical=False)
+    with pytest.raises(ValueError):
+        ChunkedSummary(TrackBatches(tracks, TrackTable, BatchSize=700), lines, LineTable, "NAME", "VesselType", "MMSI", Mode="sketch", Directions=True)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+## Compact crossing tables: string vessel types saved and loaded, failed saves cleaned up, and the cache entries of the
+## toolbox (compact table and dates) giving the same summary tables as the intersect table they were built from
+
+# import dependencies and libraries
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from passage_line import (CompactCrossingTable, CompactFrame, CorridorMatrix, IntersectTracks, LengthDistribution, LoadCompact, LoadCrossings,
+                          PeriodKeys, SaveCompact, SaveCrossings, SimplifySummary, SummarizeTransits)
+
+
+@pytest.fixture(scope="module")
+def crossings(synthetic):
+    tracks, TrackTable, lines, LineTable = synthetic
+    return IntersectTracks(tracks, lines, TrackTable, LineTable)
+
+
+def test_string_types_round_trip(crossings, tmp_path):
+    temp_out_df = crossings.assign(VesselType=crossings["VesselType"].map(lambda value: value if pd.isna(value) else f"T{int(value)}"))
+    compact = CompactCrossingTable(temp_out_df, "NAME", "VesselType", "MMSI", "Length", "BaseDateTime")
+    loaded = LoadCompact(SaveCompact(compact, str(tmp_path / "compact")))
+    assert list(loaded.types) == list(compact.types)
+    assert os.listdir(tmp_path) == ["compact"]
+    pd.testing.assert_frame_equal(SummarizeTransits(CompactFrame(loaded), "NAME", "VesselType", "MMSI"),
+                                  SummarizeTransits(temp_out_df, "NAME", "VesselType", "MMSI"))
+
+
+def test_failed_save_leaves_nothing(crossings, tmp_path):
+    compact = CompactCrossingTable(crossings, "NAME", "VesselType", "MMSI")
+    with pytest.raises(ValueError):
+        SaveCompact(compact._replace(count=np.array([object()], dtype=object)), str(tmp_path / "compact"))
+    with pytest.raises(ValueError):
+        SaveCrossings(str(tmp_path / "cache"), "key", crossings=compact._replace(count=np.array([object()], dtype=object)))
+    assert os.listdir(tmp_path) == ["cache"] and os.listdir(tmp_path / "cache") == []
+
+
+def test_cache_entry_matches_intersect(crossings, tmp_path):
+    temp_out_df = crossings.copy()
+    compact = CompactCrossingTable(temp_out_df, "NAME", "VesselType", "MMSI", "Length", CountField="Crossings", LengthDtype="float64")
+    SaveCrossings(str(tmp_path), "key", crossings=compact, dates=temp_out_df[["BaseDateTime"]])
+    cached = LoadCrossings(str(tmp_path), "key")
+    frame = CompactFrame(cached["crossings"])
+    frame["BaseDateTime"] = cached["dates"]["BaseDateTime"].to_numpy()
+    for table in (temp_out_df, frame):
+        table["Period"] = PeriodKeys(table["BaseDateTime"], "month")
+
+    expected = SummarizeTransits(temp_out_df, "NAME", "VesselType", "MMSI", "Crossings", PeriodField="Period")
+    summary = SummarizeTransits(frame, "NAME", "VesselType", "MMSI", "Crossings", PeriodField="Period")
+    pd.testing.assert_frame_equal(summary, expected)
+    pd.testing.assert_frame_equal(SimplifySummary(summary, frame, "NAME", "Length", PeriodField="Period"),
+                                  SimplifySummary(expected, temp_out_df, "NAME", "Length", PeriodField="Period"))
+    pd.testing.assert_frame_equal(LengthDistribution(frame, "NAME", "Length", "VesselType", "Period"),
+                                  LengthDistribution(temp_out_df, "NAME", "Length", "VesselType", "Period"), check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(CorridorMatrix(frame, "NAME", "VesselType", "MMSI", OrderFields=["BaseDateTime"]),
+                                  CorridorMatrix(temp_out_df, "NAME", "VesselType", "MMSI", OrderFields=["BaseDateTime"]))
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+## Passage line corridor table (CorridorMatrix) on a hand-checked crossing table: shared vessels from B.T @ B and the
+## forward counts in track date order (the toolbox) and in date, track and position order (the command line)
+
+# import dependencies and libraries
+import pandas as pd
+import pytest
+
+from passage_line import CorridorMatrix
+from passage_line.cli import _corridor_order
+
+## vessel 1 crosses A then B along track 1 and C on a later track 2; vessel 2 crosses B on track 3 and A on a later
+## track 4; vessel 3 (Passenger) only crosses A. Track 5 of vessel 1 crosses B at its start on the day of track 1.
+CROSSINGS = pd.DataFrame({
+    "NAME": ["A", "B", "C", "B", "A", "A", "B"],
+    "MMSI": [1, 1, 1, 2, 2, 3, 1],
+    "VesselType": [70, 70, 70, 71, 71, 60, 70],
+    "Track_ID": [1, 1, 2, 3, 4, 6, 5],
+    "First_Position": [1.0, 3.0, 0.5, 2.0, 0.2, 4.0, 0.1],
+    "BaseDateTime": pd.to_datetime(["2024-01-01", "2024-01-01", "2024-01-02", "2024-01-01", "2024-01-02", "2024-01-01", "2024-01-01"]),
+})
+
+
+def corridors(OrderFields):
+    table = CorridorMatrix(CROSSINGS, "NAME", "VesselType", "MMSI", OrderFields=OrderFields)
+    return {(row.Category, row.From_Name, row.To_Name): tuple(row[3:]) for row in table.itertuples(index=False)}
+
+
+def test_shared_vessels():
+    ## B has rows (vessel, line) 1: A B C, 2: A B, 3: A, so B.T @ B holds A-B 2, A-C 1, B-C 1 off the diagonal
+    table = corridors(None)
+    assert table == {
+        ("Cargo", "A", "B"): (2, 2), ("Cargo", "A", "C"): (2, 1), ("Cargo", "B", "A"): (2, 2), ("Cargo", "B", "C"): (2, 1),
+        ("Cargo", "C", "A"): (1, 1), ("Cargo", "C", "B"): (1, 1),
+        ("Total", "A", "B"): (3, 2), ("Total", "A", "C"): (3, 1), ("Total", "B", "A"): (2, 2), ("Total", "B", "C"): (2, 1),
+        ("Total", "C", "A"): (1, 1), ("Total", "C", "B"): (1, 1),
+    }
+
+
+@pytest.mark.parametrize("OrderFields, forward", [
+    ## the toolbox: A and B of vessel 1 share a date and tie, B of vessel 2 comes a day before its A
+    (["BaseDateTime"], {("A", "B"): 0, ("B", "A"): 1, ("A", "C"): 1, ("C", "A"): 0, ("B", "C"): 1, ("C", "B"): 0}),
+    ## the command line: track 1 crosses A (position 1) before B (position 3). Track 5 crosses B nearer its start, but
+    ## comes after track 1, so it can't put B before A.
+    (_corridor_order("BaseDateTime", True), {("A", "B"): 1, ("B", "A"): 1, ("A", "C"): 1, ("C", "A"): 0, ("B", "C"): 1, ("C", "B"): 0}),
+])
+def test_forward_counts(OrderFields, forward):
+    table = corridors(OrderFields)
+    for (From_Name, To_Name), vessels in forward.items():
+        assert table[("Total", From_Name, To_Name)][2] == vessels, (From_Name, To_Name)
+        assert table[("Cargo", From_Name, To_Name)][2] == vessels, (From_Name, To_Name)
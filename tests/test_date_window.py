@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+## Date window applied to the track lines before the geometry stage (RunSummary, in memory and chunked) against the
+## original order: intersect every track, then filter the crossings by date
+
+# import dependencies and libraries
+import pandas as pd
+import pytest
+
+from passage_line import DateWindow, IntersectTracks, PeriodKeys, ReadFeatures, RunSummary, SimplifySummary, SummarizeTransits
+
+
+@pytest.mark.parametrize("MemoryMB", [None, 1])
+@pytest.mark.parametrize("Simplified, Period", [("false", ""), ("true", "week")])
+def test_early_filter_matches_late_filter(track_files, tmp_path, MemoryMB, Simplified, Period):
+    TrackLines, PassageLines = track_files
+    StartInterval, EndInterval = "2024-03-01", "2024-05-15 12:00"
+
+    tracks, TrackTable, shape_type = ReadFeatures(TrackLines, ["MMSI", "VesselType", "Length", "BaseDateTime"])
+    lines, LineTable, shape_type = ReadFeatures(PassageLines, ["NAME"])
+    temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable)
+    temp_out_df = temp_out_df[DateWindow(temp_out_df["BaseDateTime"], StartInterval, EndInterval)].reset_index(drop=True)
+    PeriodField = None
+    if Period:
+        PeriodField = "Period"
+        temp_out_df[PeriodField] = PeriodKeys(temp_out_df["BaseDateTime"], Period)
+    expected = SummarizeTransits(temp_out_df, "NAME", "VesselType", "MMSI", PeriodField=PeriodField)
+    if Simplified == "true":
+        expected = SimplifySummary(expected, temp_out_df, "NAME", "Length", PeriodField=PeriodField)
+
+    table = RunSummary(TrackLines, PassageLines, "NAME", "VesselType", "MMSI", str(tmp_path / "summary.csv"), "Length", Simplified=Simplified,
+                       DateField="BaseDateTime", StartInterval=StartInterval, EndInterval=EndInterval, Period=Period, Message=lambda message: None,
+                       MemoryMB=MemoryMB)
+    assert 0 < temp_out_df["ORIG_FID_CALC"].sum() < IntersectTracks(tracks, lines, TrackTable, LineTable)["ORIG_FID_CALC"].sum()
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False, check_categorical=False)
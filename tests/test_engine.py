@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+## Crossing counts of the NumPy engine (IntersectTracks) against shapely on seeded random paths and on the edge cases:
+## a track vertex on a line, a touch, track and line end points on each other, a line vertex on a track and a
+## collinear overlap
+
+# import dependencies and libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+from passage_line import BuildPaths, DIRECTION_FIELDS, DIRECTIONS, DirectionRule, EnvelopePrefilter, FindCrossings, IntersectTracks, PrefilterDistance
+
+shapely = pytest.importorskip("shapely")
+from shapely.geometry import LineString
+
+
+## Crossing points of a track and a line by shapely: the distinct points of the intersection. Collinear overlaps come
+## out as line parts and count as no crossing, like the POINT output of PairwiseIntersect.
+def shapely_crossings(track, line):
+    points = [part for part in getattr(track.intersection(line), "geoms", [track.intersection(line)]) if part.geom_type == "Point"]
+    return len({(point.x, point.y) for point in points})
+
+
+def compare(tracks, lines):
+    TrackTable = pd.DataFrame({"MMSI": np.arange(len(tracks))}, index=np.arange(1, len(tracks) + 1))
+    LineTable = pd.DataFrame({"NAME": [f"Line_{index}" for index in range(len(lines))]})
+    temp_out_df = IntersectTracks(BuildPaths(tracks, ids=TrackTable.index), BuildPaths(lines), TrackTable, LineTable)
+    counts = {(track, line): crossings for track, line, crossings in zip(temp_out_df["MMSI"], temp_out_df["NAME"], temp_out_df["Crossings"])}
+    for track_index, track in enumerate(tracks):
+        for line_index, line in enumerate(lines):
+            expected = shapely_crossings(LineString(track), LineString(line))
+            assert counts.get((track_index, f"Line_{line_index}"), 0) == expected, (track_index, line_index)
+    return counts
+
+
+def test_random_paths_match_shapely():
+    rng = np.random.default_rng(5)
+    tracks = [rng.uniform(0, 100, 2) + np.cumsum(rng.normal(0, 6, (rng.integers(2, 25), 2)), axis=0) for _ in range(300)]
+    lines = [rng.uniform(0, 100, 2) + np.cumsum(rng.normal(0, 15, (rng.integers(2, 5), 2)), axis=0) for _ in range(25)]
+    counts = compare(tracks, lines)
+    assert sum(counts.values()) > 100
+    pairs = sum(LineString(track).intersects(LineString(line)) for track in tracks for line in lines)
+    assert len(counts) == pairs
+
+
+def test_edge_cases_match_shapely():
+    line = np.array([[0.0, 0.0], [5.0, 0.0], [10.0, 0.0]])
+    tracks = [
+        np.array([[2.0, -1.0], [3.0, 0.0], [4.0, 1.0]]),     # crosses through a track vertex on the line
+        np.array([[2.0, -1.0], [3.0, 0.0], [4.0, -1.0]]),    # touches the line at a vertex and turns back
+        np.array([[3.0, -1.0], [3.0, 0.0]]),                 # ends on the line
+        np.array([[0.0, -1.0], [0.0, 1.0]]),                 # crosses the first point of the line
+        np.array([[10.0, -1.0], [10.0, 1.0]]),               # crosses the last point of the line
+        np.array([[5.0, -1.0], [5.0, 1.0]]),                 # crosses at a line vertex
+        np.array([[4.0, -1.0], [5.0, 0.0], [6.0, 1.0]]),     # crosses at a line vertex through a track vertex
+        np.array([[2.0, 0.0], [7.0, 0.0]]),                  # collinear overlap, no crossing
+        np.array([[1.0, 1.0], [9.0, 1.0]]),                  # parallel, no crossing
+        np.array([[1.0, -1.0], [2.0, 1.0], [3.0, -1.0], [4.0, 1.0]]),  # zigzag, three crossings
+    ]
+    counts = compare(tracks, [line])
+    assert [counts.get((index, "Line_0"), 0) for index in range(len(tracks))] == [1, 1, 1, 1, 1, 1, 1, 0, 0, 3]
+    assert LineString(tracks[7]).intersects(LineString(line))
+
+
+## Direction sign against a gate digitized south to north: walking along it, west is its left side, so a track heading
+## west crosses from the right side to the left side (Left) and a track heading east is Right. The zigzag crosses
+## west, east, west; with MultipleInt off its single transit goes to the first (Left) crossing.
+def test_direction_sign_of_a_north_gate():
+    gate = np.array([[0.0, 0.0], [0.0, 10.0]])
+    tracks = [
+        np.array([[5.0, 2.0], [-5.0, 2.0]]),                                   # heading west
+        np.array([[-5.0, 4.0], [5.0, 4.0]]),                                   # heading east
+        np.array([[5.0, 6.0], [-5.0, 6.0], [-5.0, 7.0], [5.0, 7.0], [5.0, 8.0], [-5.0, 8.0]]),  # west, east, west
+    ]
+    TrackTable = pd.DataFrame({"MMSI": [1, 2, 3]}, index=[1, 2, 3])
+    LineTable = pd.DataFrame({"NAME": ["Gate"]})
+    crossings = FindCrossings(BuildPaths(tracks, ids=TrackTable.index), BuildPaths([gate]))
+    assert [DIRECTIONS[direction] for direction in crossings["Direction"]] == ["Left", "Right", "Left", "Right", "Left"]
+
+    for MultipleInt, left, right in (("true", [1, 0, 2], [0, 1, 1]), ("false", [1, 0, 1], [0, 1, 0])):
+        temp_out_df = IntersectTracks(BuildPaths(tracks, ids=TrackTable.index), BuildPaths([gate]), TrackTable, LineTable, MultipleInt)
+        assert list(temp_out_df[DIRECTION_FIELDS["Left"]]) == left and list(temp_out_df[DIRECTION_FIELDS["Right"]]) == right
+        assert list(temp_out_df["First_Direction"]) == [1, -1, 1]
+
+    left, right = DirectionRule([2, 0], [1, 3], [-1, -1], "false")
+    assert list(left) == [0, 0] and list(right) == [1, 1]
+    left, right = DirectionRule([2, 0], [1, 3], [-1, -1], "true")
+    assert list(left) == [2, 0] and list(right) == [1, 3]
+
+
+## Envelope prefilter on straight, axis-aligned passage lines, whose envelopes have no area: every track shapely finds
+## crossing a line is kept, and the crossings are the same with and without the prefilter
+def test_prefilter_keeps_tracks_of_axis_aligned_lines():
+    rng = np.random.default_rng(11)
+    tracks = [rng.uniform(0, 100, 2) + np.cumsum(rng.normal(0, 6, (rng.integers(2, 25), 2)), axis=0) for _ in range(300)]
+    lines = [np.array([[20.0, 10.0], [20.0, 90.0]]), np.array([[10.0, 50.0], [90.0, 50.0]]), np.array([[60.0, 30.0], [60.0, 30.0001]])]
+    keep = EnvelopePrefilter(BuildPaths(tracks), BuildPaths(lines))
+    crossing = np.array([any(LineString(track).intersects(LineString(line)) for line in lines) for track in tracks])
+    assert crossing.sum() > 50 and keep[crossing].all() and not keep.all()
+    assert (EnvelopePrefilter(BuildPaths(tracks), BuildPaths(lines), tolerance=5.0) >= keep).all()
+
+    TrackTable = pd.DataFrame({"MMSI": np.arange(len(tracks))})
+    LineTable = pd.DataFrame({"NAME": ["Vertical", "Horizontal", "Short"]})
+    filtered, unfiltered = (IntersectTracks(BuildPaths(tracks), BuildPaths(lines), TrackTable, LineTable, Prefilter=Prefilter) for Prefilter in (True, False))
+    pd.testing.assert_frame_equal(filtered.drop(columns="OBJECTID"), unfiltered.drop(columns="OBJECTID"))
+
+
+## Buffer distance of the toolbox prefilter: the tolerance when one was given, else ten XY tolerances
+def test_prefilter_distance():
+    assert PrefilterDistance("100 Meters", 0.001) == "100 Meters"
+    assert PrefilterDistance("", 0.001) == "0.01"
+    assert PrefilterDistance("0 Meters", 0.5) == "5.0"
+    assert PrefilterDistance(None, float("nan")) == "0.01"
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+## Incremental appends (AppendSummary) against a full recompute, on tracks with missing vessel types and lengths
+
+# import dependencies and libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+from passage_line import AppendSummary, IntersectTracks, PeriodKeys, SimplifySummary, SubsetPaths, SummarizeTransits
+
+
+@pytest.mark.parametrize("Simplified", ["false", "true"])
+@pytest.mark.parametrize("Period", [None, "month"])
+def test_append_matches_recompute(synthetic, tmp_path, Simplified, Period):
+    tracks, TrackTable, lines, LineTable = synthetic
+    StatePath = str(tmp_path / "state.pkl")
+    for cut in np.quantile(tracks.ids, [0.3, 0.75, 1.0]):
+        feed = SubsetPaths(tracks, tracks.ids <= cut)
+        partial, table, new = AppendSummary(StatePath, feed, lines, TrackTable, LineTable, "NAME", "VesselType", "MMSI", "Length",
+                                            Simplified=Simplified, DateField="BaseDateTime", Period=Period)
+        assert new > 0
+
+        temp_out_df = IntersectTracks(feed, lines, TrackTable.reindex(feed.ids), LineTable)
+        PeriodField = None
+        if Period:
+            PeriodField = "Period"
+            temp_out_df[PeriodField] = PeriodKeys(temp_out_df["BaseDateTime"], Period)
+        expected = SummarizeTransits(temp_out_df, "NAME", "VesselType", "MMSI", PeriodField=PeriodField)
+        if Simplified == "true":
+            expected = SimplifySummary(expected, temp_out_df, "NAME", "Length", PeriodField=PeriodField)
+        pd.testing.assert_frame_equal(table, expected, check_dtype=False, check_categorical=False)
+    assert partial.cells["Vessel_Type"].isna().any()
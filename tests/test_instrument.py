@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+## Run instrumentation (Instruments): stage records and messages, the JSON run report, and cProfile limited to the
+## stage named by ProfileStage, on its own and through RunSummary
+
+# import dependencies and libraries
+import json
+import os
+import pstats
+
+import pytest
+
+from passage_line import Instruments, RunSummary
+
+
+def _load_step():
+    return sum(range(1000))
+
+
+def _summary_step():
+    return sorted(range(1000), reverse=True)
+
+
+## Function names in the stats of a .prof file
+def profiled_functions(path):
+    return {function for filename, line, function in pstats.Stats(str(path)).stats}
+
+
+def test_stage_records_and_report(tmp_path):
+    messages = []
+    instruments = Instruments(True, messages.append, "summary", str(tmp_path / "run_summary.prof"))
+    with instruments.stage("load") as record:
+        _load_step()
+        record["rows_out"] = 10
+    with instruments.stage("summary", 10) as record:
+        _summary_step()
+        record["rows_out"] = 3
+    with pytest.raises(RuntimeError):
+        with instruments.stage("output", 3):
+            raise RuntimeError("write failed")
+
+    assert [stage.stage for stage in instruments.records] == ["load", "summary", "output"]
+    assert [(stage.rows_in, stage.rows_out) for stage in instruments.records] == [(None, 10), (10, 3), (3, None)]
+    assert all(stage.wall >= 0 and stage.cpu >= 0 for stage in instruments.records)
+    assert len(messages) == 3 and messages[1].startswith("Stage summary:") and messages[1].endswith("rows 10 -> 3")
+
+    path = instruments.report(str(tmp_path / "run.json"), TrackLines="tracks.csv", Simplified="true")
+    report = json.loads(open(path, encoding="utf-8").read())
+    assert [stage["stage"] for stage in report["stages"]] == ["load", "summary", "output"]
+    assert set(report["stages"][0]) == {"stage", "wall", "cpu", "peak_rss", "rows_in", "rows_out"}
+    assert report["slowest"] in ("load", "summary", "output") and report["run"] == {"TrackLines": "tracks.csv", "Simplified": "true"}
+    assert report["profile"] == os.path.abspath(tmp_path / "run_summary.prof")
+
+    ## only the summary stage ran under the profiler
+    functions = profiled_functions(tmp_path / "run_summary.prof")
+    assert "_summary_step" in functions and "_load_step" not in functions
+
+
+def test_disabled_measures_nothing(tmp_path):
+    messages = []
+    instruments = Instruments(False, messages.append)
+    with instruments.stage("load") as record:
+        record["rows_out"] = 10
+    assert instruments.records == [] and messages == [] and instruments.summary() == []
+    assert not os.listdir(tmp_path)
+
+
+## A RunSummary run report lists the stages it ran, and its profile holds the summary stage only
+def test_run_report(track_files, tmp_path):
+    TrackLines, PassageLines = track_files
+    report = tmp_path / "report.json"
+    RunSummary(TrackLines, PassageLines, "NAME", "VesselType", "MMSI", str(tmp_path / "out.csv"), "Length", Simplified="true",
+               RunReport=str(report), ProfileStage="summary", Message=lambda text: None)
+    stages = json.loads(report.read_text(encoding="utf-8"))["stages"]
+    assert [stage["stage"] for stage in stages] == ["load", "geometry", "summary", "simplified", "output"]
+    assert stages[1]["rows_in"] == stages[0]["rows_out"] and stages[2]["rows_in"] == stages[1]["rows_out"]
+
+    functions = profiled_functions(tmp_path / "report_summary.prof")
+    assert "SummarizeTransits" in functions
+    assert not {"FindCrossings", "ReadFeatures", "SimplifySummary", "WriteSummary"} & functions
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+## Vessel length sketches (LengthSketches, MergeLengthSketches, LengthQuantiles) against exact NumPy quantiles: exact
+## "hazen" quantiles on small groups, a bounded rank error on large groups, and merges of partitions that give the same
+## sketch whatever the grouping
+
+# import dependencies and libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+from passage_line import LengthQuantiles, LengthSketches, MergeLengthSketches
+
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99]
+
+## largest distance, in fraction of the group, between a quantile and the rank of its estimate. t-digest with the
+## default compression of 100 stays well inside it (about 0.001 on these lengths).
+RANK_ERROR = 0.005
+
+
+@pytest.fixture(scope="module")
+def lengths():
+    rng = np.random.default_rng(3)
+    n = 300000
+    return pd.DataFrame({"Name": rng.choice(list("ABC"), n), "Length": np.round(rng.lognormal(4, 0.6, n), 1)})
+
+
+## Rank error of estimates against sorted values: how far q lies outside the ranks the estimate spans
+def rank_error(values, estimates, quantiles):
+    low = np.searchsorted(values, estimates, side="left") / len(values)
+    high = np.searchsorted(values, estimates, side="right") / len(values)
+    return np.maximum(np.maximum(low - quantiles, quantiles - high), 0).max()
+
+
+## groups below 2 / pi * compression (about 63) distinct lengths keep one centroid per length
+def test_small_groups_are_exact():
+    rng = np.random.default_rng(8)
+    frame = pd.DataFrame({"Name": np.repeat(["A", "B"], [40, 60]), "Length": rng.uniform(5, 300, 100).round(1)})
+    sketch = LengthSketches(frame, ["Name"], "Length")
+    estimates = LengthQuantiles(sketch, QUANTILES)
+    for index, name in enumerate(sketch.stats["Name"]):
+        expected = np.quantile(frame.loc[frame["Name"] == name, "Length"], QUANTILES, method="hazen")
+        assert np.allclose(estimates[index], expected)
+
+
+def test_quantile_rank_error(lengths):
+    sketch = LengthSketches(lengths, ["Name"], "Length")
+    estimates = LengthQuantiles(sketch, QUANTILES)
+    for index, name in enumerate(sketch.stats["Name"]):
+        values = np.sort(lengths.loc[lengths["Name"] == name, "Length"].to_numpy())
+        assert rank_error(values, estimates[index], np.asarray(QUANTILES)) <= RANK_ERROR
+        assert len(sketch.centroids[sketch.centroids["Group"] == index]) <= 2 * sketch.compression
+
+
+def test_merge_is_associative(lengths):
+    whole = LengthSketches(lengths, ["Name"], "Length")
+    parts = [LengthSketches(lengths.iloc[rows], ["Name"], "Length") for rows in np.array_split(np.arange(len(lengths)), 3)]
+    left = MergeLengthSketches([MergeLengthSketches(parts[:2]), parts[2]])
+    right = MergeLengthSketches([parts[0], MergeLengthSketches(parts[1:])])
+    flat = MergeLengthSketches(parts)
+
+    expected = whole.stats.set_index("Name").sort_index()
+    for merged in (left, right, flat):
+        stats = merged.stats.set_index("Name").sort_index()
+        pd.testing.assert_frame_equal(stats.drop(columns="Sum"), expected.drop(columns="Sum"))
+        assert np.allclose(stats["Sum"], expected["Sum"])
+    assert np.allclose(LengthQuantiles(left, QUANTILES), LengthQuantiles(right, QUANTILES))
+    assert np.allclose(LengthQuantiles(left, QUANTILES), LengthQuantiles(flat, QUANTILES))
+
+    estimates = LengthQuantiles(left, QUANTILES)
+    for index, name in enumerate(left.stats["Name"]):
+        values = np.sort(lengths.loc[lengths["Name"] == name, "Length"].to_numpy())
+        assert rank_error(values, estimates[index], np.asarray(QUANTILES)) <= RANK_ERROR
+
+    with pytest.raises(ValueError):
+        MergeLengthSketches([whole, LengthSketches(lengths.assign(Other=1), ["Name", "Other"], "Length")])
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+## Row counts of file inputs: CountRows matches the rows pandas reads, with or without a trailing newline
+
+# import dependencies and libraries
+import pandas as pd
+import pytest
+
+from passage_line import CountRows
+
+
+@pytest.mark.parametrize("text", ["MMSI,Length\n", "MMSI,Length", "MMSI,Length\n1,10\n2,20\n", "MMSI,Length\n1,10\n2,20", "", "MMSI,Length\r\n1,10\r\n2,20"])
+def test_count_csv_rows(tmp_path, text):
+    source = tmp_path / "table.csv"
+    source.write_bytes(text.encode("utf-8"))
+    assert CountRows(str(source)) == (len(pd.read_csv(source)) if text else 0)
+
+
+def test_count_parquet_rows(tmp_path):
+    source = tmp_path / "table.parquet"
+    pd.DataFrame({"MMSI": [1, 2, 3]}).to_parquet(source, index=False)
+    assert CountRows(str(source)) == 3
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+## Partitioned runs (ParallelSummary) against the serial NumPy run, on tracks with missing vessel types and lengths
+
+# import dependencies and libraries
+import pandas as pd
+import pytest
+
+from passage_line import IntersectTracks, PeriodKeys, SimplifySummary, SummarizeTransits
+from passage_line.parallel import ParallelSummary
+
+
+def serial_summary(tracks, TrackTable, lines, LineTable, Simplified, Period):
+    temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable)
+    PeriodField = None
+    if Period:
+        PeriodField = "Period"
+        temp_out_df[PeriodField] = PeriodKeys(temp_out_df["BaseDateTime"], Period)
+    new_df = SummarizeTransits(temp_out_df, "NAME", "VesselType", "MMSI", PeriodField=PeriodField)
+    if Simplified != "true":
+        return new_df
+    return SimplifySummary(new_df, temp_out_df, "NAME", "Length", PeriodField=PeriodField)
+
+
+@pytest.mark.parametrize("Partition", ["oid", "tile"])
+@pytest.mark.parametrize("Simplified", ["false", "true"])
+@pytest.mark.parametrize("Period", [None, "month"])
+def test_parallel_matches_serial(synthetic, Partition, Simplified, Period):
+    tracks, TrackTable, lines, LineTable = synthetic
+    assert TrackTable["VesselType"].isna().any()
+    expected = serial_summary(tracks, TrackTable, lines, LineTable, Simplified, Period)
+    merged, table = ParallelSummary(tracks, lines, TrackTable, LineTable, "NAME", "VesselType", "MMSI", "Length", Simplified=Simplified,
+                                    DateField="BaseDateTime", Period=Period, Workers=2, PartitionSize=1500, Partition=Partition)
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False, check_categorical=False)
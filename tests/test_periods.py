@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+## Period settings and labels (ParsePeriod, PeriodKeys, CompletePeriods) at week, quarter and explicit bin boundaries,
+## gap filling across partial label sets, and the date where clause the toolbox filters the tracks with
+
+# import dependencies and libraries
+import pandas as pd
+import pytest
+
+from passage_line import CompletePeriods, DateWhereClause, ParsePeriod, PeriodKeys
+
+
+def test_parse_period():
+    assert ParsePeriod(" Week ") == "W" and ParsePeriod("quarter") == "Q"
+    edges = ParsePeriod("2024-03-01; 2024-01-01;;2024-02-01")
+    assert list(edges) == list(pd.to_datetime(["2024-01-01", "2024-02-01", "2024-03-01"]))
+    assert list(ParsePeriod(["2024-02-01", "2024-01-01"])) == list(pd.to_datetime(["2024-01-01", "2024-02-01"]))
+    with pytest.raises(ValueError):
+        ParsePeriod("2024-01-01")
+
+
+## Weeks run Monday to Sunday and are named by their Monday; empty weeks between the first and last date are listed
+def test_week_boundaries():
+    dates = ["2024-01-07 23:59:59", "2024-01-08 00:00:00", "2023-12-31 12:00:00", "2024-01-22 00:00:00", None]
+    keys = PeriodKeys(dates, "week")
+    assert list(keys.categories) == ["2023-12-25", "2024-01-01", "2024-01-08", "2024-01-15", "2024-01-22"]
+    assert list(keys.astype(object)[:4]) == ["2024-01-01", "2024-01-08", "2023-12-25", "2024-01-22"]
+    assert pd.isna(keys[4]) and keys.ordered
+
+
+def test_quarter_boundaries():
+    keys = PeriodKeys(pd.to_datetime(["2024-03-31 23:59:59", "2024-04-01 00:00:00", "2023-12-31 23:00:00", "2024-01-01 00:00:00"]), "quarter")
+    assert list(keys.categories) == ["2023Q4", "2024Q1", "2024Q2"]
+    assert list(keys.astype(object)) == ["2024Q1", "2024Q2", "2023Q4", "2024Q1"]
+
+
+## Explicit bins are half open: a date on an inner edge starts the next bin, one on the last edge is outside
+def test_explicit_bin_boundaries():
+    dates = pd.to_datetime(["2024-01-01 00:00", "2024-01-31 23:59", "2024-02-01 00:00", "2024-03-01 00:00", "2023-12-31 00:00"])
+    keys = PeriodKeys(dates, "2024-01-01;2024-02-01;2024-03-01")
+    assert list(keys.categories) == ["2024-01-01_2024-02-01", "2024-02-01_2024-03-01"]
+    assert list(keys.codes) == [0, 0, 1, -1, -1]
+
+
+## Labels seen by partial results (files, partitions) are filled out to the periods one run over every date gives
+@pytest.mark.parametrize("Period, dates", [
+    ("week", ["2024-01-02", "2024-01-24"]),
+    ("month", ["2023-11-15", "2024-02-29"]),
+    ("quarter", ["2023-08-01", "2024-04-30"]),
+    ("year", ["2021-06-01", "2024-01-01"]),
+])
+def test_complete_periods(Period, dates):
+    expected = list(PeriodKeys(pd.date_range(dates[0], dates[1], freq="D"), Period).categories)
+    labels = [str(label) for label in PeriodKeys(dates, Period).astype(object)]
+    assert len(expected) > 2
+    assert CompletePeriods(labels + [None], Period) == expected
+    assert CompletePeriods(labels[::-1], Period) == expected
+    assert CompletePeriods([], Period) == []
+    assert CompletePeriods(["anything"], "2024-01-01;2024-02-01") == ["2024-01-01_2024-02-01"]
+
+
+def test_date_where_clause():
+    field = '"BaseDateTime"'
+    assert DateWhereClause(field, "2024-03-01", "2024-05-15 12:00") == (
+        "\"BaseDateTime\" >= date '2024-03-01 00:00:00' AND \"BaseDateTime\" <= date '2024-05-15 12:00:00'")
+    assert DateWhereClause(field, "3/1/2024 08:30") == "\"BaseDateTime\" >= date '2024-03-01 08:30:00'"
+    assert DateWhereClause(field, EndInterval="2024-05-15") == "\"BaseDateTime\" <= date '2024-05-15 00:00:00'"
+    assert DateWhereClause(field) == ""
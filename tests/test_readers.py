@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+## WKB parser of the file readers (_wkb_parts) against shapely.to_wkb: line and multiline geometries (and polygons) in
+## both byte orders, with Z in ISO and EWKB flavors and with an SRID, read back to the same vertices
+
+# import dependencies and libraries
+import numpy as np
+import pytest
+
+from passage_line.readers import _wkb_parts
+
+shapely = pytest.importorskip("shapely")
+from shapely.geometry import LineString, MultiLineString, MultiPolygon, Polygon
+
+LINE = [(0.5, -1.25), (3.0, 4.0), (1e7, -2.5e-3), (-7.75, 8.0)]
+GEOMETRIES = {
+    "LineString": (LineString(LINE), 2),
+    "MultiLineString": (MultiLineString([LINE, [(10, 10), (11, 12)], [(-3, 0), (0, 0), (0, -3)]]), 5),
+    "Polygon": (Polygon([(0, 0), (4, 0), (4, 4), (0, 4)], [[(1, 1), (2, 1), (2, 2)]]), 3),
+    "MultiPolygon": (MultiPolygon([Polygon([(0, 0), (1, 0), (1, 1)]), Polygon([(5, 5), (6, 5), (6, 6)])]), 6),
+}
+
+
+## Every part (line part or ring) of a shapely geometry as an (n, 2) array
+def shapely_parts(geometry):
+    if geometry.geom_type == "Polygon":
+        return [np.asarray(ring.coords)[:, :2] for ring in [geometry.exterior, *geometry.interiors]]
+    if hasattr(geometry, "geoms"):
+        return [part for member in geometry.geoms for part in shapely_parts(member)]
+    return [np.asarray(geometry.coords)[:, :2]]
+
+
+@pytest.mark.parametrize("kind", list(GEOMETRIES))
+@pytest.mark.parametrize("byte_order", [0, 1])
+@pytest.mark.parametrize("options", [{}, {"output_dimension": 3, "flavor": "iso"}, {"output_dimension": 3, "flavor": "extended"},
+                                     {"include_srid": True, "flavor": "extended"}])
+def test_wkb_round_trip(kind, byte_order, options):
+    geometry, code = GEOMETRIES[kind]
+    if options.get("output_dimension") == 3:
+        geometry = shapely.force_3d(geometry, 7.5)
+    if options.get("include_srid"):
+        geometry = shapely.set_srid(geometry, 4326)
+    data = shapely.to_wkb(geometry, byte_order=byte_order, **options)
+    parts, codes, offset = _wkb_parts(data)
+    assert offset == len(data) and code in codes
+    expected = shapely_parts(geometry)
+    assert len(parts) == len(expected)
+    for part, want in zip(parts, expected):
+        assert part.dtype == np.float64 and np.array_equal(part, want)
+
+
+## Geometries written one after the other are read from the offset the previous one ends at
+def test_wkb_offsets():
+    data = b"".join(shapely.to_wkb(geometry, byte_order=index % 2) for index, (geometry, code) in enumerate(GEOMETRIES.values()))
+    offset = 0
+    for geometry, code in GEOMETRIES.values():
+        parts, codes, offset = _wkb_parts(data, offset)
+        assert len(parts) == len(shapely_parts(geometry))
+    assert offset == len(data)
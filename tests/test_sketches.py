@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+## Unique vessel sketches: saved and loaded, merged across parts, and the sketch mode of the in-memory command line run
+
+# import dependencies and libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+from passage_line import CellSketches, EstimateSketches, IntersectTracks, LoadSketches, MergeSketches, PeriodKeys, SaveSketches
+from passage_line.cli import main
+
+
+@pytest.fixture(scope="module")
+def crossings(synthetic):
+    tracks, TrackTable, lines, LineTable = synthetic
+    temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable)
+    temp_out_df["Period"] = PeriodKeys(temp_out_df["BaseDateTime"], "quarter")
+    return temp_out_df
+
+
+def test_save_load_and_merge(crossings, tmp_path):
+    whole = CellSketches(crossings, "NAME", "VesselType", "MMSI", "Period")
+    parts = []
+    for index, rows in enumerate(np.array_split(np.arange(len(crossings)), 3)):
+        SaveSketches(CellSketches(crossings.iloc[rows], "NAME", "VesselType", "MMSI", "Period"), tmp_path / f"part_{index}.pkl")
+        parts.append(LoadSketches(tmp_path / f"part_{index}.pkl"))
+    merged = MergeSketches(parts)
+    assert merged.precision == whole.precision
+    keys = list(whole.keys.columns)
+    expected = EstimateSketches(whole).sort_values(keys, ignore_index=True)
+    pd.testing.assert_frame_equal(EstimateSketches(merged).sort_values(keys, ignore_index=True), expected)
+
+
+@pytest.mark.parametrize("simplified", [[], ["--simplified"]])
+def test_cli_sketch_matches_exact(track_files, tmp_path, simplified):
+    TrackLines, PassageLines = track_files
+    tables = {}
+    for unique in ("exact", "sketch"):
+        output = str(tmp_path / f"{unique}.csv")
+        assert main([TrackLines, PassageLines, output, "--name-field", "NAME", "--length", "Length", "--date-field", "BaseDateTime",
+                     "--period", "quarter", "--unique", unique, "--precision", "14"] + simplified) == 0
+        tables[unique] = pd.read_csv(output)
+    bounds = ["Unique_Total_Low", "Unique_Total_High"] if simplified else ["Unique_Vessels_Low", "Unique_Vessels_High"]
+    assert list(tables["sketch"].columns) == list(tables["exact"].columns) + bounds
+    summed = [column for column in tables["exact"].columns if column != "Unique_Total"]
+    pd.testing.assert_frame_equal(tables["sketch"][summed], tables["exact"][summed])
+    estimate = tables["sketch"]["Unique_Total" if simplified else "Unique_Vessels"]
+    assert ((tables["sketch"][bounds[0]] <= estimate) & (estimate <= tables["sketch"][bounds[1]])).all()
+
+
+## A vessel reported under two type codes is one vessel in the sketched Unique_Total of the toolbox/command line run
+def test_cli_vessel_under_two_types(tmp_path):
+    TrackLines, PassageLines = str(tmp_path / "tracks.csv"), str(tmp_path / "lines.csv")
+    pd.DataFrame({"MMSI": [367000001, 367000001, 367000002], "VesselType": [70, 71, 60],
+                  "WKT": ["LINESTRING (0 -1, 0 1)", "LINESTRING (1 -1, 1 1)", "LINESTRING (2 -1, 2 1)"]}).to_csv(TrackLines, index=False)
+    pd.DataFrame({"NAME": ["A"], "WKT": ["LINESTRING (-1 0, 3 0)"]}).to_csv(PassageLines, index=False)
+    tables = {}
+    for unique in ("exact", "sketch"):
+        output = str(tmp_path / f"{unique}.csv")
+        assert main([TrackLines, PassageLines, output, "--name-field", "NAME", "--unique", unique, "--simplified"]) == 0
+        tables[unique] = pd.read_csv(output)
+    assert tables["exact"].loc[0, ["Unique_Cargo", "Unique_Passenger", "Unique_Total"]].tolist() == [2, 1, 3]
+    assert tables["sketch"].loc[0, ["Unique_Cargo", "Unique_Passenger", "Unique_Total"]].tolist() == [2, 1, 2]
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+## SummarizeTransits/SimplifySummary against the nested loops of the original PassageLineSummary, rewritten without
+## DataFrame.append but otherwise line for line, on a small seeded crossing table
+
+# import dependencies and libraries
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from passage_line import SimplifySummary, SummarizeTransits
+
+## if/elif ladder of the original simplified table, in output column order
+BASELINE_CATEGORIES = [
+    ("Fishing", lambda code: code == 30),
+    ("Tug_Tow", lambda code: code in [31, 32, 52]),
+    ("Recreational", lambda code: code in [36, 37]),
+    ("Passenger", lambda code: code >= 60 and code <= 69),
+    ("Cargo", lambda code: code >= 70 and code <= 79),
+    ("Tanker", lambda code: code >= 80 and code <= 89),
+    ("Pilots", lambda code: code == 50),
+    ("Mil_LE", lambda code: code in [35, 55]),
+]
+BASELINE_COLUMNS = ["Fishing", "Tug_Tow", "Recreational", "Mil_LE", "Pilots", "Passenger", "Cargo", "Tanker"]
+
+
+@pytest.fixture
+def crossings():
+    rng = np.random.default_rng(11)
+    n = 600
+    return pd.DataFrame({
+        "OBJECTID": np.arange(1, n + 1),
+        "NAME": rng.choice([f"Line_{index:02d}" for index in range(7)], n),
+        "VesselType": rng.choice([30, 31, 35, 36, 50, 52, 60, 70, 71, 80, 99, 1001, np.nan], n),
+        "MMSI": np.where(rng.random(n) < 0.03, np.nan, rng.integers(1, 80, n)),
+        "Length": np.where(rng.random(n) < 0.1, np.nan, np.round(rng.uniform(5, 300, n), 1)),
+        "ORIG_FID_CALC": rng.integers(1, 4, n),
+    })
+
+
+def baseline_new_df(temp_out_df, NameField, VesselTypes, MMSI):
+    transit_df = temp_out_df[[NameField, VesselTypes, "ORIG_FID_CALC"]].groupby(by=[NameField, VesselTypes]).sum().reset_index()
+    unique_df = temp_out_df.groupby(by=[NameField, VesselTypes, MMSI]).count().reset_index()
+    temp_type = pd.unique(temp_out_df[VesselTypes])
+    temp_label = pd.unique(temp_out_df[NameField])
+    rows = []
+    for x in range(len(temp_label)):
+        for i in range(len(temp_type)):
+            rows.append({"Name": temp_label[x], "Vessel_Type": temp_type[i]})
+    for row in rows:
+        temp_transit = transit_df[(transit_df[VesselTypes] == row["Vessel_Type"]) & (transit_df[NameField] == row["Name"])].reset_index(drop=True)
+        row["Total_Transits"] = temp_transit["ORIG_FID_CALC"][0] if len(temp_transit) > 0 else 0
+        temp_unique = unique_df[(unique_df[VesselTypes] == row["Vessel_Type"]) & (unique_df[NameField] == row["Name"])].reset_index(drop=True)
+        row["Unique_Vessels"] = len(temp_unique[MMSI]) if len(temp_unique) > 0 else 0
+    return pd.DataFrame(rows, columns=["Name", "Vessel_Type", "Total_Transits", "Unique_Vessels"])
+
+
+def baseline_simplified(new_df, temp_out_df, NameField, CustomName="", CustomTypes=None):
+    ladder = list(BASELINE_CATEGORIES)
+    columns = list(BASELINE_COLUMNS)
+    if CustomName and CustomTypes:
+        ladder.append((CustomName, lambda code: code in CustomTypes))
+        columns.append(CustomName)
+    rows = []
+    for name in sorted(new_df["Name"].unique()):
+        row = {"Name": name}
+        maxim = [x for x in temp_out_df[temp_out_df[NameField] == name]["Length"] if math.isnan(x) == False]
+        row["Max_Len"] = max(maxim) if len(maxim) > 0 else 0
+        row["Avg_Len"] = round(sum(maxim) / len(maxim), 2) if len(maxim) > 0 else 0
+        totals = {column: [0, 0] for column in columns + ["Total"]}
+        for z in new_df.index:
+            if new_df["Name"][z] != name:
+                continue
+            totals["Total"][0] += new_df["Unique_Vessels"][z]
+            totals["Total"][1] += new_df["Total_Transits"][z]
+            for category, test in ladder:
+                if test(new_df["Vessel_Type"][z]):
+                    totals[category][0] += new_df["Unique_Vessels"][z]
+                    totals[category][1] += new_df["Total_Transits"][z]
+                    break
+        other = [totals["Total"][0] - sum(totals[column][0] for column in columns), totals["Total"][1] - sum(totals[column][1] for column in columns)]
+        for column, (unique, transits) in [(column, totals[column]) for column in columns] + [("Other", other), ("Total", totals["Total"])]:
+            row[f"Unique_{column}"] = unique
+            row[f"Transits_{column}"] = transits
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def test_summary_matches_baseline(crossings):
+    expected = baseline_new_df(crossings, "NAME", "VesselType", "MMSI")
+    new_df = SummarizeTransits(crossings, "NAME", "VesselType", "MMSI")
+    pd.testing.assert_frame_equal(new_df, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("CustomName, CustomTypes", [("", None), ("Research", [99, 1001])])
+def test_simplified_matches_baseline(crossings, CustomName, CustomTypes):
+    new_df = SummarizeTransits(crossings, "NAME", "VesselType", "MMSI")
+    expected = baseline_simplified(baseline_new_df(crossings, "NAME", "VesselType", "MMSI"), crossings, "NAME", CustomName, CustomTypes)
+    table = SimplifySummary(new_df, crossings, "NAME", "Length", CustomName, CustomTypes)
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+## Area visits (PairVisits, VisitCounts, DwellSummary) on hand-checked tracks against two square areas: a pass
+## through, a track inside an area that never crosses its boundary, a re-entry, tracks starting or ending inside,
+## and the transit counts and dwell table they give through IntersectTracks and the command line
+
+# import dependencies and libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+from passage_line import BuildPaths, DwellSummary, FindCrossings, IntersectTracks, PairVisits, RunSummary, VisitCounts
+
+## closed rings of area A (0, 0)-(10, 10) and area B (20, 0)-(30, 10)
+AREAS = [np.array([(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)]), np.array([(20, 0), (30, 0), (30, 10), (20, 10), (20, 0)])]
+
+## track id: vertices, and the expected (area, entry distance, exit distance, entered, exited) visits
+TRACKS = {
+    1: ([(-5, 5), (15, 5)], [("A", 5, 15, True, True)]),
+    2: ([(2, 2), (8, 8)], [("A", 0, np.hypot(6, 6), False, False)]),
+    3: ([(-5, 5), (5, 5), (5, -5), (8, -5), (8, 5), (15, 5)], [("A", 5, 15, True, True), ("A", 28, 35, True, True)]),
+    4: ([(5, 5), (15, 5)], [("A", 0, 5, False, True)]),
+    5: ([(20, -5), (30, -5)], []),
+    6: ([(-5, 5), (5, 5)], [("A", 5, 10, True, False)]),
+    7: ([(22, 2), (28, 2), (28, 8)], [("B", 0, 12, False, False)]),
+}
+
+
+@pytest.fixture
+def areas():
+    tracks = BuildPaths([np.array(xy, dtype="float64") for xy, visits in TRACKS.values()], ids=np.array(list(TRACKS)))
+    TrackTable = pd.DataFrame({
+        "MMSI": [100, 200, 100, 300, 400, 500, 200],
+        "VesselType": [70, 70, 70, 60, 80, 30, 60],
+        "Start": pd.to_datetime(["2024-01-01"] * len(TRACKS)),
+        "End": pd.to_datetime(["2024-01-01 20:00"] * len(TRACKS)),
+    }, index=list(TRACKS))
+    return tracks, TrackTable, BuildPaths(AREAS, ids=np.array([10, 20])), pd.DataFrame({"NAME": ["A", "B"]}, index=[10, 20])
+
+
+def test_pair_visits(areas):
+    tracks, TrackTable, lines, LineTable = areas
+    visits = PairVisits(FindCrossings(tracks, lines), tracks, lines)
+    expected = [(track, {"A": 10, "B": 20}[area], entry, exit, entered, exited)
+                for track, (xy, track_visits) in TRACKS.items() for area, entry, exit, entered, exited in track_visits]
+    found = list(visits[["Track_ID", "Line_ID", "Entry_Distance", "Exit_Distance", "Entered", "Exited"]].itertuples(index=False, name=None))
+    assert len(found) == len(expected)
+    for row, want in zip(found, expected):
+        assert row[:2] == want[:2] and row[4:] == want[4:]
+        assert np.allclose(row[2:4], want[2:4])
+    assert visits["Consistent"].all()
+    assert np.allclose(visits["Dwell_Distance"], visits["Exit_Distance"] - visits["Entry_Distance"])
+
+    counts = VisitCounts(visits)
+    assert counts.set_index(["Track_ID", "Line_ID"])["Visits"].to_dict() == {(1, 10): 1, (2, 10): 1, (3, 10): 2, (4, 10): 1, (6, 10): 1, (7, 20): 1}
+
+
+## Tracks inside an area with no crossing get an intersect row and count as one transit, a re-entry counts twice
+@pytest.mark.parametrize("MultipleInt", ["true", "false"])
+def test_inside_tracks_count_as_transits(areas, MultipleInt):
+    tracks, TrackTable, lines, LineTable = areas
+    temp_out_df = IntersectTracks(tracks, lines, TrackTable, LineTable, MultipleInt, Polygon=True)
+    counts = temp_out_df.set_index(["Track_ID", "Line_ID"])
+    assert counts["ORIG_FID_CALC"].to_dict() == {(1, 10): 1, (2, 10): 1, (3, 10): 2 if MultipleInt == "true" else 1, (4, 10): 1, (6, 10): 1,
+                                                 (7, 20): 1}
+    assert counts.loc[(2, 10), "Crossings"] == 0 and counts.loc[(7, 20), "NAME"] == "B"
+
+
+def test_dwell_summary(areas):
+    tracks, TrackTable, lines, LineTable = areas
+    visits = PairVisits(FindCrossings(tracks, lines), tracks, lines, TrackTable, "Start", "End")
+    ## track 1 covers 20 map units in 20 hours and spends units 5 to 15 inside A
+    assert visits.loc[visits["Track_ID"] == 1, "Dwell_Time"].iloc[0] == pd.Timedelta(hours=10)
+    dwell = DwellSummary(visits, TrackTable, LineTable, "NAME", "VesselType", "MMSI").set_index(["Name", "Category"])
+    assert dwell.loc[("A", "Total"), "Visits"] == 6 and dwell.loc[("A", "Total"), "Unique_Vessels"] == 4
+    assert dwell.loc[("A", "Cargo"), "Visits"] == 4 and dwell.loc[("A", "Cargo"), "Unique_Vessels"] == 2
+    assert dwell.loc[("B", "Total"), "Visits"] == 1 and dwell.loc[("B", "Total"), "Avg_Dwell_Distance"] == 12
+
+
+## The command line writes the same dwell table from track and area files
+def test_cli_dwell_output(areas, tmp_path):
+    tracks, TrackTable, lines, LineTable = areas
+    wkt = ["LINESTRING (" + ", ".join(f"{x} {y}" for x, y in xy) + ")" for xy, visits in TRACKS.values()]
+    TrackTable.assign(OBJECTID=list(TRACKS), WKT=wkt).to_csv(tmp_path / "tracks.csv", index=False)
+    rings = ["POLYGON ((" + ", ".join(f"{x} {y}" for x, y in ring) + "))" for ring in AREAS]
+    LineTable.assign(WKT=rings).to_csv(tmp_path / "areas.csv", index=False)
+    RunSummary(str(tmp_path / "tracks.csv"), str(tmp_path / "areas.csv"), "NAME", "VesselType", "MMSI", str(tmp_path / "out.csv"),
+               Message=lambda text: None, DwellOutput=str(tmp_path / "dwell.csv"), TrackStartField="Start", TrackEndField="End")
+    visits = PairVisits(FindCrossings(tracks, lines), tracks, lines, TrackTable, "Start", "End")
+    expected = DwellSummary(visits, TrackTable, LineTable, "NAME", "VesselType", "MMSI")
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "dwell.csv"), expected, check_dtype=False)
+    with pytest.raises(ValueError):
+        RunSummary(str(tmp_path / "tracks.csv"), str(tmp_path / "areas.csv"), "NAME", "VesselType", "MMSI", str(tmp_path / "out.csv"),
+                   Message=lambda text: None, DwellOutput=str(tmp_path / "dwell.csv"), MemoryMB=1)
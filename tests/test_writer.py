@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+## Summary outputs: a .gpkg output is a GeoPackage with the table registered as attributes, and rewriting replaces it
+
+# import dependencies and libraries
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from passage_line import WriteSummary
+from passage_line.writer import GPKG_APPLICATION_ID, GPKG_USER_VERSION
+
+
+def test_geopackage_output(tmp_path):
+    summary = pd.DataFrame({"Name": ["L00", None], "Transits": [3, 4], "Avg_Len": [120.5, np.nan],
+                            "First": pd.to_datetime(["2024-01-02 03:04:05", None])})
+    output = tmp_path / "Summary.gpkg"
+    assert WriteSummary(summary, str(output)) == f"{output}/Summary"
+    assert WriteSummary(summary.iloc[:1], str(output)) == f"{output}/Summary"
+
+    with sqlite3.connect(str(output)) as connection:
+        assert connection.execute("PRAGMA application_id").fetchone()[0] == GPKG_APPLICATION_ID
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == GPKG_USER_VERSION
+        assert connection.execute("SELECT table_name, data_type, identifier FROM gpkg_contents").fetchall() == [("Summary", "attributes", "Summary")]
+        assert sorted(row[0] for row in connection.execute("SELECT srs_id FROM gpkg_spatial_ref_sys")) == [-1, 0, 4326]
+        assert [(row[1], row[2], row[5]) for row in connection.execute('PRAGMA table_info("Summary")')] == [
+            ("fid", "INTEGER", 1), ("Name", "TEXT", 0), ("Transits", "INTEGER", 0), ("Avg_Len", "DOUBLE", 0), ("First", "DATETIME", 0)]
+        assert connection.execute('SELECT * FROM "Summary"').fetchall() == [(1, "L00", 3, 120.5, "2024-01-02T03:04:05.000Z")]
+    connection.close()